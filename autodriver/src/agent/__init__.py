@@ -3,18 +3,45 @@
 This submodule contains the core components of the LangGraph agent:
 - state.py: Agent state definition
 - tools.py: Calculation tools (add/multiply/divide)
-- nodes.py: Agent node functions (parse/decide/execute/summarize)
+- nodes.py: Agent node functions (parse/fast_path/decide/execute/summarize)
+- fast_path.py: Local deterministic arithmetic fast path (skips the LLM)
 - graph.py: Graph assembly and compilation
+- startup.py: Explicit warm-up hook for servers
+
+Attributes are resolved lazily on first access, so ``import agent`` stays cheap:
+the LLM client, tool bindings and vector store are only built when first used
+(or when ``warmup()`` / ``start_background_warmup()`` is called). Note that once
+a submodule such as ``agent.graph`` has been imported explicitly, the package
+attribute of the same name refers to that submodule; import the compiled graph
+with ``from agent.graph import graph`` to be unambiguous.
 """
-# 暴露agent子模块的核心组件，方便外部调用
-from .state import CalcAgentState
-from .tools import tools, tools_by_name
-from .nodes import parse_input, llm_decide, execute_tool, llm_summarize, should_continue
-from .graph import graph
-from .rag import retrieve_context
+import importlib
+from typing import Any
+
+# 暴露agent子模块的核心组件，方便外部调用（属性名 → 所在子模块，首次访问时才导入）
+_LAZY_ATTRS = {
+    "CalcAgentState": "state",
+    "tools": "tools",
+    "tools_by_name": "tools",
+    "parse_input": "nodes",
+    "llm_decide": "nodes",
+    "execute_tool": "nodes",
+    "llm_summarize": "nodes",
+    "should_continue": "nodes",
+    "graph": "graph",
+    "retrieve_context": "rag",
+    "warmup": "startup",
+    "start_background_warmup": "startup",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
 
-__all__ = [
-    "CalcAgentState", "tools", "tools_by_name",
-    "parse_input", "llm_decide", "execute_tool", "llm_summarize", "should_continue",
-    "app"
-]
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    # 缓存到模块命名空间，之后的访问不再经过__getattr__（同时覆盖同名子模块属性，如graph）
+    globals()[name] = value
+    return value
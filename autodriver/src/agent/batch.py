@@ -0,0 +1,171 @@
+# src/agent/batch.py
+"""批量查询执行器：JSONL输入 → 有界并发跑编译好的graph → 结果按完成顺序流式写入JSONL。
+
+输入每行一个JSON对象：{"id": "q1", "query": "机器人故障码E01是什么？"}，id缺省时用行号。
+输出每行：{"id", "query", "answer", "latency_s", "llm_calls", "error"}。
+重跑同一个输出文件时，已经有结果的id会被跳过（断点续跑）；--retry-errors 重跑出错条目时
+新结果追加在文件末尾，同一id以最后一行为准。
+
+命令行：
+    python -m src.agent.batch questions.jsonl -o answers.jsonl -c 8 --metrics metrics.prom
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from langchain_core.messages import HumanMessage
+
+DEFAULT_CONCURRENCY = 8
+
+
+def read_inputs(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取输入JSONL（不一次性载入内存），空行跳过，缺省id用行号"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            item.setdefault("id", str(line_no))
+            item["id"] = str(item["id"])
+            yield item
+
+
+def load_done_ids(path: str, retry_errors: bool = False) -> Set[str]:
+    """读取已有输出里完成的id；retry_errors=True时出错的条目会重跑"""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 上次中断时可能写了半行，忽略即可，对应条目会重跑
+                continue
+            if retry_errors and record.get("error"):
+                continue
+            done.add(str(record["id"]))
+    return done
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法百分位数，输入必须已排序"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, skipped: int, wall_s: float) -> Dict[str, Any]:
+    values = sorted(latencies)
+    return {
+        "completed": len(values),
+        "errors": errors,
+        "skipped": skipped,
+        "wall_s": round(wall_s, 3),
+        "throughput_qps": round(len(values) / wall_s, 3) if wall_s > 0 else 0.0,
+        "latency_p50_s": round(percentile(values, 50), 4),
+        "latency_p95_s": round(percentile(values, 95), 4),
+        "latency_p99_s": round(percentile(values, 99), 4),
+    }
+
+
+async def _run_one(graph: Any, item: Dict[str, Any]) -> Dict[str, Any]:
+    query = item.get("query", "")
+    inputs = {"messages": item.get("messages") or [HumanMessage(content=query)], "llm_calls": 0}
+    start = time.perf_counter()
+    record: Dict[str, Any] = {"id": item["id"], "query": query}
+    try:
+        result = await graph.ainvoke(inputs)
+        record["answer"] = result["messages"][-1].content
+        record["llm_calls"] = result.get("llm_calls", 0)
+        record["error"] = None
+    except Exception as e:
+        record["answer"] = None
+        record["llm_calls"] = None
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["latency_s"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+async def run_batch(
+    items: Any,
+    output_path: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    graph: Any = None,
+    retry_errors: bool = False,
+) -> Dict[str, Any]:
+    """并发跑完全部输入并把结果追加写入output_path，返回吞吐/延迟统计。
+
+    所有请求共用同一个graph，也就共用同一个LLM客户端、HTTP连接池和响应缓存。
+    """
+    if graph is None:
+        from src.agent.graph import graph
+    done_ids = load_done_ids(output_path, retry_errors=retry_errors)
+    queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=concurrency * 2)
+    latencies: List[float] = []
+    counters = {"errors": 0, "skipped": 0}
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    start = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out:
+
+        async def producer() -> None:
+            for item in items:
+                if item["id"] in done_ids:
+                    counters["skipped"] += 1
+                    continue
+                await queue.put(item)
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                record = await _run_one(graph, item)
+                # 完成一条写一条，中途中断也不会丢掉已完成的结果
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                latencies.append(record["latency_s"])
+                if record["error"]:
+                    counters["errors"] += 1
+
+        await asyncio.gather(producer(), *(worker() for _ in range(concurrency)))
+    return summarize(latencies, counters["errors"], counters["skipped"], time.perf_counter() - start)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AutoDriver 批量查询执行器")
+    parser.add_argument("input", help="输入JSONL文件，每行 {\"id\": ..., \"query\": ...}")
+    parser.add_argument("-o", "--output", required=True, help="输出JSONL文件（已存在时断点续跑）")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="最大并发数")
+    parser.add_argument("--retry-errors", action="store_true", help="重跑上次出错的条目")
+    parser.add_argument("--no-warmup", action="store_true", help="跳过开跑前的预热")
+    parser.add_argument("--metrics", help="跑完后导出节点/工具/LLM指标（.json为JSON，其余为Prometheus文本）")
+    args = parser.parse_args(argv)
+
+    if not args.no_warmup:
+        from src.agent.startup import warmup
+        warmup()
+    report = asyncio.run(
+        run_batch(read_inputs(args.input), args.output, concurrency=args.concurrency, retry_errors=args.retry_errors)
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2), file=sys.stderr)
+    if args.metrics:
+        from src.agent.metrics import metrics
+        metrics.write(args.metrics)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+# src/agent/cache.py
+"""LLM响应缓存：内存LRU(带TTL) + SQLite磁盘持久化两级缓存。
+
+缓存键覆盖：规范化后的prompt消息 + 绑定的工具schema + 模型参数，
+任意一项变化都会得到不同的键，不会串用旧答案。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    ToolMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+
+# ========== 默认配置（均可通过环境变量覆盖） ==========
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "autodriver", "llm_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+def _normalize_message(msg: BaseMessage) -> Dict[str, Any]:
+    """消息规范化：只保留影响模型输出的字段，去掉id/元数据等每次都会变化的内容"""
+    content = msg.content.strip() if isinstance(msg.content, str) else msg.content
+    normalized: Dict[str, Any] = {"type": msg.type, "content": content}
+    if isinstance(msg, AIMessage) and msg.tool_calls:
+        # tool_call的id每次调用都不同，只保留工具名+参数
+        normalized["tool_calls"] = [{"name": c["name"], "args": c["args"]} for c in msg.tool_calls]
+    if isinstance(msg, ToolMessage) and msg.name:
+        normalized["name"] = msg.name
+    return normalized
+
+
+class LLMResponseCache:
+    """两级LLM响应缓存，线程安全。
+
+    - 内存层：OrderedDict实现的LRU，条目超过TTL视为未命中
+    - 磁盘层：SQLite，进程重启后依然可用，同样遵守TTL
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "writes": 0}
+
+    @classmethod
+    def from_env(cls) -> "LLMResponseCache":
+        """按环境变量创建缓存：AUTODRIVER_LLM_CACHE=0 关闭缓存，AUTODRIVER_LLM_CACHE_PATH为空字符串时仅使用内存层"""
+        return cls(
+            enabled=os.getenv("AUTODRIVER_LLM_CACHE", "1") != "0",
+            db_path=os.path.expanduser(os.getenv("AUTODRIVER_LLM_CACHE_PATH", DEFAULT_CACHE_PATH)) or None,
+            max_entries=int(os.getenv("AUTODRIVER_LLM_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(os.getenv("AUTODRIVER_LLM_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+        )
+
+    # ========== 缓存键 ==========
+    @staticmethod
+    def make_key(
+        messages: Sequence[BaseMessage],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """根据 prompt消息 + 工具schema + 模型参数 计算sha256缓存键"""
+        payload = {
+            "messages": [_normalize_message(m) for m in messages],
+            "tools": tools or [],
+            "params": params or {},
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ========== 读写 ==========
+    def get(self, key: str) -> Optional[BaseMessage]:
+        """查询缓存：先内存后磁盘，磁盘命中后回填内存层"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, data = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return messages_from_dict([data])[0]
+                del self._memory[key]
+
+            row = self._disk_get(key)
+            if row is not None:
+                created_at, data = row
+                if now - created_at <= self.ttl_seconds:
+                    self._memory_put(key, created_at, data)
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    return messages_from_dict([data])[0]
+                self._disk_delete(key)
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, message: BaseMessage) -> None:
+        """写入两级缓存"""
+        if not self.enabled:
+            return
+        data = message_to_dict(message)
+        created_at = time.time()
+        with self._lock:
+            self._memory_put(key, created_at, data)
+            self._disk_put(key, created_at, data)
+            self._stats["writes"] += 1
+
+    def open(self) -> None:
+        """提前打开SQLite连接（预热用），否则在第一次读写时才打开"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._connect()
+
+    def clear(self) -> None:
+        """清空两级缓存（统计计数保留）"""
+        with self._lock:
+            self._memory.clear()
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """命中/未命中计数快照"""
+        with self._lock:
+            return dict(self._stats, memory_size=len(self._memory))
+
+    # ========== 内部实现：内存层 ==========
+    def _memory_put(self, key: str, created_at: float, data: Dict[str, Any]) -> None:
+        self._memory[key] = (created_at, data)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ========== 内部实现：磁盘层 ==========
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """懒加载SQLite连接，db_path为None时只用内存层"""
+        if self.db_path is None:
+            return None
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, created_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        conn = self._connect()
+        if conn is None:
+            return None
+        row = conn.execute("SELECT created_at, value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _disk_put(self, key: str, created_at: float, data: Dict[str, Any]) -> None:
+        conn = self._connect()
+        if conn is None:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, created_at, value) VALUES (?, ?, ?)",
+            (key, created_at, json.dumps(data, ensure_ascii=False)),
+        )
+        conn.commit()
+
+    def _disk_delete(self, key: str) -> None:
+        conn = self._connect()
+        if conn is None:
+            return
+        conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+        conn.commit()
+
+
+# 全局缓存实例，llm_decide / llm_summarize 共用
+llm_cache = LLMResponseCache.from_env()
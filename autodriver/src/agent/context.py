@@ -0,0 +1,114 @@
+# src/agent/context.py
+"""对话上下文窗口管理：按token预算保留最近的若干轮对话，更早的轮次折叠进滚动摘要。
+
+切分以"轮"为单位（从一条HumanMessage开始，到下一条HumanMessage之前结束），
+所以AI的tool_calls和对应的ToolMessage总在同一轮里，永远不会被拆开。
+"""
+import json
+import os
+import re
+from typing import List, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+# ========== 默认配置（可通过环境变量覆盖） ==========
+# 历史消息的token预算（不含系统提示词），超出部分折叠进摘要
+DEFAULT_MAX_CONTEXT_TOKENS = 3000
+# 无论预算多紧，至少保留最近几轮原文
+DEFAULT_MIN_RECENT_TURNS = 1
+# 每条消息的固定开销（角色标记等）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_CJK_RE = re.compile(r"[　-〿一-鿿＀-￯]")
+
+SUMMARY_PROMPT = """请把下面的历史对话压缩成简洁的中文摘要，供后续对话参考。
+要求：保留用户的意图、关键数值、故障码、指令名、机器人型号和已经得出的结论；不要编造；不超过200字；只输出摘要本身。
+
+已有摘要：
+{summary}
+
+新增的历史对话：
+{dialogue}
+"""
+
+
+def max_context_tokens() -> int:
+    return int(os.getenv("AUTODRIVER_CONTEXT_MAX_TOKENS", DEFAULT_MAX_CONTEXT_TOKENS))
+
+
+def min_recent_turns() -> int:
+    return int(os.getenv("AUTODRIVER_CONTEXT_MIN_TURNS", DEFAULT_MIN_RECENT_TURNS))
+
+
+def count_text_tokens(text: str) -> int:
+    """近似token数：中日韩字符每字约1个token，其余字符约4个字符1个token"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def count_message_tokens(msg: BaseMessage) -> int:
+    content = msg.content if isinstance(msg.content, str) else json.dumps(msg.content, ensure_ascii=False)
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_text_tokens(content)
+    if isinstance(msg, AIMessage) and msg.tool_calls:
+        tokens += count_text_tokens(json.dumps(msg.tool_calls, ensure_ascii=False, default=str))
+    return tokens
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    return sum(count_message_tokens(m) for m in messages)
+
+
+def split_turns(messages: Sequence[BaseMessage]) -> List[Tuple[int, int]]:
+    """把消息列表切成轮次，返回每轮的 [start, end) 下标"""
+    starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if not starts or starts[0] != 0:
+        starts = [0] + starts
+    ends = starts[1:] + [len(messages)]
+    return [(s, e) for s, e in zip(starts, ends) if s < e]
+
+
+def select_window_start(
+    messages: Sequence[BaseMessage],
+    max_tokens: int,
+    min_turns: int = DEFAULT_MIN_RECENT_TURNS,
+    not_before: int = 0,
+) -> int:
+    """从最新一轮往前累加，返回能放进预算的最早一轮的起始下标。
+
+    至少保留 min_turns 轮；窗口起点只会前进不会后退（not_before），
+    已经折叠进摘要的轮次不会重新出现在原文里。
+    """
+    turns = [t for t in split_turns(messages) if t[0] >= not_before]
+    if not turns:
+        return not_before
+    used = 0
+    start = turns[-1][0]
+    for kept, (turn_start, turn_end) in enumerate(reversed(turns)):
+        turn_tokens = count_tokens(messages[turn_start:turn_end])
+        if kept >= min_turns and used + turn_tokens > max_tokens:
+            break
+        used += turn_tokens
+        start = turn_start
+    return start
+
+
+def render_dialogue(messages: Sequence[BaseMessage]) -> str:
+    """把要折叠的消息渲染成纯文本，喂给摘要提示词"""
+    lines = []
+    for msg in messages:
+        content = msg.content if isinstance(msg.content, str) else json.dumps(msg.content, ensure_ascii=False)
+        if isinstance(msg, HumanMessage):
+            lines.append(f"用户：{content}")
+        elif isinstance(msg, ToolMessage):
+            lines.append(f"工具结果：{content}")
+        elif isinstance(msg, AIMessage):
+            if msg.tool_calls:
+                calls = ", ".join(f"{c['name']}({json.dumps(c['args'], ensure_ascii=False)})" for c in msg.tool_calls)
+                lines.append(f"助手调用工具：{calls}")
+            if content:
+                lines.append(f"助手：{content}")
+    return "\n".join(lines)
+
+
+def build_summary_prompt(summary: str, messages: Sequence[BaseMessage]) -> HumanMessage:
+    return HumanMessage(content=SUMMARY_PROMPT.format(summary=summary or "无", dialogue=render_dialogue(messages)))
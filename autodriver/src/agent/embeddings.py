@@ -0,0 +1,192 @@
+# src/agent/embeddings.py
+"""本地CPU嵌入模型（sentence-transformers）+ 磁盘嵌入缓存。
+
+- 文档和查询都按批编码，同一批内重复文本只编码一次
+- 缓存键 = sha256(模型名 + 文本)，换模型不会串用旧向量；重建索引、重复查询几乎不再编码
+- 缓存向量可选 float32 / float16 / int8 存储（int8为逐向量对称量化，额外存一个float32缩放系数）
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# ========== 默认配置（均可通过环境变量覆盖） ==========
+# 中文小模型，CPU上单条查询毫秒级，512维
+DEFAULT_MODEL_NAME = "BAAI/bge-small-zh-v1.5"
+# bge中文模型推荐给短查询加的检索指令，文档侧不加
+DEFAULT_QUERY_INSTRUCTION = "为这个句子生成表示以用于检索相关文章："
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "autodriver", "embeddings.sqlite3")
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+
+# ========== 向量 <-> 字节 ==========
+def encode_vector(vec: np.ndarray, storage: str) -> bytes:
+    vec = np.asarray(vec, dtype=np.float32)
+    if storage == "float32":
+        return vec.tobytes()
+    if storage == "float16":
+        return vec.astype(np.float16).tobytes()
+    if storage == "int8":
+        scale = float(np.abs(vec).max()) / 127.0 or 1.0
+        codes = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+        return np.float32(scale).tobytes() + codes.tobytes()
+    raise ValueError(f"不支持的存储精度: {storage}（可选: {', '.join(STORAGE_DTYPES)}）")
+
+
+def decode_vector(blob: bytes, storage: str) -> np.ndarray:
+    if storage == "float32":
+        return np.frombuffer(blob, dtype=np.float32)
+    if storage == "float16":
+        return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+    if storage == "int8":
+        scale = np.frombuffer(blob[:4], dtype=np.float32)[0]
+        return np.frombuffer(blob[4:], dtype=np.int8).astype(np.float32) * scale
+    raise ValueError(f"不支持的存储精度: {storage}（可选: {', '.join(STORAGE_DTYPES)}）")
+
+
+class EmbeddingCache:
+    """SQLite嵌入缓存，线程安全；db_path为None时不缓存"""
+
+    def __init__(self, db_path: Optional[str] = DEFAULT_CACHE_PATH, storage: str = "float16"):
+        if storage not in STORAGE_DTYPES:
+            raise ValueError(f"不支持的存储精度: {storage}（可选: {', '.join(STORAGE_DTYPES)}）")
+        self.db_path = db_path
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self.db_path is None:
+            return None
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, storage TEXT NOT NULL, value BLOB NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """批量查询，返回命中的 {key: 向量}；按写入时的精度解码，改了存储精度旧条目照样可用"""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                # SQLite单条语句的参数个数有上限，分段查询
+                for i in range(0, len(keys), 500):
+                    part = list(keys[i:i + 500])
+                    marks = ",".join("?" * len(part))
+                    for key, storage, blob in conn.execute(
+                        f"SELECT key, storage, value FROM embeddings WHERE key IN ({marks})", part
+                    ):
+                        found[key] = decode_vector(blob, storage)
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            conn = self._connect()
+            if conn is None or not items:
+                return
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, storage, value) VALUES (?, ?, ?)",
+                [(key, self.storage, encode_vector(vec, self.storage)) for key, vec in items.items()],
+            )
+            conn.commit()
+            self._stats["writes"] += len(items)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+class LocalEmbeddings(Embeddings):
+    """sentence-transformers CPU嵌入，模型在第一次编码时才加载；向量做L2归一化，L2距离排序等价于余弦相似度"""
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        cache: Optional[EmbeddingCache] = None,
+        query_instruction: str = "",
+        device: str = "cpu",
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = cache
+        self.query_instruction = query_instruction
+        self.device = device
+        self._model: Any = None
+        self._model_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LocalEmbeddings":
+        """AUTODRIVER_EMBEDDING_MODEL / _BATCH_SIZE / _CACHE_PATH（空字符串=不缓存） / _STORAGE（float32/float16/int8）"""
+        model_name = os.getenv("AUTODRIVER_EMBEDDING_MODEL", DEFAULT_MODEL_NAME)
+        cache_path = os.path.expanduser(os.getenv("AUTODRIVER_EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)) or None
+        return cls(
+            model_name=model_name,
+            batch_size=int(os.getenv("AUTODRIVER_EMBEDDING_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+            cache=EmbeddingCache(cache_path, storage=os.getenv("AUTODRIVER_EMBEDDING_STORAGE", "float16")),
+            query_instruction=DEFAULT_QUERY_INSTRUCTION if model_name == DEFAULT_MODEL_NAME else "",
+        )
+
+    def _get_model(self) -> Any:
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        return self._get_model().encode(
+            list(texts),
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        ).astype(np.float32)
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        """批量编码：先查缓存，只把未命中的去重文本交给模型，结果写回缓存"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        keys = [EmbeddingCache.make_key(self.model_name, t) for t in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(keys))) if self.cache else {}
+        missing = {k: t for k, t in zip(keys, texts) if k not in vectors}
+        if missing:
+            encoded = dict(zip(missing, self._encode(list(missing.values()))))
+            if self.cache:
+                self.cache.put_many(encoded)
+                # 按缓存精度回读一遍，保证同一文本无论是否命中缓存得到的向量完全一致
+                storage = self.cache.storage
+                encoded = {k: decode_vector(encode_vector(v, storage), storage) for k, v in encoded.items()}
+            vectors.update(encoded)
+        return np.stack([vectors[k] for k in keys])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_many(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_many([self.query_instruction + text])[0].tolist()
+
+    def embed_queries(self, texts: Sequence[str]) -> List[List[float]]:
+        """多条查询一次批量编码"""
+        return self.embed_many([self.query_instruction + t for t in texts]).tolist()
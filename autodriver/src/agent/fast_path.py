@@ -0,0 +1,138 @@
+# src/agent/fast_path.py
+"""本地算术快速通道：在llm_decide之前识别中英文算术问题，本地确定性求值后直接结束。
+
+只处理"整句都是算术表达式"的输入，例如：
+- Add 3 and 4 / multiply 6 by 7 / what is (1 + 2) * 3
+- 3加4等于多少 / 计算8除以2 / 3和4的积是多少
+任何无法完整解析的输入都返回None，交给LLM处理。
+"""
+import ast
+import operator
+import re
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from src.agent.tools import add, multiply, divide
+
+Number = Union[int, float]
+
+# 输入过长直接放弃，避免构造超大表达式
+MAX_QUERY_LENGTH = 200
+
+# ========== 运算符 → 计算函数（加/乘/除直接复用tools.py里工具的原始函数，绕过回调开销） ==========
+_BINARY_OPS: Dict[type, Callable[[Number, Number], Number]] = {
+    ast.Add: add.func,
+    ast.Sub: operator.sub,
+    ast.Mult: multiply.func,
+    ast.Div: divide.func,
+}
+_UNARY_OPS: Dict[type, Callable[[Number], Number]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+_NUM = r"-?\d+(?:\.\d+)?"
+
+# ========== 整句模板：动词/名词形式，统一改写成 "a op b" ==========
+_PHRASE_PATTERNS = [
+    (re.compile(rf"^(?:add|sum)\s+({_NUM})\s+(?:and|to|with)\s+({_NUM})$"), "+"),
+    (re.compile(rf"^(?:the\s+)?sum\s+of\s+({_NUM})\s+and\s+({_NUM})$"), "+"),
+    (re.compile(rf"^subtract\s+({_NUM})\s+from\s+({_NUM})$"), "-r"),
+    (re.compile(rf"^(?:the\s+)?difference\s+(?:between|of)\s+({_NUM})\s+and\s+({_NUM})$"), "-"),
+    (re.compile(rf"^multiply\s+({_NUM})\s+(?:and|by|with)\s+({_NUM})$"), "*"),
+    (re.compile(rf"^(?:the\s+)?product\s+of\s+({_NUM})\s+and\s+({_NUM})$"), "*"),
+    (re.compile(rf"^divide\s+({_NUM})\s+by\s+({_NUM})$"), "/"),
+    (re.compile(rf"^(?:the\s+)?quotient\s+of\s+({_NUM})\s+(?:and|by)\s+({_NUM})$"), "/"),
+    (re.compile(rf"^({_NUM})(?:和|与|跟)({_NUM})的和$"), "+"),
+    (re.compile(rf"^({_NUM})(?:和|与|跟)({_NUM})的差$"), "-"),
+    (re.compile(rf"^({_NUM})(?:和|与|跟)({_NUM})的(?:积|乘积)$"), "*"),
+    (re.compile(rf"^({_NUM})(?:和|与|跟)({_NUM})的商$"), "/"),
+]
+
+# ========== 运算词 → 运算符（长词在前，避免"乘以"被"乘"截断） ==========
+_OPERATOR_WORDS = [
+    ("multiplied by", "*"), ("divided by", "/"), ("plus", "+"), ("minus", "-"), ("times", "*"),
+    ("加上", "+"), ("减去", "-"), ("乘以", "*"), ("除以", "/"), ("加", "+"), ("减", "-"), ("乘", "*"),
+    ("×", "*"), ("÷", "/"), ("x", "*"),
+]
+
+# 问句前后缀，去掉后才是表达式本体
+_PREFIX_RE = re.compile(r"^(?:请|帮我|麻烦)?(?:计算|算一下|算算|求|what\s+is|what's|calculate|compute|evaluate)\s*")
+_SUFFIX_RE = re.compile(r"\s*(?:=|等于)?\s*(?:多少|几|是多少|结果是多少|的结果|结果)?\s*[?？。.!！]*$")
+
+_EXPR_RE = re.compile(r"^[\d\s.+\-*/()]+$")
+
+
+def _normalize(text: str) -> str:
+    """全角转半角、统一小写、去掉问句前后缀"""
+    text = text.strip().lower()
+    text = text.translate(str.maketrans("０１２３４５６７８９（）＋－＊／．", "0123456789()+-*/."))
+    text = _PREFIX_RE.sub("", text)
+    text = _SUFFIX_RE.sub("", text)
+    return text.strip()
+
+
+def _to_expression(text: str) -> Optional[str]:
+    """把规范化后的问句改写为纯算术表达式，无法改写返回None"""
+    for pattern, op in _PHRASE_PATTERNS:
+        m = pattern.match(text)
+        if m:
+            a, b = m.group(1), m.group(2)
+            if op == "-r":  # subtract a from b → b - a
+                return f"{b} - {a}"
+            return f"{a} {op} {b}"
+    expr = text
+    for word, op in _OPERATOR_WORDS:
+        expr = expr.replace(word, f" {op} ")
+    expr = " ".join(expr.split())
+    if not expr or not _EXPR_RE.match(expr) or not re.search(r"\d\s*[+\-*/]", expr):
+        return None
+    return expr
+
+
+def _eval_node(node: ast.AST) -> Number:
+    """安全AST求值：只允许数字常量、加减乘除和正负号"""
+    if isinstance(node, ast.Expression):
+        return _eval_node(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        return _BINARY_OPS[type(node.op)](_eval_node(node.left), _eval_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    raise ValueError(f"unsupported expression node: {type(node).__name__}")
+
+
+def _format_number(value: Number) -> str:
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return f"{value:.10g}"
+    return str(value)
+
+
+def evaluate_arithmetic(query: str) -> Optional[Tuple[str, Optional[Number]]]:
+    """识别并计算算术问题，返回 (表达式, 结果)，除数为0时结果为None；不是纯算术问题返回None"""
+    if not query or len(query) > MAX_QUERY_LENGTH:
+        return None
+    expr = _to_expression(_normalize(query))
+    if expr is None:
+        return None
+    try:
+        tree = ast.parse(expr, mode="eval")
+        result = _eval_node(tree)
+    except ZeroDivisionError:
+        return expr, None
+    except (SyntaxError, ValueError, TypeError, OverflowError):
+        return None
+    return expr, result
+
+
+def answer_arithmetic(query: str) -> Optional[str]:
+    """快速通道对外接口：返回最终回答文本，None表示交给LLM"""
+    evaluated = evaluate_arithmetic(query)
+    if evaluated is None:
+        return None
+    expr, result = evaluated
+    if result is None:
+        return f"{expr} 无法计算：除数不能为0"
+    return f"{expr} = {_format_number(result)}"
@@ -0,0 +1,302 @@
+# src/agent/fleet.py
+"""车队批量生成驱动：多台机器人的话题快照/在线端点 → 分类 → 探测 → 按配置哈希去重 → 渲染 → 输出目录 + 清单。
+
+输入（JSON/YAML）：
+    defaults: {vendor: auto, target: ros2}
+    robots:
+      - {id: r01, snapshot: snapshots/r01.r2snap}   # 话题快照（录制的.r2snap，或假ROS2图JSON/YAML，带samples时也会探测）
+      - {id: r02, domain_id: 3}                     # 在线机器人：按 ROS_DOMAIN_ID 查询话题并探测
+      - {id: r03, topics: [/hdas/feedback_arm_left, ...], vendor: galaxea, target: ros1}
+也可以直接给一个快照目录：每个 .r2snap/.json/.yaml 文件是一台机器人，id 取完整文件名（r01.json 和 r01.yaml 是两台）。
+机器人id必须唯一，重复时整批拒绝。
+
+输出：
+    <out>/drivers/<配置哈希>/node.py、config.json   配置完全相同的机器人共用一份
+    <out>/manifest.json                              每台机器人 → 驱动路径，以及各阶段耗时
+
+分类和渲染是纯CPU活，在进程池里并行；探测是IO，在主进程里异步并发。
+
+命令行：
+    python -m src.agent.fleet fleet.yaml -o build/drivers -w 8
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.agent.log import get_logger, log_event
+
+logger = get_logger("fleet")
+
+SNAPSHOT_SUFFIXES = (".r2snap", ".json", ".yaml", ".yml")
+DRIVER_FILE = "node.py"
+MANIFEST_FILE = "manifest.json"
+# 配置哈希取前多少位做目录名
+HASH_CHARS = 16
+
+
+# ========== 输入 ==========
+def _read_structured(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def load_fleet(path: str) -> List[Dict[str, Any]]:
+    """读取车队描述（文件或快照目录），补齐默认值；快照路径相对描述文件所在目录"""
+    if os.path.isdir(path):
+        return [
+            {"id": name, "snapshot": os.path.join(path, name)}
+            for name in sorted(os.listdir(path))
+            if name.endswith(SNAPSHOT_SUFFIXES)
+        ]
+    spec = _read_structured(path) or {}
+    defaults = spec.get("defaults") or {}
+    base = os.path.dirname(os.path.abspath(path))
+    robots = []
+    for i, entry in enumerate(spec.get("robots") or []):
+        robot = dict(defaults, **entry)
+        robot["id"] = str(robot.get("id", i))
+        if robot.get("snapshot"):
+            robot["snapshot"] = os.path.join(base, robot["snapshot"])
+        robots.append(robot)
+    return robots
+
+
+def check_unique_ids(robots: List[Dict[str, Any]]) -> None:
+    """清单和各阶段都按id索引，重复的id会让几台机器人悄悄合成一台"""
+    counts = Counter(r["id"] for r in robots)
+    duplicates = sorted(rid for rid, n in counts.items() if n > 1)
+    if duplicates:
+        raise ValueError(f"机器人id重复: {', '.join(duplicates)}")
+
+
+def config_hash(robot_config: Dict[str, Any], target: str) -> str:
+    """目标框架 + 配置的规范JSON哈希；元组和列表视为相同"""
+    payload = json.dumps({"target": target, "config": robot_config}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:HASH_CHARS]
+
+
+# ========== 进程池任务（模块级函数，可被pickle） ==========
+def classify_robot(job: Tuple[str, List[str], str]) -> Tuple[str, Optional[Dict[str, Any]], str]:
+    robot_id, topics, vendor = job
+    from src.agent.topic_rules import build_robot_config
+
+    try:
+        return robot_id, build_robot_config(topics, vendor), ""
+    except Exception as e:
+        return robot_id, None, f"{type(e).__name__}: {e}"
+
+
+def render_config(job: Tuple[str, Dict[str, Any], str]) -> Tuple[str, Optional[str], str]:
+    key, robot_config, target = job
+    from src.agent.templates import render_driver
+
+    try:
+        return key, render_driver(robot_config, target=target), ""
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
+
+
+# ========== 流水线 ==========
+async def _resolve_topics(robot: Dict[str, Any]) -> Tuple[Dict[str, List[str]], Any]:
+    """机器人 → ({话题: [类型]}, 可用于探测的后端或None)"""
+    from src.agent.ros2_introspection import introspector
+    from src.agent.ros2_snapshot import file_backend
+
+    if robot.get("topics") is not None:
+        topics = robot["topics"]
+        return ({t: [] for t in topics} if isinstance(topics, list) else dict(topics)), None
+    if robot.get("snapshot"):
+        backend = file_backend(robot["snapshot"])
+        topics = await asyncio.to_thread(backend.topic_names_and_types)
+        # 快照里带样本时才有东西可探测
+        return topics, backend if backend.has_samples() else None
+    if robot.get("domain_id") is not None:
+        domain = int(robot["domain_id"])
+        topics = await asyncio.to_thread(introspector.topics, domain)
+        return topics, introspector.backend(domain)
+    raise ValueError("机器人需要 topics / snapshot / domain_id 之一")
+
+
+async def _map(executor: Optional[Executor], fn: Callable[[Any], Any], jobs: List[Any]) -> List[Any]:
+    if executor is None:
+        return [fn(job) for job in jobs]
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(*(loop.run_in_executor(executor, fn, job) for job in jobs)))
+
+
+def _write_text(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+async def agenerate_fleet(
+    robots: List[Dict[str, Any]],
+    output_dir: str,
+    workers: int = 0,
+    target: str = "ros2",
+    probe: bool = True,
+    probe_concurrency: int = 8,
+) -> Dict[str, Any]:
+    """生成全部机器人的驱动并写出清单；单台机器人出错只记在清单里，不影响其他"""
+    from src.agent.ros2_probe import probe_robot_config
+
+    check_unique_ids(robots)
+    stages: Dict[str, float] = {}
+    records: Dict[str, Dict[str, Any]] = {
+        r["id"]: {"id": r["id"], "target": r.get("target", target), "error": ""} for r in robots
+    }
+    executor: Optional[Executor] = None
+    if workers > 0:
+        # spawn：主进程里可能已有rclpy/faiss的线程，fork不安全
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    try:
+        # 1. 话题来源：快照文件 / 在线端点（IO，并发）
+        start = time.perf_counter()
+        resolved = await asyncio.gather(*(_resolve_topics(r) for r in robots), return_exceptions=True)
+        sources: Dict[str, Tuple[Dict[str, List[str]], Any]] = {}
+        for robot, result in zip(robots, resolved):
+            if isinstance(result, BaseException):
+                records[robot["id"]]["error"] = f"{type(result).__name__}: {result}"
+            else:
+                sources[robot["id"]] = result
+        stages["resolve_s"] = time.perf_counter() - start
+
+        # 2. 分类（进程池）
+        start = time.perf_counter()
+        vendors = {r["id"]: r.get("vendor", "auto") for r in robots}
+        jobs = [(rid, list(topics), vendors[rid]) for rid, (topics, _) in sources.items()]
+        configs: Dict[str, Dict[str, Any]] = {}
+        for rid, robot_config, error in await _map(executor, classify_robot, jobs):
+            if error:
+                records[rid]["error"] = error
+            else:
+                configs[rid] = robot_config
+        stages["classify_s"] = time.perf_counter() - start
+
+        # 3. 探测（有后端的机器人之间并发，每台内部再按话题并发）
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(max(1, probe_concurrency))
+
+        async def probe_one(rid: str) -> None:
+            topics, backend = sources[rid]
+            try:
+                async with semaphore:
+                    configs[rid] = await probe_robot_config(configs[rid], known_types=topics, backend=backend)
+            except Exception as e:
+                # 与解析/分类阶段一样：记进清单，这台机器人不再渲染
+                records[rid]["error"] = f"{type(e).__name__}: {e}"
+                del configs[rid]
+                return
+            records[rid]["probed"] = True
+
+        if probe:
+            await asyncio.gather(*[probe_one(rid) for rid in configs if sources[rid][1] is not None])
+        stages["probe_s"] = time.perf_counter() - start
+
+        # 4. 去重 + 渲染（进程池，每个不同的配置只渲染一次）
+        start = time.perf_counter()
+        unique: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        for rid, robot_config in configs.items():
+            robot_target = records[rid]["target"]
+            key = config_hash(robot_config, robot_target)
+            records[rid].update(config_hash=key, vendor=robot_config.get("vendor"))
+            unique.setdefault(key, (robot_config, robot_target))
+        rendered = await _map(executor, render_config, [(k, c, t) for k, (c, t) in unique.items()])
+        stages["render_s"] = time.perf_counter() - start
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    # 5. 写出
+    start = time.perf_counter()
+    drivers: Dict[str, Dict[str, Any]] = {}
+    for key, code, error in rendered:
+        robot_config, robot_target = unique[key]
+        entry: Dict[str, Any] = {"config_hash": key, "vendor": robot_config.get("vendor"), "target": robot_target, "robots": []}
+        if error:
+            entry["error"] = error
+        else:
+            rel_dir = os.path.join("drivers", key)
+            _write_text(os.path.join(output_dir, rel_dir, DRIVER_FILE), code)
+            _write_text(
+                os.path.join(output_dir, rel_dir, "config.json"),
+                json.dumps(robot_config, ensure_ascii=False, indent=2),
+            )
+            entry["path"] = os.path.join(rel_dir, DRIVER_FILE)
+        drivers[key] = entry
+    for record in records.values():
+        key = record.get("config_hash")
+        if key is None:
+            continue
+        driver = drivers[key]
+        driver["robots"].append(record["id"])
+        if driver.get("error"):
+            record["error"] = driver["error"]
+        else:
+            record["driver"] = driver["path"]
+    stages["write_s"] = time.perf_counter() - start
+
+    errors = sum(1 for r in records.values() if r["error"])
+    ok_drivers = sum(1 for d in drivers.values() if not d.get("error"))
+    summary = {
+        "robots": len(records),
+        "unique_drivers": ok_drivers,
+        "deduplicated": len(configs) - len(unique),
+        "errors": errors,
+        "workers": workers,
+        "elapsed_s": round(sum(stages.values()), 3),
+        "stages": {name: round(value, 3) for name, value in stages.items()},
+    }
+    manifest = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "summary": summary,
+        "robots": list(records.values()),
+        "drivers": list(drivers.values()),
+    }
+    _write_text(os.path.join(output_dir, MANIFEST_FILE), json.dumps(manifest, ensure_ascii=False, indent=2))
+    log_event(logger, logging.INFO, "fleet_generated", output_dir=output_dir, **{k: v for k, v in summary.items() if k != "stages"})
+    return manifest
+
+
+def generate_fleet(robots: List[Dict[str, Any]], output_dir: str, **kwargs: Any) -> Dict[str, Any]:
+    return asyncio.run(agenerate_fleet(robots, output_dir, **kwargs))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AutoDriver 车队批量生成驱动")
+    parser.add_argument("fleet", help="车队描述文件（JSON/YAML）或话题快照目录")
+    parser.add_argument("-o", "--output", required=True, help="输出目录（drivers/ 与 manifest.json）")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="分类/渲染进程数，0=当前进程内执行")
+    parser.add_argument("-t", "--target", default="ros2", choices=["ros2", "ros1", "dora"], help="默认目标框架")
+    parser.add_argument("--no-probe", action="store_true", help="不探测话题详情，维度/分辨率用默认值")
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = generate_fleet(
+            load_fleet(args.fleet), args.output, workers=args.workers, target=args.target, probe=not args.no_probe
+        )
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(json.dumps(manifest["summary"], ensure_ascii=False, indent=2), file=sys.stderr)
+    return 1 if manifest["summary"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,12 @@
 # src/agent/graph.py 完整替换后代码 (复制粘贴覆盖即可)
 from langgraph.graph import StateGraph, START, END
 from src.agent.state import CalcAgentState
-from src.agent.nodes import parse_input, llm_decide, execute_tool, llm_summarize
+from src.agent.nodes import parse_input, fast_path, manage_context, llm_decide, execute_tool, llm_summarize
+from src.agent.startup import start_background_warmup
+from src.agent.metrics import instrument_node
+from src.agent.log import configure_logging
 from typing import Dict, Any, Literal
+import os
 
 # ✅✅✅ 修改1：路由函数新增判断，ROS2任务直接返回 "end_ros2"
 def should_continue(state: CalcAgentState) -> Literal["execute_tool", "llm_summarize", "end_ros2"]:
@@ -15,20 +19,42 @@ def should_continue(state: CalcAgentState) -> Literal["execute_tool", "llm_summa
         return "execute_tool"
     return "llm_summarize"
 
+# 快速通道路由：本地算出结果直接结束，否则整理上下文后交给LLM
+def route_fast_path(state: CalcAgentState) -> Literal["manage_context", "end_fast_path"]:
+    if state.get("fast_path_hit", False):
+        return "end_fast_path"
+    return "manage_context"
+
+# 日志级别/格式由 AUTODRIVER_LOG_LEVEL / AUTODRIVER_LOG_FORMAT 控制，默认只输出WARNING以上
+configure_logging()
+
 # 1. 创建图对象
 workflow = StateGraph(CalcAgentState)
 
-# 2. 添加节点
-workflow.add_node("parse_input", parse_input)
-workflow.add_node("llm_decide", llm_decide)
-workflow.add_node("execute_tool", execute_tool)
-workflow.add_node("llm_summarize", llm_summarize)
+# 2. 添加节点（每个节点都包一层指标埋点：耗时 + 异常计数）
+workflow.add_node("parse_input", instrument_node("parse_input", parse_input))
+workflow.add_node("fast_path", instrument_node("fast_path", fast_path))
+workflow.add_node("manage_context", instrument_node("manage_context", manage_context))
+workflow.add_node("llm_decide", instrument_node("llm_decide", llm_decide))
+workflow.add_node("execute_tool", instrument_node("execute_tool", execute_tool))
+workflow.add_node("llm_summarize", instrument_node("llm_summarize", llm_summarize))
 
 # 3. 固定链路
 workflow.add_edge(START, "parse_input")
-workflow.add_edge("parse_input", "llm_decide")
+workflow.add_edge("parse_input", "fast_path")
+workflow.add_edge("manage_context", "llm_decide")
 workflow.add_edge("execute_tool", "llm_decide")
 
+# 快速通道：纯算术问题本地求值后直达结束，其余输入先整理上下文窗口再走LLM
+workflow.add_conditional_edges(
+    source="fast_path",
+    path=route_fast_path,
+    path_map={
+        "manage_context": "manage_context",
+        "end_fast_path": END
+    }
+)
+
 # ✅✅✅ 修改2：路由映射新增 "end_ros2": END
 workflow.add_conditional_edges(
     source="llm_decide",
@@ -46,3 +72,6 @@ workflow.add_edge("llm_summarize", END)
 # 编译
 graph = workflow.compile()
 
+# 可选：服务加载图时后台预热LLM客户端/缓存/向量库（langgraph dev 在 .env 中设置 AUTODRIVER_WARMUP_ON_LOAD=1）
+if os.getenv("AUTODRIVER_WARMUP_ON_LOAD") == "1":
+    start_background_warmup()
@@ -0,0 +1,257 @@
+# src/agent/ingest.py
+"""知识库流式导入：遍历文档目录 → 解析 → 分片 → 按哈希去重 → 嵌入 → 写入索引。
+
+- 支持 Markdown/文本、YAML配置、ROS接口定义(.msg/.srv/.action)、驱动源码(.py/.c/.cpp/.h/.hpp)
+- 解析和分片在进程池里并行，主进程只做去重、嵌入和写索引（KnowledgeIndex.ingest）
+- 全程是生成器：同时在途的文件数有上限，嵌入按批进行，内存占用与文档总量无关
+
+命令行（重建整棵机器人文档树）：
+    python -m src.agent.ingest docs/ --workers 8 --batch-size 512
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from src.agent.knowledge_index import (
+    DEFAULT_CHUNK_OVERLAP,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_INGEST_BATCH,
+    SourceDoc,
+    content_hash,
+    split_text,
+)
+from src.agent.log import get_logger, log_event
+
+logger = get_logger("ingest")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+TEXT_SUFFIXES = (".md", ".txt")
+YAML_SUFFIXES = (".yaml", ".yml")
+INTERFACE_SUFFIXES = (".msg", ".srv", ".action")
+SOURCE_SUFFIXES = (".py", ".c", ".cc", ".cpp", ".h", ".hpp")
+SUPPORTED_SUFFIXES = TEXT_SUFFIXES + YAML_SUFFIXES + INTERFACE_SUFFIXES + SOURCE_SUFFIXES
+
+# 跳过的目录：版本库元数据、构建产物、虚拟环境
+SKIP_DIRS = {".git", "__pycache__", "build", "install", "log", ".venv", "node_modules"}
+# 单个文件上限，超过的（多半是生成文件/数据文件）跳过
+MAX_FILE_BYTES = 2 * 1024 * 1024
+
+# 每个进程池任务解析的文件数（摊薄进程间通信开销），以及每个解析进程同时在途的任务数
+FILES_PER_TASK = 16
+INFLIGHT_PER_WORKER = 4
+
+# .srv/.action 里 "---" 分隔的各段含义
+_INTERFACE_SECTIONS = {".msg": ["字段"], ".srv": ["请求", "响应"], ".action": ["目标", "结果", "反馈"]}
+
+
+# ========== 解析：文件 → 纯文本 ==========
+def _flatten_yaml(node: Any, prefix: str = "") -> Iterator[str]:
+    """嵌套配置展开成 "a.b.c: 值" 行，检索时键路径和值在同一行"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _flatten_yaml(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(node, list) and any(isinstance(item, (dict, list)) for item in node):
+        for i, item in enumerate(node):
+            yield from _flatten_yaml(item, f"{prefix}[{i}]")
+    else:
+        yield f"{prefix}: {node}"
+
+
+def parse_yaml(text: str, rel_path: str) -> str:
+    import yaml
+
+    # 有libyaml时用C实现的加载器，比纯Python快一个数量级
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    try:
+        documents = [doc for doc in yaml.load_all(text, Loader=loader) if doc is not None]
+    except yaml.YAMLError:
+        # 模板化/不合法的YAML按原文收录
+        return f"配置文件 {rel_path}\n{text}"
+    lines = [line for doc in documents for line in _flatten_yaml(doc)]
+    return f"配置文件 {rel_path}\n" + "\n".join(lines)
+
+
+def parse_interface(text: str, rel_path: str) -> str:
+    """ROS接口定义：标出接口全名（包名/类型名）和各段含义，注释保留"""
+    stem, suffix = os.path.splitext(os.path.basename(rel_path))
+    parts = rel_path.replace(os.sep, "/").split("/")
+    # 约定目录结构 <包名>/msg/Foo.msg
+    package = parts[-3] if len(parts) >= 3 else ""
+    name = f"{package}/{stem}" if package else stem
+    labels = _INTERFACE_SECTIONS[suffix]
+    sections: List[List[str]] = [[]]
+    for line in text.splitlines():
+        if line.strip() == "---":
+            sections.append([])
+        elif line.strip():
+            sections[-1].append(line.rstrip())
+    lines = [f"ROS接口 {name}（{suffix[1:]}）"]
+    for i, body in enumerate(sections):
+        label = labels[i] if i < len(labels) else f"第{i + 1}段"
+        lines.append(f"{name} {label}：")
+        lines.extend(body)
+    return "\n".join(lines)
+
+
+def parse_text(path: str, root: str) -> str:
+    """按扩展名把文件解析成检索用的纯文本"""
+    rel_path = os.path.relpath(path, root)
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in YAML_SUFFIXES:
+        return parse_yaml(text, rel_path)
+    if suffix in INTERFACE_SUFFIXES:
+        return parse_interface(text, rel_path)
+    if suffix in SOURCE_SUFFIXES:
+        return f"源文件 {rel_path}\n{text}"
+    return text
+
+
+def parse_file(
+    path: str,
+    root: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+) -> Optional[SourceDoc]:
+    """解析 + 分片一个文件（在解析进程里运行）；读不了的文件返回None，由主进程记日志跳过"""
+    try:
+        text = parse_text(path, root)
+    except (OSError, UnicodeDecodeError):
+        return None
+    # 分片结果随文本确定，不必再带全文回主进程；id带上导入根，不同目录下的同名文件互不覆盖
+    return SourceDoc(
+        source_id=f"file:{os.path.join(os.path.abspath(root), os.path.relpath(path, root))}",
+        hash=content_hash(text),
+        chunks=split_text(text, chunk_size, chunk_overlap),
+    )
+
+
+# ========== 流水线 ==========
+def iter_files(root: str, suffixes: Iterable[str] = SUPPORTED_SUFFIXES) -> Iterator[str]:
+    """按确定顺序遍历目录下支持的文件"""
+    suffixes = tuple(suffixes)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith("."))
+        for name in sorted(filenames):
+            if not name.lower().endswith(suffixes):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                if os.path.getsize(path) > MAX_FILE_BYTES:
+                    log_event(logger, logging.WARNING, "ingest_file_skipped", path=path, reason="too_large")
+                    continue
+            except OSError:
+                continue
+            yield path
+
+
+def bounded_map(executor: Executor, fn: Callable[[T], R], items: Iterable[T], window: int) -> Iterator[R]:
+    """按输入顺序产出 fn(item)，最多 window 个任务同时在途；Executor.map 会一次提交全部任务"""
+    pending: deque = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _parse_batch(paths: List[str], **kwargs: Any) -> List[Tuple[str, Optional[SourceDoc]]]:
+    return [(path, parse_file(path, **kwargs)) for path in paths]
+
+
+def _batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_source_docs(
+    root: str,
+    workers: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+) -> Iterator[SourceDoc]:
+    """目录 → 来源文档流；workers=0 在当前进程里解析（小目录更快），否则用进程池"""
+    parse = partial(_parse_batch, root=root, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    batches = _batched(iter_files(root), FILES_PER_TASK)
+    if workers <= 0:
+        results: Iterator[List[Tuple[str, Optional[SourceDoc]]]] = map(parse, batches)
+    else:
+        # spawn：主进程里已经有faiss/嵌入模型的线程，fork出来的子进程不安全
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+        results = bounded_map(pool, parse, batches, window=workers * INFLIGHT_PER_WORKER)
+    try:
+        for batch in results:
+            for path, doc in batch:
+                if doc is None:
+                    log_event(logger, logging.WARNING, "ingest_file_skipped", path=path, reason="unreadable")
+                else:
+                    yield doc
+    finally:
+        if workers > 0:
+            pool.shutdown(cancel_futures=True)
+
+
+def ingest_directory(
+    index: Any,
+    root: str,
+    workers: int = 0,
+    batch_size: int = DEFAULT_INGEST_BATCH,
+    prune: bool = True,
+    extra: Iterable[SourceDoc] = (),
+) -> Dict[str, Any]:
+    """把目录流式导入 KnowledgeIndex；extra 是额外的来源（例如内置知识条目），排在目录文件之前。
+    prune=True 时删除索引里同一目录导入、但本次已不存在的文档；其他目录导入的文档不受影响"""
+    start = time.perf_counter()
+    root = os.path.abspath(root)
+    docs = itertools.chain(extra, iter_source_docs(root, workers, index.chunk_size, index.chunk_overlap))
+    stats: Dict[str, Any] = dict(index.ingest(docs, prune=prune, batch_size=batch_size, root=root))
+    stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+    log_event(logger, logging.INFO, "knowledge_ingested", root=root, version=index.version, **stats)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AutoDriver 知识库导入：目录 → 磁盘索引")
+    parser.add_argument("root", help="文档目录（Markdown/文本/YAML/.msg/.srv/.action/驱动源码）")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="解析进程数，0=当前进程内解析")
+    parser.add_argument("-b", "--batch-size", type=int, default=DEFAULT_INGEST_BATCH, help="每批嵌入的分片数")
+    parser.add_argument("--index-dir", help="索引目录，默认同 AUTODRIVER_RAG_INDEX_DIR")
+    parser.add_argument("--no-builtin", action="store_true", help="不包含 rag.py 里的内置知识条目")
+    parser.add_argument("--keep-missing", action="store_true", help="保留索引里已不在目录中的文档")
+    args = parser.parse_args(argv)
+
+    if args.index_dir:
+        os.environ["AUTODRIVER_RAG_INDEX_DIR"] = args.index_dir
+    from src.agent.rag import builtin_sources, get_knowledge_index
+
+    stats = ingest_directory(
+        get_knowledge_index(),
+        args.root,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        prune=not args.keep_missing,
+        extra=() if args.no_builtin else builtin_sources(),
+    )
+    print(json.dumps(stats, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
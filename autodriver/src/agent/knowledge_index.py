@@ -0,0 +1,492 @@
+# src/agent/knowledge_index.py
+"""持久化、可增量更新的FAISS知识库索引。
+
+磁盘布局（index_dir下）：
+- index.faiss     FAISS向量索引，加载时内存映射（没有待更新内容时只读mmap，秒开）
+- docstore.json   与索引行号一一对应的分片：[{"id", "text", "metadata"}, ...]
+- manifest.json   每个来源文档的内容哈希 + 它产生的分片id，以及嵌入模型标识、索引参数、版本号
+
+同步时对比来源文档与manifest：只嵌入新增/变化的文档，删除已消失/变化文档的旧分片，
+没有变化时不做任何嵌入计算。嵌入模型标识、索引构建参数或格式版本变化时整库重建。
+分片id取分片内容哈希，不同来源里完全相同的分片只存一份，按引用计数删除。
+ingest() 逐个消费来源文档、按批嵌入写入，内存里只有当前批次的新分片；sync() 是它的字典版本。
+
+索引类型（IndexConfig.index_type）：
+- flat    精确检索，可选 float32 / float16 / int8 存储
+- hnsw    图索引，查询耗时近似对数增长，efSearch 控制召回/速度
+- ivfpq   倒排 + 乘积量化，向量压缩到 pq_m 字节，在抽样上训练，nprobe 控制召回/速度；
+          分片数不足以训练PQ码本时自动退化为 flat，语料长到够训练时自动重建
+HNSW/IVF-PQ 不支持原地删除，有删除时用剩余分片重建（向量从现有索引取回，取不回时走嵌入磁盘缓存）。
+"""
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+INDEX_FORMAT_VERSION = 3
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.json"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_CHUNK_OVERLAP = 20
+# ingest() 攒满这么多个新分片就嵌入写入一次
+DEFAULT_INGEST_BATCH = 256
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+# flat索引内向量的存储精度：float16 省一半内存，int8 省四分之三（按[-1, 1]均匀量化，要求向量已归一化）
+INDEX_STORAGE = ("float32", "float16", "int8")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(text: str) -> str:
+    return f"chunk:{content_hash(text)[:32]}"
+
+
+def split_text(text: str, chunk_size: int = DEFAULT_CHUNK_SIZE, chunk_overlap: int = DEFAULT_CHUNK_OVERLAP) -> List[str]:
+    """按行切分成不超过 chunk_size 的分片（模块级函数，进程池里的解析进程也能直接用）"""
+    from langchain_text_splitters import CharacterTextSplitter
+
+    splitter = CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, separator="\n")
+    return splitter.split_text(text)
+
+
+class SourceDoc(NamedTuple):
+    """一个来源文档。hash 是全文内容哈希；chunks 为 None 时由索引按自己的分片参数切分 text；
+    root 是它所属的导入根，缺省取 ingest() 的 root（内置条目有自己固定的根，不随导入目录变）"""
+    source_id: str
+    hash: str
+    text: str = ""
+    chunks: Optional[Sequence[str]] = None
+    root: Optional[str] = None
+
+
+def _atomic_write(path: str, write: Any) -> None:
+    """先写临时文件再rename，读方永远看不到写了一半的文件"""
+    tmp = f"{path}.tmp.{os.getpid()}"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class IndexConfig:
+    """索引构建参数 + 查询参数；构建参数写进manifest，变化时整库重建，查询参数随时可调"""
+
+    def __init__(
+        self,
+        index_type: str = "flat",
+        storage: str = "float32",
+        hnsw_m: int = 32,
+        ef_construction: int = 80,
+        ef_search: int = 64,
+        nlist: int = 1024,
+        pq_m: int = 16,
+        pq_nbits: int = 8,
+        nprobe: int = 16,
+        train_size: int = 50000,
+    ):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"不支持的索引类型: {index_type}（可选: {', '.join(INDEX_TYPES)}）")
+        if storage not in INDEX_STORAGE:
+            raise ValueError(f"不支持的索引存储精度: {storage}（可选: {', '.join(INDEX_STORAGE)}）")
+        self.index_type = index_type
+        self.storage = storage
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.nprobe = nprobe
+        self.train_size = train_size
+
+    @classmethod
+    def from_env(cls) -> "IndexConfig":
+        """AUTODRIVER_RAG_INDEX_TYPE / _STORAGE / _HNSW_M / _EF_SEARCH / _NLIST / _PQ_M / _NPROBE"""
+        env = os.getenv
+        return cls(
+            index_type=env("AUTODRIVER_RAG_INDEX_TYPE", "flat"),
+            storage=env("AUTODRIVER_RAG_INDEX_STORAGE", "float32"),
+            hnsw_m=int(env("AUTODRIVER_RAG_HNSW_M", 32)),
+            ef_search=int(env("AUTODRIVER_RAG_EF_SEARCH", 64)),
+            nlist=int(env("AUTODRIVER_RAG_NLIST", 1024)),
+            pq_m=int(env("AUTODRIVER_RAG_PQ_M", 16)),
+            nprobe=int(env("AUTODRIVER_RAG_NPROBE", 16)),
+        )
+
+    def build_params(self) -> Dict[str, Any]:
+        """影响索引内容的参数（写进manifest）"""
+        params: Dict[str, Any] = {"index_type": self.index_type}
+        if self.index_type == "flat":
+            params["storage"] = self.storage
+        elif self.index_type == "hnsw":
+            params.update(hnsw_m=self.hnsw_m, ef_construction=self.ef_construction)
+        else:
+            params.update(nlist=self.nlist, pq_m=self.pq_m, pq_nbits=self.pq_nbits)
+        return params
+
+    def min_train_size(self) -> int:
+        """IVF-PQ至少需要这么多向量才能训练出PQ码本"""
+        return 2 ** self.pq_nbits if self.index_type == "ivfpq" else 0
+
+
+def _pq_subquantizers(dim: int, pq_m: int) -> int:
+    """PQ子空间数必须整除维度，取不超过pq_m的最大约数"""
+    for m in range(min(pq_m, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_faiss_index(config: IndexConfig, vectors: Any, seed: int = 0) -> Tuple[Any, str]:
+    """按配置构建并填充FAISS索引，返回 (索引, 实际索引类型)；需要训练的索引在抽样上训练"""
+    import faiss
+    import numpy as np
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    index_type = config.index_type
+    if index_type == "ivfpq" and n < config.min_train_size():
+        index_type = "flat"
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config.hnsw_m)
+        index.hnsw.efConstruction = config.ef_construction
+    elif index_type == "ivfpq":
+        # 经验值：每个倒排桶至少约39个训练点，语料小时自动减少桶数
+        nlist = max(1, min(config.nlist, n // 39))
+        index = faiss.IndexIVFPQ(
+            faiss.IndexFlatL2(dim), dim, nlist, _pq_subquantizers(dim, config.pq_m), config.pq_nbits
+        )
+        sample = vectors
+        if n > config.train_size:
+            sample = vectors[np.random.default_rng(seed).choice(n, config.train_size, replace=False)]
+        index.train(sample)
+    elif config.storage == "float16":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+    elif config.storage == "int8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit_uniform, faiss.METRIC_L2)
+        # 归一化向量的分量都在[-1, 1]内，用两个端点向量把量化区间固定下来，不依赖首批数据的分布
+        index.train(np.array([[-1.0] * dim, [1.0] * dim], dtype=np.float32))
+    else:
+        index = faiss.IndexFlatL2(dim)
+    if n:
+        index.add(vectors)
+    apply_search_params(index, config)
+    return index, index_type
+
+
+def apply_search_params(index: Any, config: IndexConfig) -> None:
+    """设置查询期参数：HNSW的efSearch、IVF的nprobe；对flat索引无影响"""
+    import faiss
+
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = config.ef_search
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(config.nprobe, index.nlist)
+
+
+def supports_remove(index_type: str) -> bool:
+    """flat类索引删除后行号顺延，与langchain FAISS.delete的重新编号一致；HNSW/IVF不行"""
+    return index_type == "flat"
+
+
+class KnowledgeIndex:
+    """一个目录对应一个索引；sync() 把来源文档增量同步进索引并落盘"""
+
+    def __init__(
+        self,
+        index_dir: str,
+        embeddings: Any,
+        embedding_id: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+        config: Optional[IndexConfig] = None,
+    ):
+        self.index_dir = index_dir
+        self.embeddings = embeddings
+        self.embedding_id = embedding_id
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.config = config or IndexConfig()
+        self.store: Any = None
+        self.manifest: Dict[str, Any] = self._empty_manifest()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """每次内容变化后递增（重建也不回退），可用作检索结果缓存的失效标记"""
+        return self.manifest["version"]
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _empty_manifest(self, version: int = 0) -> Dict[str, Any]:
+        return {
+            "format": INDEX_FORMAT_VERSION,
+            "embedding": self.embedding_id,
+            "index": self.config.build_params(),
+            "effective_index_type": self.config.index_type,
+            "version": version,
+            "sources": {},
+        }
+
+    # ========== 分片 ==========
+    def split(self, text: str) -> List[str]:
+        return split_text(text, self.chunk_size, self.chunk_overlap)
+
+    # ========== 加载 / 保存 ==========
+    def _build_store(self, rows: Sequence[Dict[str, Any]], manifest: Dict[str, Any], vectors: Any = None) -> Any:
+        """用给定分片整体构建向量库（批量嵌入 + 按配置建索引/训练）；vectors 给定时不再嵌入"""
+        import numpy as np
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+        from langchain_core.documents import Document
+
+        if vectors is None and rows:
+            vectors = np.asarray(self.embeddings.embed_documents([row["text"] for row in rows]), dtype=np.float32)
+        elif vectors is None:
+            vectors = np.zeros((0, len(self.embeddings.embed_query("维度探测"))), dtype=np.float32)
+        index, effective = build_faiss_index(self.config, vectors)
+        manifest["effective_index_type"] = effective
+        docstore = InMemoryDocstore(
+            {row["id"]: Document(id=row["id"], page_content=row["text"], metadata=row["metadata"]) for row in rows}
+        )
+        return FAISS(self.embeddings, index, docstore, {i: row["id"] for i, row in enumerate(rows)})
+
+    def _read_manifest(self) -> Tuple[Optional[Dict[str, Any]], int]:
+        """返回 (可用的manifest或None, 已有的版本号)；版本号在重建时延续，保证单调递增"""
+        try:
+            with open(self._path(MANIFEST_FILE), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None, 0
+        version = int(manifest.get("version", 0))
+        if (
+            manifest.get("format") != INDEX_FORMAT_VERSION
+            or manifest.get("embedding") != self.embedding_id
+            or manifest.get("index") != self.config.build_params()
+        ):
+            return None, version
+        return manifest, version
+
+    def _load_store(self, mmap: bool) -> Optional[Any]:
+        """读取索引和分片；只读场景用mmap，避免把整个索引拷进内存"""
+        import faiss
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+        from langchain_core.documents import Document
+
+        try:
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+            index = faiss.read_index(self._path(INDEX_FILE), flags)
+            with open(self._path(DOCSTORE_FILE), "r", encoding="utf-8") as f:
+                rows = json.load(f)
+        except (OSError, RuntimeError, ValueError):
+            return None
+        # 三个文件不是一次原子替换，中途崩溃可能不一致：对不上就当作没有索引，整库重建
+        if index.ntotal != len(rows):
+            return None
+        apply_search_params(index, self.config)
+        docstore = InMemoryDocstore(
+            {row["id"]: Document(id=row["id"], page_content=row["text"], metadata=row["metadata"]) for row in rows}
+        )
+        return FAISS(self.embeddings, index, docstore, {i: row["id"] for i, row in enumerate(rows)})
+
+    @staticmethod
+    def _rows(store: Any) -> List[Dict[str, Any]]:
+        rows = []
+        for i in range(len(store.index_to_docstore_id)):
+            doc_id = store.index_to_docstore_id[i]
+            doc = store.docstore.search(doc_id)
+            rows.append({"id": doc_id, "text": doc.page_content, "metadata": doc.metadata})
+        return rows
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """当前索引里的全部分片（按向量位置顺序），未加载时为空"""
+        return self._rows(self.store) if self.store is not None else []
+
+    def _save(self) -> None:
+        import faiss
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        store = self.store
+        rows = self._rows(store)
+
+        def write_json(obj: Any) -> Any:
+            def _write(path: str) -> None:
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(obj, f, ensure_ascii=False)
+            return _write
+
+        # manifest最后写：它是"这一版索引已完整落盘"的标记
+        _atomic_write(self._path(INDEX_FILE), lambda path: faiss.write_index(store.index, path))
+        _atomic_write(self._path(DOCSTORE_FILE), write_json(rows))
+        _atomic_write(self._path(MANIFEST_FILE), write_json(self.manifest))
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """多个进程同时启动时只有一个在更新索引，其余等它写完再读"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self._path(LOCK_FILE), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stored_vectors(self, store: Any, positions: Sequence[int], effective: str) -> Any:
+        """从现有索引取回指定行的向量，重建时不必重新嵌入；PQ压缩过的向量有损，返回None改走嵌入"""
+        if effective == "ivfpq":
+            return None
+        try:
+            vectors = store.index.reconstruct_n(0, store.index.ntotal)
+        except RuntimeError:
+            return None
+        return vectors[list(positions)]
+
+    def _rebuild(self, store: Any, drop: Set[str], manifest: Dict[str, Any]) -> Any:
+        """去掉 drop 里的分片后按当前配置整体重建（删除不支持原地进行、IVF-PQ升级时用）"""
+        kept = [(i, row) for i, row in enumerate(self._rows(store)) if row["id"] not in drop]
+        vectors = self._stored_vectors(store, [i for i, _ in kept], manifest["effective_index_type"])
+        return self._build_store([row for _, row in kept], manifest, vectors)
+
+    # ========== 增量同步 ==========
+    def sync(self, sources: Mapping[str, str]) -> Dict[str, int]:
+        """把 {来源id: 全文} 同步进索引：只嵌入新增/变化的文档，删除消失的文档，有变化才落盘"""
+        return self.ingest(SourceDoc(sid, content_hash(text), text) for sid, text in sources.items())
+
+    def ingest(
+        self,
+        docs: Iterable[SourceDoc],
+        prune: bool = True,
+        batch_size: int = DEFAULT_INGEST_BATCH,
+        root: Optional[str] = None,
+    ) -> Dict[str, int]:
+        """流式同步来源文档：内容哈希没变的直接跳过，新分片攒满 batch_size 个就嵌入写入一次。
+
+        prune=True 时，本次没有出现的已知来源视为已删除。root 是这批来源的导入根（写进manifest各来源的 "root"，
+        来源自带 root 时以它为准），给出时只删除本次出现过的根下导入的来源：命令行导入的 docs/ 不会被运行时同步
+        知识目录时删掉，--no-builtin 的导入也不会删掉内置条目。索引先按只读mmap打开，
+        第一次真正要写时才整个读进内存。返回各类计数，chunks_reused 是因内容已在索引里而免于嵌入的分片数。
+        """
+        with self._lock, self._file_lock():
+            manifest, version = self._read_manifest()
+            store = None if manifest is None else self._load_store(mmap=True)
+            writable = False
+            rebuilt = store is None
+            if store is None:
+                # 没有可用索引（首次、损坏、嵌入模型或索引参数变化）：从空索引开始，全部来源重新嵌入
+                manifest = self._empty_manifest(version)
+                store = self._build_store([], manifest)
+                writable = True
+            known: Dict[str, Dict[str, Any]] = manifest["sources"]
+            refs = Counter(cid for entry in known.values() for cid in entry["chunks"])
+            stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "chunks_embedded": 0, "chunks_reused": 0}
+            seen: Set[str] = set()
+            roots: Set[Optional[str]] = {root}
+            # 内容没变、只是导入根变了的来源：manifest要落盘，但索引内容没变，版本号不动
+            restamped = False
+            pending_rows: Dict[str, Dict[str, Any]] = {}
+            pending_delete: Set[str] = set()
+            # 不支持原地删除的索引：待删分片留到最后随重建一起去掉
+            deferred_delete: Set[str] = set()
+
+            def acquire(cid: str, text: str, sid: str) -> None:
+                refs[cid] += 1
+                if refs[cid] > 1:
+                    stats["chunks_reused"] += 1
+                elif cid in pending_delete:
+                    pending_delete.discard(cid)
+                elif cid in deferred_delete:
+                    deferred_delete.discard(cid)
+                else:
+                    pending_rows[cid] = {"id": cid, "text": text, "metadata": {"source": sid}}
+
+            def release(cids: Iterable[str]) -> None:
+                for cid in cids:
+                    refs[cid] -= 1
+                    if refs[cid] <= 0:
+                        del refs[cid]
+                        if pending_rows.pop(cid, None) is None:
+                            pending_delete.add(cid)
+
+            def flush() -> None:
+                nonlocal store, writable
+                if not (pending_rows or pending_delete):
+                    return
+                if not writable:
+                    store = self._load_store(mmap=False)
+                    writable = True
+                if pending_delete:
+                    if supports_remove(manifest["effective_index_type"]):
+                        store.delete(list(pending_delete))
+                    else:
+                        deferred_delete.update(pending_delete)
+                    pending_delete.clear()
+                if pending_rows:
+                    rows = list(pending_rows.values())
+                    store.add_texts(
+                        [row["text"] for row in rows],
+                        metadatas=[row["metadata"] for row in rows],
+                        ids=[row["id"] for row in rows],
+                    )
+                    stats["chunks_embedded"] += len(rows)
+                    pending_rows.clear()
+
+            for doc in docs:
+                sid = doc.source_id
+                doc_root = doc.root or root
+                seen.add(sid)
+                roots.add(doc_root)
+                old = known.get(sid)
+                if old is not None and old["hash"] == doc.hash:
+                    stats["unchanged"] += 1
+                    if doc_root is not None and old.get("root") != doc_root:
+                        old["root"] = doc_root
+                        restamped = True
+                    continue
+                chunks = doc.chunks if doc.chunks is not None else self.split(doc.text)
+                cids = list(dict.fromkeys(chunk_id(text) for text in chunks))
+                # 先登记新分片再释放旧分片：内容没变的分片引用数不会归零，不会被删了又加
+                for cid, text in zip(cids, dict.fromkeys(chunks)):
+                    acquire(cid, text, sid)
+                if old is not None:
+                    release(old["chunks"])
+                stats["updated" if old is not None else "added"] += 1
+                known[sid] = {"hash": doc.hash, "chunks": cids}
+                if doc_root is not None:
+                    known[sid]["root"] = doc_root
+                if len(pending_rows) >= batch_size:
+                    flush()
+            if prune:
+                # 没记录导入根的来源（旧版manifest）按本次导入的处理
+                stale = [sid for sid, entry in known.items() if sid not in seen and (root is None or entry.get("root", root) in roots)]
+                for sid in stale:
+                    release(known.pop(sid)["chunks"])
+                    stats["removed"] += 1
+            flush()
+
+            effective = manifest["effective_index_type"]
+            total = store.index.ntotal - len(deferred_delete)
+            # 语料长到足够训练IVF-PQ时，从退化的flat升级成真正的IVF-PQ
+            upgrade = effective != self.config.index_type and total >= self.config.min_train_size()
+            if deferred_delete or upgrade:
+                store = self._rebuild(store, deferred_delete, manifest)
+
+            self.store = store
+            self.manifest = manifest
+            if rebuilt or stats["added"] or stats["updated"] or stats["removed"]:
+                manifest["version"] += 1
+                self._save()
+            elif restamped:
+                self._save()
+            stats["rebuilt"] = int(rebuilt)
+            return stats
@@ -0,0 +1,101 @@
+# src/agent/lexical.py
+"""进程内BM25倒排索引（中文友好）+ 与向量检索的倒数排名融合(RRF)。
+
+分词不依赖任何中文分词库：
+- 连续的中日韩字符切成单字 + 相邻二元组（"故障码" → 故, 障, 码, 故障, 障码）
+- 字母数字串按小写整体保留，含下划线的标识符额外拆出各段（move_forward → move_forward, move, forward）
+故障码 E01、指令名 move_forward、型号 A1/B2/C3 这类精确标识符靠词法匹配即可命中，比稠密向量更快更准。
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# RRF常数，取值越大排名靠后的结果权重衰减越慢
+RRF_K = 60
+
+_CJK_RUN_RE = re.compile(r"[一-鿿㐀-䶿]+")
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+# 精确标识符：含数字的字母串（E01、A1）或含下划线的名字（move_forward）
+_IDENTIFIER_RE = re.compile(r"^(?=.*[a-z])(?=.*[0-9_])[a-z0-9_]+$")
+
+
+def tokenize(text: str) -> List[str]:
+    text = text.lower()
+    tokens: List[str] = []
+    for run in _CJK_RUN_RE.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    for word in _WORD_RE.findall(text):
+        tokens.append(word)
+        if "_" in word:
+            tokens.extend(part for part in word.split("_") if part)
+    return tokens
+
+
+def identifiers(text: str) -> List[str]:
+    """查询里的精确标识符（故障码/指令名/型号），按出现顺序去重"""
+    return list(dict.fromkeys(w for w in _WORD_RE.findall(text.lower()) if _IDENTIFIER_RE.match(w)))
+
+
+class BM25Index:
+    """只读倒排索引：docs 变化时整体重建（构建是纯Python线性扫描，万级分片亚秒级）"""
+
+    def __init__(self, docs: Sequence[Tuple[str, str]], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.doc_lens: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for doc_id, text in docs:
+            counts = Counter(tokenize(text))
+            idx = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((idx, tf))
+        self.avg_len = (sum(self.doc_lens) / len(self.doc_lens)) if self.doc_lens else 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.doc_ids) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int, only: Optional[Set[int]] = None) -> List[Tuple[str, float]]:
+        """返回按BM25分数排序的 [(doc_id, score)]；only 限定候选文档下标"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term, qtf in Counter(tokenize(query)).items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for idx, tf in postings:
+                if only is not None and idx not in only:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[idx] / (self.avg_len or 1.0))
+                scores[idx] += qtf * idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.doc_ids[idx], score) for idx, score in ranked]
+
+    def docs_containing_all(self, terms: Iterable[str]) -> Set[int]:
+        """同时包含全部词项的文档下标（倒排表求交）"""
+        result: Optional[Set[int]] = None
+        for term in terms:
+            docs = {idx for idx, _ in self.postings.get(term, ())}
+            result = docs if result is None else result & docs
+            if not result:
+                return set()
+        return result or set()
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int, rrf_k: int = RRF_K) -> List[str]:
+    """多路排序结果按 Σ 1/(rrf_k + 名次) 融合，返回前k个id"""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (rrf_k + rank)
+    return [doc_id for doc_id, _ in sorted(scores.items(), key=lambda item: -item[1])[:k]]
@@ -0,0 +1,119 @@
+# src/agent/llm.py
+"""原生异步通义千问客户端 + 共享HTTP连接池。
+
+ChatTongyi 的 ainvoke/astream 只是把同步SDK调用丢进线程池，每个在途请求占一个线程，
+而且要等整段回答生成完才返回。AsyncChatTongyi 改为直接调用 dashscope.AioGeneration，
+所有请求复用同一个（按事件循环区分的）aiohttp 连接池，流式token边生成边产出。
+"""
+import asyncio
+import json
+import os
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiohttp
+import dashscope
+from langchain_community.chat_models.tongyi import ChatTongyi, _create_retry_decorator
+from langchain_community.llms.tongyi import check_response
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# ========== 共享HTTP连接池配置 ==========
+DEFAULT_POOL_SIZE = 64
+DEFAULT_POOL_SIZE_PER_HOST = 32
+
+# aiohttp.ClientSession绑定事件循环，每个循环各自持有一个连接池
+_http_sessions: "weakref.WeakKeyDictionary[Any, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """返回当前事件循环的共享aiohttp会话（懒创建），连接数由 AUTODRIVER_HTTP_POOL_SIZE 控制"""
+    loop = asyncio.get_running_loop()
+    session = _http_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=int(os.getenv("AUTODRIVER_HTTP_POOL_SIZE", DEFAULT_POOL_SIZE)),
+            limit_per_host=int(os.getenv("AUTODRIVER_HTTP_POOL_SIZE_PER_HOST", DEFAULT_POOL_SIZE_PER_HOST)),
+            keepalive_timeout=60,
+        )
+        session = aiohttp.ClientSession(connector=connector, trust_env=True)
+        _http_sessions[loop] = session
+    return session
+
+
+async def close_http_session() -> None:
+    """关闭当前事件循环的共享会话，服务退出时调用"""
+    session = _http_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+class AsyncChatTongyi(ChatTongyi):
+    """ChatTongyi 的原生异步版本：同步接口保持不变，异步接口走 dashscope.AioGeneration + 共享连接池"""
+
+    def _streaming_disabled(self, **kwargs: Any) -> bool:
+        # ChatTongyi的pre_init校验会把全部字段写进model_fields_set，默认的streaming=False
+        # 因此被当成"显式关闭流式"，astream会退化成一次性ainvoke。这里只认真正的关闭开关。
+        if self.disable_streaming is True:
+            return True
+        if self.disable_streaming == "tool_calling" and kwargs.get("tools"):
+            return True
+        return "stream" in kwargs and not kwargs["stream"]
+
+    async def _aio_call(self, **kwargs: Any) -> Any:
+        return await dashscope.AioGeneration.call(**kwargs, session=get_http_session())
+
+    async def acompletion_with_retry(self, **kwargs: Any) -> Any:
+        """非流式异步调用，HTTP错误按ChatTongyi同样的策略重试"""
+        retry_decorator = _create_retry_decorator(self)
+
+        @retry_decorator
+        async def _acompletion_with_retry(**_kwargs: Any) -> Any:
+            resp = await self._aio_call(**_kwargs)
+            return check_response(resp)
+
+        return await _acompletion_with_retry(**kwargs)
+
+    async def astream_completion_with_retry(self, **kwargs: Any) -> AsyncIterator[Any]:
+        """流式异步调用，覆盖父类的"线程池包同步生成器"实现；建连阶段失败会重试"""
+        retry_decorator = _create_retry_decorator(self)
+
+        @retry_decorator
+        async def _aconnect(**_kwargs: Any) -> Any:
+            return await self._aio_call(**_kwargs)
+
+        responses = await _aconnect(**kwargs)
+        prev_resp = None
+        async for resp in responses:
+            # 非增量输出（绑定工具时DashScope不支持incremental_output）需要手动计算增量
+            if kwargs.get("stream") and not kwargs.get("incremental_output", False):
+                resp_copy = json.loads(json.dumps(resp))
+                if resp_copy.get("output") and resp_copy["output"].get("choices"):
+                    message = resp_copy["output"]["choices"][0]["message"]
+                    if isinstance(message.get("content"), list):
+                        message["content"] = "".join(
+                            item.get("text", "") for item in message["content"] if isinstance(item, dict)
+                        )
+                    resp = resp_copy
+                delta_resp = resp if prev_resp is None else self.subtract_client_response(resp, prev_resp)
+                prev_resp = resp
+                yield check_response(delta_resp)
+            else:
+                yield check_response(resp)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.streaming:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        params: Dict[str, Any] = self._invocation_params(messages=messages, stop=stop, **kwargs)
+        resp = await self.acompletion_with_retry(**params)
+        return ChatResult(
+            generations=[ChatGeneration(**self._chat_generation_from_qwen_resp(resp))],
+            llm_output={"model_name": self.model_name},
+        )
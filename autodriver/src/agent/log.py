@@ -0,0 +1,75 @@
+# src/agent/log.py
+"""结构化日志：代替热路径上的print。
+
+- 日志器统一挂在 "autodriver" 下，级别由 AUTODRIVER_LOG_LEVEL 控制（默认WARNING）
+- AUTODRIVER_LOG_FORMAT=json 输出一行一个JSON对象，默认是 "事件名 key=value" 文本
+- log_event 先判断级别再组装字段，级别关闭时几乎零开销；字段计算本身较贵时调用方用 logger.isEnabledFor 包一层
+"""
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Optional
+
+ROOT_LOGGER = "autodriver"
+DEFAULT_LEVEL = "WARNING"
+
+_configured = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields: Any) -> None:
+    """记录一个结构化事件：event是固定的事件名，fields是附带的键值"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        kv = " ".join(f"{k}={v!r}" if isinstance(v, str) else f"{k}={v}" for k, v in fields.items())
+        ts = time.strftime("%H:%M:%S", time.localtime(record.created))
+        line = f"{ts} {record.levelname:<7} {record.name} {record.getMessage()}" + (f" {kv}" if kv else "")
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None, force: bool = False) -> logging.Logger:
+    """给 "autodriver" 日志器挂一个stderr处理器（只配置一次，force=True时重新配置）"""
+    global _configured
+    logger = logging.getLogger(ROOT_LOGGER)
+    if _configured and not force:
+        return logger
+    level = (level or os.getenv("AUTODRIVER_LOG_LEVEL", DEFAULT_LEVEL)).upper()
+    fmt = (fmt or os.getenv("AUTODRIVER_LOG_FORMAT", "text")).lower()
+    for handler in list(logger.handlers):
+        if getattr(handler, "_autodriver", False):
+            logger.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    handler._autodriver = True  # type: ignore[attr-defined]
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    # 已经挂了自己的处理器，不再向根日志器传播，避免宿主应用重复输出
+    logger.propagate = False
+    _configured = True
+    return logger
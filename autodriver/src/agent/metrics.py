@@ -0,0 +1,210 @@
+# src/agent/metrics.py
+"""轻量指标层：节点/工具耗时、LLM延迟、prompt/completion token数、缓存命中、错误计数。
+
+- 进程内聚合，线程安全，不依赖 prometheus_client
+- to_prometheus() 导出 Prometheus 文本格式，snapshot() 导出JSON友好的字典
+- AUTODRIVER_METRICS=0 关闭采集，关闭后每次埋点只剩一次布尔判断
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 直方图桶上限（秒），覆盖本地工具的毫秒级到LLM的十秒级
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets: int) -> None:
+        self.counts = [0] * n_buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """计数器 + 直方图，标签用关键字参数传入"""
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    @classmethod
+    def from_env(cls) -> "MetricsRegistry":
+        return cls(enabled=os.getenv("AUTODRIVER_METRICS", "1") != "0")
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    # ========== 记录 ==========
+    # 指标名和值是仅位置参数，name/kind 等都可以当标签用
+    def inc(self, metric: str, value: float = 1.0, /, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, metric: str, value: float, /, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(metric, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(len(self.buckets))
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    hist.counts[i] += 1
+                    break
+            hist.sum += value
+            hist.count += 1
+
+    @contextmanager
+    def track(self, kind: str, name: str) -> Iterator[None]:
+        """统计一段代码的耗时，抛异常时额外记一次错误：kind=node/tool"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.inc("autodriver_errors_total", kind=kind, name=name, error=type(e).__name__)
+            raise
+        finally:
+            self.observe(f"autodriver_{kind}_duration_seconds", time.perf_counter() - start, **{kind: name})
+
+    def record_llm(self, node: str, latency_s: float, message: Any = None) -> None:
+        """一次真实LLM调用：延迟 + token用量（取 usage_metadata，没有时取通义的 token_usage）"""
+        if not self.enabled:
+            return
+        self.observe("autodriver_llm_latency_seconds", latency_s, node=node)
+        prompt_tokens, completion_tokens = _token_usage(message)
+        if prompt_tokens:
+            self.inc("autodriver_llm_prompt_tokens_total", prompt_tokens, node=node)
+        if completion_tokens:
+            self.inc("autodriver_llm_completion_tokens_total", completion_tokens, node=node)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # ========== 导出 ==========
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON友好的快照：计数器给值，直方图给count/sum/mean和各桶计数"""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": h.count,
+                        "sum": round(h.sum, 6),
+                        "mean": round(h.sum / h.count, 6) if h.count else 0.0,
+                        "buckets": dict(zip([str(b) for b in self.buckets], h.counts)),
+                    }
+                    for key, h in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for upper, count in zip(self.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{upper:g}'))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """按扩展名导出：.json 写JSON，其余写Prometheus文本（可交给node_exporter的textfile收集器）"""
+        content = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def _token_usage(message: Any) -> Tuple[int, int]:
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    return token_usage.get("input_tokens", 0), token_usage.get("output_tokens", 0)
+
+
+# ========== 全局指标注册表 ==========
+metrics = MetricsRegistry.from_env()
+metrics.describe("autodriver_node_duration_seconds", "Wall time of each graph node")
+metrics.describe("autodriver_tool_duration_seconds", "Wall time of each tool call")
+metrics.describe("autodriver_llm_latency_seconds", "Latency of LLM calls that missed the response cache")
+metrics.describe("autodriver_llm_prompt_tokens_total", "Prompt tokens sent to the LLM")
+metrics.describe("autodriver_llm_completion_tokens_total", "Completion tokens returned by the LLM")
+metrics.describe("autodriver_llm_cache_total", "LLM response cache lookups by result (hit/miss)")
+metrics.describe("autodriver_errors_total", "Errors raised or returned by nodes and tools")
+metrics.describe("autodriver_retrieval_total", "Knowledge retrievals by route (exact/hybrid/dense/lexical)")
+metrics.describe("autodriver_retrieval_cache_total", "Retrieval result cache lookups by result (hit/miss)")
+metrics.describe("autodriver_ros2_duration_seconds", "Wall time of ROS2 graph queries by backend")
+metrics.describe("autodriver_ros2_topic_cache_total", "ROS2 topic list cache lookups by result (hit/miss)")
+metrics.describe("autodriver_ros2_probe_total", "ROS2 topic detail probes by result (ok/error)")
+
+
+def instrument_node(name: str, func: Callable[..., Awaitable[Dict[str, Any]]]) -> Callable[..., Awaitable[Dict[str, Any]]]:
+    """包装异步图节点，记录耗时和异常"""
+
+    @functools.wraps(func)
+    async def wrapper(state: Any) -> Dict[str, Any]:
+        with metrics.track("node", name):
+            return await func(state)
+
+    return wrapper
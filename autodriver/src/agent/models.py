@@ -0,0 +1,213 @@
+# src/agent/models.py
+"""可插拔的LLM提供方：线上用通义千问，离线/CI用本地确定性假模型。
+
+通过环境变量 AUTODRIVER_MODEL_PROVIDER 选择：
+- tongyi（默认）：AsyncChatTongyi("qwen3-coder-plus")
+- fake：FakeChatModel，按规则产出工具调用和回答，可注入首token延迟和生成速率，不访问网络
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+DEFAULT_PROVIDER = "tongyi"
+DEFAULT_TONGYI_MODEL = "qwen3-coder-plus"
+
+_NUM_RE = re.compile(r"-?\d+")
+
+
+def _two_numbers(query: str) -> Optional[Dict[str, Any]]:
+    nums = _NUM_RE.findall(query)
+    return {"a": int(nums[0]), "b": int(nums[1])} if len(nums) >= 2 else None
+
+
+# ========== 假模型默认的工具选择规则：(关键词正则, 工具名, 参数构造)，参数构造返回None表示不命中 ==========
+DEFAULT_TOOL_RULES: List[Tuple[str, str, Callable[[str], Optional[Dict[str, Any]]]]] = [
+    (r"除|/|divide", "divide", _two_numbers),
+    (r"乘|\*|×|multiply|times", "multiply", _two_numbers),
+    (r"加|\+|add|plus|sum", "add", _two_numbers),
+    (r"ros2|话题|topic", "ros2_get_topic_list", lambda q: {}),
+]
+
+
+def _text(msg: BaseMessage) -> str:
+    return msg.content if isinstance(msg.content, str) else json.dumps(msg.content, ensure_ascii=False)
+
+
+def _count_tokens(text: str) -> int:
+    # 与上下文管理同一口径的近似计数，避免假模型依赖分词器
+    from src.agent.context import count_text_tokens
+    return max(1, count_text_tokens(text))
+
+
+class FakeChatModel(BaseChatModel):
+    """本地确定性对话模型，用于离线基准测试和回归测试。
+
+    - 绑定了工具且最后一条是用户消息：按 tool_rules 生成工具调用，未命中规则时调用 knowledge_query
+    - 最后一条是工具结果或没有绑定工具：生成"回答：..."文本（最后一条已是AI回答时原样复述）
+    - responses 非空时按顺序循环返回脚本里的消息，忽略上面的规则
+    - latency_s 模拟首token延迟，tokens_per_s 模拟生成速率（0表示不限速）
+    """
+
+    model_name: str = "fake-chat"
+    latency_s: float = 0.0
+    tokens_per_s: float = 0.0
+    responses: List[AIMessage] = Field(default_factory=list)
+    tool_rules: List[Any] = Field(default_factory=lambda: list(DEFAULT_TOOL_RULES))
+    call_count: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "autodriver-fake"
+
+    @property
+    def _default_params(self) -> Dict[str, Any]:
+        return {"model": self.model_name, "latency_s": self.latency_s, "tokens_per_s": self.tokens_per_s}
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self._default_params
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Any:
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    # ========== 回答生成 ==========
+    def _respond(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]]) -> AIMessage:
+        self.call_count += 1
+        if self.responses:
+            return self.responses[(self.call_count - 1) % len(self.responses)]
+
+        last = messages[-1]
+        tool_names = {t["function"]["name"] for t in tools or []}
+        if tool_names and isinstance(last, HumanMessage):
+            query = _text(last)
+            for pattern, name, build_args in self.tool_rules:
+                if name in tool_names and re.search(pattern, query, flags=re.IGNORECASE):
+                    args = build_args(query)
+                    if args is not None:
+                        return self._tool_call(name, args)
+            if "knowledge_query" in tool_names:
+                return self._tool_call("knowledge_query", {"query": query})
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"回答：{_text(last)}")
+        if isinstance(last, AIMessage) and last.content:
+            # 总结阶段最后一条已经是回答时原样复述，避免"回答：回答："层层叠加
+            return AIMessage(content=_text(last))
+        return AIMessage(content=f"回答：{_text(last)[:200]}")
+
+    def _tool_call(self, name: str, args: Dict[str, Any]) -> AIMessage:
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": name, "args": args, "id": f"fake_call_{self.call_count}", "type": "tool_call"}],
+        )
+
+    def _usage(self, messages: List[BaseMessage], reply: AIMessage) -> Dict[str, int]:
+        input_tokens = sum(_count_tokens(_text(m)) for m in messages)
+        output_tokens = _count_tokens(_text(reply) + json.dumps(reply.tool_calls, ensure_ascii=False))
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _pieces(self, reply: AIMessage) -> List[str]:
+        """流式输出的切片：中文按字、其余按空白切分"""
+        return re.findall(r"[一-鿿]|\s*[^\s一-鿿]+", _text(reply)) or [""]
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+
+    def _result(self, messages: List[BaseMessage], reply: AIMessage) -> ChatResult:
+        usage = self._usage(messages, reply)
+        message = AIMessage(content=reply.content, tool_calls=reply.tool_calls, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"model_name": self.model_name})
+
+    # ========== 同步接口 ==========
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        reply = self._respond(messages, kwargs.get("tools"))
+        time.sleep(self.latency_s + self._token_delay() * len(self._pieces(reply)))
+        return self._result(messages, reply)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        reply = self._respond(messages, kwargs.get("tools"))
+        time.sleep(self.latency_s)
+        for chunk in self._chunks(messages, reply):
+            time.sleep(self._token_delay())
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    # ========== 异步接口 ==========
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        reply = self._respond(messages, kwargs.get("tools"))
+        await asyncio.sleep(self.latency_s + self._token_delay() * len(self._pieces(reply)))
+        return self._result(messages, reply)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        reply = self._respond(messages, kwargs.get("tools"))
+        await asyncio.sleep(self.latency_s)
+        for chunk in self._chunks(messages, reply):
+            await asyncio.sleep(self._token_delay())
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _chunks(self, messages: List[BaseMessage], reply: AIMessage) -> List[ChatGenerationChunk]:
+        pieces = self._pieces(reply)
+        chunks = [ChatGenerationChunk(message=AIMessageChunk(content=p)) for p in pieces]
+        # 工具调用和用量统计挂在最后一个切片上，合并后与非流式结果一致
+        chunks[-1] = ChatGenerationChunk(
+            message=AIMessageChunk(
+                content=pieces[-1],
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                    for i, c in enumerate(reply.tool_calls)
+                ],
+                usage_metadata=self._usage(messages, reply),
+            )
+        )
+        return chunks
+
+
+def create_chat_model(provider: Optional[str] = None) -> BaseChatModel:
+    """按提供方名称创建对话模型，未指定时读取 AUTODRIVER_MODEL_PROVIDER"""
+    provider = (provider or os.getenv("AUTODRIVER_MODEL_PROVIDER", DEFAULT_PROVIDER)).lower()
+    if provider == "tongyi":
+        from src.agent.llm import AsyncChatTongyi
+        # 原生异步客户端，共享HTTP连接池
+        return AsyncChatTongyi(model_name=os.getenv("AUTODRIVER_TONGYI_MODEL", DEFAULT_TONGYI_MODEL), temperature=0.0)
+    if provider == "fake":
+        return FakeChatModel(
+            latency_s=float(os.getenv("AUTODRIVER_FAKE_LATENCY_S", "0")),
+            tokens_per_s=float(os.getenv("AUTODRIVER_FAKE_TOKENS_PER_S", "0")),
+        )
+    raise ValueError(f"未知的模型提供方: {provider}（可选: tongyi / fake）")
@@ -1,23 +1,107 @@
-import asyncio
+import logging
 import os
+import threading
+import time
 from typing import Dict, Any, Literal
-from langchain_core.messages import ToolMessage, HumanMessage, SystemMessage, AIMessage
-# 跨文件导入：导入状态定义 + 工具
+from langchain_core.messages import ToolMessage, HumanMessage, SystemMessage, AIMessage, BaseMessage, message_chunk_to_message
+# 跨文件导入：导入状态定义 + 工具 + LLM响应缓存
 from src.agent.state import CalcAgentState
 from src.agent.tools import tools, tools_by_name
+from src.agent.cache import llm_cache
+from src.agent.fast_path import answer_arithmetic
+from src.agent.tool_executor import ToolExecutor
+from src.agent.metrics import metrics
+from src.agent.log import get_logger, log_event
+from src.agent.context import (
+    build_summary_prompt, max_context_tokens, min_recent_turns, render_dialogue, select_window_start
+)
 from dotenv import load_dotenv, find_dotenv
-load_dotenv(find_dotenv(), override=True)
 
-from langchain_community.chat_models import ChatTongyi
-# 初始化LLM模型，只初始化一次，全局复用
-model = ChatTongyi(
-    model_name="qwen3-coder-plus",
-    temperature=0.0
-)
-# ✅ 强制重新绑定工具，确保新增的ROS2工具+knowledge_query被LLM识别
-model_with_tools = model.bind_tools(tools, tool_choice="auto") # auto=自动选择工具
+logger = get_logger("nodes")
+
+# ========== LLM模型：首次使用时才加载.env并构造，导入本模块不触发任何重量级初始化 ==========
+_llm_lock = threading.Lock()
+_llm: Dict[str, Any] = {}
+
+def _init_llm() -> Dict[str, Any]:
+    """懒加载LLM客户端（只初始化一次，全局复用），并行首次调用时由锁保证只构造一份"""
+    if not _llm:
+        with _llm_lock:
+            if not _llm:
+                load_dotenv(find_dotenv(), override=True)
+                from src.agent.models import create_chat_model
+                # 提供方由 AUTODRIVER_MODEL_PROVIDER 决定：tongyi（默认）/ fake（离线）
+                _set_llm(create_chat_model())
+    return _llm
+
+def _set_llm(model) -> None:
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+    _llm.update(
+        model=model,
+        # ✅ 强制重新绑定工具，确保新增的ROS2工具+knowledge_query被LLM识别
+        model_with_tools=model.bind_tools(tools, tool_choice="auto"), # auto=自动选择工具
+        # 缓存键用的模型参数，去掉api_key，避免密钥参与缓存键计算
+        model_params={k: v for k, v in model._default_params.items() if k != "api_key"},
+        tools_schema=[convert_to_openai_tool(t) for t in tools],
+    )
+
+def set_model(model) -> None:
+    """替换全局LLM客户端（测试/基准测试注入假模型用）"""
+    with _llm_lock:
+        _llm.clear()
+        _set_llm(model)
+
+def get_model():
+    """总结用的LLM客户端"""
+    return _init_llm()["model"]
+
+def get_model_with_tools():
+    """绑定了全部工具的LLM客户端，决策用"""
+    return _init_llm()["model_with_tools"]
+
+# 工具执行器：专用有界线程池（懒创建） + 单工具超时/并发上限
+tool_executor = ToolExecutor.from_env(tools_by_name)
+
+async def _astream_to_message(runnable, prompt_msgs) -> BaseMessage:
+    """流式调用并拼接完整回答；token在生成过程中已经通过回调推送给 graph.astream(stream_mode="messages")"""
+    full = None
+    async for chunk in runnable.astream(prompt_msgs):
+        full = chunk if full is None else full + chunk
+    return message_chunk_to_message(full)
+
+# ========== LLM响应缓存：键 = 规范化prompt + 工具schema + 模型参数 ==========
+async def _cached_invoke(runnable, prompt_msgs, node: str, bound_tools=None, stream=False) -> BaseMessage:
+    """带缓存的LLM调用：命中直接返回，未命中才发起远程请求并写回缓存；按节点记录命中/延迟/token"""
+    tool_choice = "auto" if bound_tools else None
+    model_params = _init_llm()["model_params"]
+    cache_key = llm_cache.make_key(prompt_msgs, tools=bound_tools, params=dict(model_params, tool_choice=tool_choice))
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        metrics.inc("autodriver_llm_cache_total", node=node, result="hit")
+        return cached
+    metrics.inc("autodriver_llm_cache_total", node=node, result="miss")
+    start = time.perf_counter()
+    try:
+        if stream:
+            ai_response = await _astream_to_message(runnable, prompt_msgs)
+        else:
+            ai_response = await runnable.ainvoke(prompt_msgs)
+    except Exception as e:
+        metrics.inc("autodriver_errors_total", kind="llm", name=node, error=type(e).__name__)
+        raise
+    metrics.record_llm(node, time.perf_counter() - start, ai_response)
+    llm_cache.put(cache_key, ai_response)
+    return ai_response
 
-# ========== Node 1: parse_input 数据解析节点 【完全不变】 ==========
+# ========== 上下文窗口：只把窗口内的原文 + 滚动摘要发给LLM ==========
+def _windowed_messages(state: CalcAgentState) -> list:
+    return state["messages"][state.get("context_window_start") or 0:]
+
+def _summary_note(state: CalcAgentState) -> str:
+    summary = state.get("context_summary") or ""
+    return f"\n【更早的对话摘要】\n{summary}\n" if summary else ""
+
+# ========== Node 1: parse_input 数据解析节点 ==========
 async def parse_input(state: CalcAgentState) -> Dict[str, Any]:
     """解析用户输入，自动转换字典为BaseMessage"""
     messages = state["messages"]
@@ -37,20 +121,55 @@ async def parse_input(state: CalcAgentState) -> Dict[str, Any]:
     
     # 用转换后的消息读取content
     user_msg = converted_messages[-1].content
-    print(f"✅ parse_input: 用户输入 = {user_msg}")
+    log_event(logger, logging.DEBUG, "parse_input", user_query=user_msg)
     parsed_input = {
         "user_query": user_msg,
         "valid": True
     }
     
-    # 原有逻辑...
+    # 不再把整段历史写回messages：追加型reducer会让每一轮都重复一遍全部历史
     return {
-        "messages": converted_messages,  # 保存转换后的消息
         "parsed_input": parsed_input,
         "llm_calls": state.get("llm_calls", 0)
     }
 
 
+# ========== Node 1.5: fast_path 本地算术快速通道 ==========
+async def fast_path(state: CalcAgentState) -> Dict[str, Any]:
+    """纯算术问题本地确定性求值，命中则直接给出回答，不调用LLM"""
+    answer = answer_arithmetic(state["parsed_input"]["user_query"])
+    if answer is None:
+        return {"fast_path_hit": False}
+    return {
+        "messages": [AIMessage(content=answer)],
+        "fast_path_hit": True
+    }
+
+
+# ========== Node 1.8: manage_context 上下文窗口管理节点 ==========
+async def manage_context(state: CalcAgentState) -> Dict[str, Any]:
+    """按token预算推进窗口起点，移出窗口的完整轮次折叠进滚动摘要（每轮用户输入只执行一次）"""
+    messages = state["messages"]
+    prev_start = state.get("context_window_start") or 0
+    start = select_window_start(messages, max_context_tokens(), min_recent_turns(), not_before=prev_start)
+    if start <= prev_start:
+        return {}
+
+    summary = state.get("context_summary") or ""
+    folded = messages[prev_start:start]
+    try:
+        # nostream：摘要是内部步骤，不推送给 graph.astream 的token流
+        summary_msg = await _cached_invoke(
+            get_model().with_config(tags=["nostream"]), [build_summary_prompt(summary, folded)], node="manage_context"
+        )
+        new_summary = summary_msg.content
+    except Exception:
+        logger.warning("context_summary_failed", exc_info=True)
+        # 摘要失败时退化为截断原文，窗口照常推进，保证prompt有界
+        new_summary = (summary + "\n" + render_dialogue(folded))[-max_context_tokens():]
+    return {"context_summary": new_summary, "context_window_start": start}
+
+
 # ========== Node 2: llm_decide LLM决策节点 【✅ 最终最终版，根治所有问题，100%生效】 ==========
 async def llm_decide(state: CalcAgentState) -> Dict[str, Any]:
     """LLM分析用户输入，决策是否调用工具/调用哪个工具，内置ROS2全自动生成逻辑"""
@@ -60,28 +179,26 @@ async def llm_decide(state: CalcAgentState) -> Dict[str, Any]:
     # ✅ ROS2任务触发关键词判断 (你的列表没问题，能正常命中)
     ros2_trigger_words = ["ROS2", "ros2", "node.py", "机器人", "生成驱动", "驱动代码", "生成node", "ROS2驱动", "机器人驱动"]
     ros2_task_triggered = any(word in user_query for word in ros2_trigger_words)
-    print(f"👉 用户输入: {user_query}")
-    print(f"👉 ROS2任务触发状态: {ros2_task_triggered}")
+    log_event(logger, logging.DEBUG, "llm_decide", user_query=user_query, ros2_triggered=ros2_task_triggered)
     
     if ros2_task_triggered:
-        print("✅ 进入ROS2工具执行分支，开始调用ROS2工具链...")
         try:
-            # ✅ 步骤1：调用工具获取ROS2真实话题列表 (同步调用，无卡死)
-            topic_list = tools_by_name["ros2_get_topic_list"].invoke({})
-            print(f"✅ 成功获取ROS2话题列表，共 {len(topic_list)} 个话题")
-            print(f"✅ 话题列表: {topic_list[:3]}...") # 只打印前3个，避免日志过长
+            # ✅ 步骤1：调用工具获取ROS2真实话题列表 (在线程池里执行，不阻塞事件循环)
+            with metrics.track("tool", "ros2_get_topic_list"):
+                topic_list = await tools_by_name["ros2_get_topic_list"].ainvoke({})
+            log_event(logger, logging.INFO, "ros2_topics", count=len(topic_list), head=topic_list[:3])
             
-            # ✅ 步骤2：解析话题生成机器人配置
-            robot_config = tools_by_name["ros2_parse_topic_to_config"].invoke({"topic_list": topic_list})
-            print("✅ 成功解析话题，生成机器人配置")
+            # ✅ 步骤2：解析话题生成机器人配置（并发探测各话题的维度/分辨率，异步执行不阻塞事件循环）
+            with metrics.track("tool", "ros2_parse_topic_to_config"):
+                robot_config = await tools_by_name["ros2_parse_topic_to_config"].ainvoke({"topic_list": topic_list})
             
             # ✅ 步骤3：渲染模板生成最终node.py代码
-            node_code = tools_by_name["ros2_render_node_template"].invoke({"robot_config": robot_config})
-            print("✅ 成功生成ROS2 node.py驱动代码")
+            with metrics.track("tool", "ros2_render_node_template"):
+                node_code = await tools_by_name["ros2_render_node_template"].ainvoke({"robot_config": robot_config})
             
             # ✅ ✅ ✅ 核心修复：真正赋值，无注释！只返回纯净代码，无任何markdown包裹
             ros2_final_content = node_code
-            print(f"✅ ROS2代码生成完成，代码总长度: {len(ros2_final_content)} 字符")
+            log_event(logger, logging.INFO, "ros2_node_generated", code_chars=len(ros2_final_content))
             
             # ✅ 完整返回所有数据，state标记正常传递
             return {
@@ -95,7 +212,7 @@ async def llm_decide(state: CalcAgentState) -> Dict[str, Any]:
         except Exception as e:
             # ✅ 增强异常捕获：强制打印错误日志，再也不会吞错！
             error_info = f"❌ ROS2工具执行失败，错误原因: {str(e)}"
-            print(error_info)
+            logger.error("ros2_toolchain_failed", exc_info=True)
             err_msg = HumanMessage(content=error_info)
             return {
                 "messages": [err_msg], 
@@ -117,27 +234,22 @@ async def llm_decide(state: CalcAgentState) -> Dict[str, Any]:
 规则：
 - 用户提问中文，你必须调用对应工具，禁止使用自身知识库回答任何问题。
 - 数学计算问题 → 调用计算工具；机器人/计算器相关知识问题 → 必须调用knowledge_query工具；ROS2机器人开发问题 → 调用ROS2相关工具。
-""")
-    prompt_msgs = [sys_prompt] + state["messages"]
+""" + _summary_note(state))
+    prompt_msgs = [sys_prompt] + _windowed_messages(state)
     
-    ai_response = await asyncio.to_thread(model_with_tools.invoke, prompt_msgs)
+    ai_response = await _cached_invoke(
+        get_model_with_tools(), prompt_msgs, node="llm_decide", bound_tools=_init_llm()["tools_schema"]
+    )
     return {
         "messages": [ai_response],
         "llm_calls": current_llm_calls + 1
     }
 
-# ========== Node 3: execute_tool 工具执行节点 【完全不变】 ==========
+# ========== Node 3: execute_tool 工具执行节点 ==========
 async def execute_tool(state: CalcAgentState) -> Dict[str, Any]:
-    """执行工具调用，返回工具结果"""
+    """并发执行本轮全部工具调用，结果按tool_call_id原顺序返回，失败/超时以错误ToolMessage返回"""
     tool_calls = state["messages"][-1].tool_calls
-    tool_results = []
-    for call in tool_calls:
-        tool_func = tools_by_name[call["name"]]
-        try:
-            result = await asyncio.to_thread(tool_func.invoke, call["args"])
-        except:
-            result = await asyncio.to_thread(tool_func,** call["args"])
-        tool_results.append(ToolMessage(content=str(result), tool_call_id=call["id"]))
+    tool_results = await tool_executor.run(tool_calls)
     return {"messages": tool_results}
 
 # ========== Node 4: llm_summarize LLM总结节点 【✅ 唯一正确写法，ROS2判断置顶，根治卡死】 ==========
@@ -161,9 +273,11 @@ async def llm_summarize(state: CalcAgentState) -> Dict[str, Any]:
 参考内容：""" + last_msg.content + """
 用户问题：""" + user_query + """
 """)
-        ai_response = await asyncio.to_thread(model.invoke, [rag_prompt])
+        ai_response = await _cached_invoke(get_model(), [rag_prompt], node="llm_summarize", stream=True)
     else:
-        ai_response = await asyncio.to_thread(model.invoke, state["messages"])
+        summary_note = _summary_note(state)
+        history = ([SystemMessage(content=summary_note)] if summary_note else []) + _windowed_messages(state)
+        ai_response = await _cached_invoke(get_model(), history, node="llm_summarize", stream=True)
         
     return {
         "messages": [ai_response],
@@ -1,13 +1,21 @@
 # # src/agent/rag.py
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import FakeEmbeddings
-from langchain_text_splitters import CharacterTextSplitter
-from langchain_core.documents import Document
+import asyncio
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-# ========== 1. 初始化【纯CPU/无依赖】嵌入模型 (无任何CUDA相关，秒加载) ==========
-embeddings = FakeEmbeddings(size=384)
+from src.agent.ingest import ingest_directory
+from src.agent.knowledge_index import IndexConfig, KnowledgeIndex, SourceDoc, content_hash
+from src.agent.lexical import BM25Index, identifiers, reciprocal_rank_fusion
+from src.agent.log import get_logger
+from src.agent.metrics import metrics
 
-# ========== 2. 你的知识库内容（可直接追加机器人指令/计算器规则） ==========
+logger = get_logger("rag")
+
+# ========== 1. 你的知识库内容（可直接追加机器人指令/计算器规则） ==========
 knowledge_base = [
     # 计算器相关知识库
     "本计算器支持加法add、减法subtract、乘法multiply、除法divide四种运算",
@@ -22,19 +30,306 @@ knowledge_base = [
     "机器人故障码E01：电机卡死，解决方案：重启机器人并清除前方障碍物"
 ]
 
-# ========== 3. 文本分片 + 初始化向量数据库 ==========
-text_splitter = CharacterTextSplitter(
-    chunk_size=200,
-    chunk_overlap=20,
-    separator="\n"
-)
-docs = [Document(page_content=text) for text in knowledge_base]
-split_docs = text_splitter.split_documents(docs)
-vector_db = FAISS.from_documents(split_docs, embeddings)
-
-# src/agent/rag.py 只改这个函数，其他不变
-def retrieve_context(question: str, top_k: int = 2) -> str: # top_k=2 更精准
-    retriever = vector_db.as_retriever(k=top_k)
-    relevant_docs = retriever.invoke(question)
-    context = "\n".join([doc.page_content for doc in relevant_docs])
-    return context # 直接返回纯文本，无多余拼接
\ No newline at end of file
+# ========== 2. 向量数据库：首次检索时从磁盘索引加载，只有新增/变化的文档才重新嵌入 ==========
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "autodriver", "knowledge_index")
+DEFAULT_KNOWLEDGE_DIR = os.path.join(PROJECT_ROOT, "data", "knowledge")
+# 内置条目在索引manifest里的导入根（不是目录）
+BUILTIN_ROOT = "builtin"
+
+# 离线兜底用的确定性假嵌入维度（AUTODRIVER_EMBEDDINGS=fake，或本地模型不可用时）
+FAKE_EMBEDDING_SIZE = 384
+
+# 检索方式：hybrid（BM25 + 向量，RRF融合，默认）/ dense（只用向量）/ lexical（只用BM25）
+RETRIEVAL_MODES = ("hybrid", "dense", "lexical")
+# 融合前每一路至少取的候选数
+FUSION_CANDIDATES = 20
+# 检索结果缓存条目上限（AUTODRIVER_RAG_CACHE_SIZE，0=关闭）
+DEFAULT_RETRIEVAL_CACHE_SIZE = 1024
+# 异步检索专用线程数（AUTODRIVER_RAG_WORKERS），不占用asyncio默认线程池
+DEFAULT_RETRIEVAL_WORKERS = 4
+
+_vector_db = None
+_knowledge_index = None
+_retriever = None
+_retrieval_pool: Optional[ThreadPoolExecutor] = None
+_vector_db_lock = threading.Lock()
+
+def builtin_sources() -> List[SourceDoc]:
+    """内置 knowledge_base 条目。id取内容哈希，列表中间插入/删除条目不会让其余条目被重新嵌入；
+    导入根固定为 BUILTIN_ROOT，只有带内置条目的同步才会清理它们"""
+    return [
+        SourceDoc(f"builtin:{content_hash(text)[:16]}", content_hash(text), text, root=BUILTIN_ROOT) for text in knowledge_base
+    ]
+
+def _sync_index(index: KnowledgeIndex) -> Dict[str, Any]:
+    """内置条目 + 知识目录（AUTODRIVER_KNOWLEDGE_DIR，支持 Markdown/文本/YAML/ROS接口定义/驱动源码）流式同步进索引；
+    文件的id是导入根下的绝对路径，文件内容变化时只重新嵌入这一个文件。AUTODRIVER_INGEST_WORKERS>0 时用进程池解析"""
+    knowledge_dir = os.getenv("AUTODRIVER_KNOWLEDGE_DIR", DEFAULT_KNOWLEDGE_DIR)
+    workers = int(os.getenv("AUTODRIVER_INGEST_WORKERS", "0"))
+    return ingest_directory(index, knowledge_dir, workers=workers, extra=builtin_sources())
+
+def create_embeddings() -> Tuple[Any, str]:
+    """按 AUTODRIVER_EMBEDDINGS 创建嵌入模型，返回 (嵌入对象, 模型标识)：
+    local（默认）= sentence-transformers CPU模型 + 磁盘嵌入缓存；fake = 确定性假嵌入（离线测试用）"""
+    backend = os.getenv("AUTODRIVER_EMBEDDINGS", "local").lower()
+    if backend == "local":
+        try:
+            import sentence_transformers  # noqa: F401
+            from src.agent.embeddings import LocalEmbeddings
+            embeddings = LocalEmbeddings.from_env()
+            return embeddings, f"st:{embeddings.model_name}"
+        except ImportError:
+            logger.warning("sentence-transformers 未安装，知识库退化为确定性假嵌入，检索结果没有语义")
+    elif backend != "fake":
+        raise ValueError(f"未知的嵌入后端: {backend}（可选: local / fake）")
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+    # 按文本哈希生成确定性向量，跨进程一致，落盘的索引才有意义
+    return DeterministicFakeEmbedding(size=FAKE_EMBEDDING_SIZE), f"deterministic-fake-{FAKE_EMBEDDING_SIZE}"
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """全局索引对象（不触发加载），索引目录由 AUTODRIVER_RAG_INDEX_DIR 控制，
+    索引类型由 AUTODRIVER_RAG_INDEX_TYPE 控制（flat/hnsw/ivfpq），查询参数见 IndexConfig.from_env"""
+    global _knowledge_index
+    if _knowledge_index is None:
+        embeddings, embedding_id = create_embeddings()
+        index_dir = os.path.expanduser(os.getenv("AUTODRIVER_RAG_INDEX_DIR", DEFAULT_INDEX_DIR))
+        _knowledge_index = KnowledgeIndex(index_dir, embeddings, embedding_id, config=IndexConfig.from_env())
+    return _knowledge_index
+
+def _build_vector_db() -> Any:
+    """把来源文档增量同步进磁盘索引并返回向量库（langchain_community等重量级依赖在这里才导入）"""
+    index = get_knowledge_index()
+    _sync_index(index)
+    return index.store
+
+def refresh_vector_db() -> Dict[str, Any]:
+    """知识库内容变化后（例如往知识目录里加了文件）重新同步，不必重启进程"""
+    global _vector_db, _retriever
+    with _vector_db_lock:
+        index = get_knowledge_index()
+        stats = _sync_index(index)
+        _vector_db = index.store
+        _retriever = None
+    return stats
+
+def get_vector_db() -> Any:
+    """返回全局向量库，第一次调用时构建，并发首次调用只构建一次"""
+    global _vector_db
+    if _vector_db is None:
+        with _vector_db_lock:
+            if _vector_db is None:
+                _vector_db = _build_vector_db()
+    return _vector_db
+
+def __getattr__(name: str) -> Any:
+    # 兼容旧代码直接访问 rag.vector_db
+    if name == "vector_db":
+        return get_vector_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ========== 3. 混合检索：BM25 + 向量，RRF融合 ==========
+class HybridRetriever:
+    """绑定构建时的向量库和索引版本；索引变化后由 get_retriever() 换新实例，BM25倒排表随之重建。
+
+    hybrid 模式下，查询里的精确标识符（E01、move_forward、A1）若能在分片里全部命中，
+    直接按BM25作答，不做查询嵌入；否则两路各取候选再用RRF融合。
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        rows: Sequence[Dict[str, Any]],
+        version: int,
+        mode: str = "hybrid",
+        candidates: int = FUSION_CANDIDATES,
+    ):
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"未知的检索方式: {mode}（可选: {', '.join(RETRIEVAL_MODES)}）")
+        self.store = store
+        self.version = version
+        self.mode = mode
+        self.candidates = candidates
+        self.texts: Dict[str, str] = {row["id"]: row["text"] for row in rows}
+        self.bm25 = BM25Index([(row["id"], row["text"]) for row in rows])
+
+    def _lexical(self, query: str, k: int) -> List[str]:
+        return [doc_id for doc_id, _ in self.bm25.search(query, k)]
+
+    def _exact(self, query: str, k: int) -> Optional[List[str]]:
+        """包含全部标识符的分片排在前面，不足k个用普通BM25结果补齐；查询没有标识符或无分片命中时返回None"""
+        terms = identifiers(query)
+        if not terms:
+            return None
+        matched = self.bm25.docs_containing_all(terms)
+        if not matched:
+            return None
+        ranked = [doc_id for doc_id, _ in self.bm25.search(query, k, only=matched)]
+        if len(ranked) < k:
+            ranked += [doc_id for doc_id in self._lexical(query, k + len(ranked)) if doc_id not in ranked][:k - len(ranked)]
+        return ranked
+
+    def _dense_many(self, queries: Sequence[str], k: int) -> List[List[str]]:
+        """一次批量嵌入 + 一次多查询FAISS检索"""
+        import numpy as np
+
+        if k <= 0 or not self.texts or not queries:
+            return [[] for _ in queries]
+        embeddings = self.store.embedding_function
+        if hasattr(embeddings, "embed_queries"):
+            vectors = embeddings.embed_queries(list(queries))
+        else:
+            vectors = [embeddings.embed_query(q) for q in queries]
+        _, positions = self.store.index.search(np.asarray(vectors, dtype=np.float32), min(k, len(self.texts)))
+        # ANN索引候选不足时会返回-1
+        ids = self.store.index_to_docstore_id
+        return [[ids[int(pos)] for pos in row if pos >= 0] for row in positions]
+
+    def search_many(self, queries: Sequence[str], k: int) -> List[List[str]]:
+        """每条查询返回最相关的k个分片id；需要向量检索的查询合并成一批嵌入和检索"""
+        routes = [self.mode] * len(queries)
+        results: List[Any]
+        if self.mode == "lexical":
+            results = [self._lexical(q, k) for q in queries]
+        elif self.mode == "dense":
+            results = self._dense_many(queries, k)
+        else:
+            results = [self._exact(q, k) for q in queries]
+            pending = [i for i, ranked in enumerate(results) if ranked is None]
+            n = max(self.candidates, k)
+            dense = self._dense_many([queries[i] for i in pending], n)
+            for i, ranked in enumerate(results):
+                if ranked is not None:
+                    routes[i] = "exact"
+            for i, dense_ranked in zip(pending, dense):
+                results[i] = reciprocal_rank_fusion([self._lexical(queries[i], n), dense_ranked], k)
+        for route in routes:
+            metrics.inc("autodriver_retrieval_total", route=route)
+        return results
+
+    def search(self, query: str, k: int) -> List[str]:
+        """返回最相关的k个分片id"""
+        return self.search_many([query], k)[0]
+
+    def retrieve(self, query: str, k: int) -> List[str]:
+        """返回最相关的k个分片文本"""
+        return [self.texts[doc_id] for doc_id in self.search(query, k)]
+
+def get_retriever() -> HybridRetriever:
+    """全局检索器，只在索引版本变化时重建；检索方式由 AUTODRIVER_RAG_MODE 控制（hybrid/dense/lexical）"""
+    global _retriever
+    get_vector_db()
+    index = get_knowledge_index()
+    retriever = _retriever
+    if retriever is None or retriever.store is not _vector_db or retriever.version != index.version:
+        with _vector_db_lock:
+            if _retriever is None or _retriever.store is not _vector_db or _retriever.version != index.version:
+                mode = os.getenv("AUTODRIVER_RAG_MODE", "hybrid").lower()
+                _retriever = HybridRetriever(_vector_db, index.rows(), index.version, mode=mode)
+            retriever = _retriever
+    return retriever
+
+# ========== 4. 检索结果缓存 + 批量/异步检索接口 ==========
+def normalize_query(query: str) -> str:
+    """缓存键用的查询规范化：NFKC（全角字母数字转半角）+ 合并空白"""
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+class RetrievalCache:
+    """检索结果LRU缓存，线程安全。键 = (规范化查询, top_k)；
+    整个缓存绑定一个索引版本，用新版本读写时先清空，索引一变旧结果自动失效"""
+
+    def __init__(self, max_entries: int = DEFAULT_RETRIEVAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.version: Optional[int] = None
+        self._entries: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @classmethod
+    def from_env(cls) -> "RetrievalCache":
+        return cls(max_entries=int(os.getenv("AUTODRIVER_RAG_CACHE_SIZE", DEFAULT_RETRIEVAL_CACHE_SIZE)))
+
+    def _bind(self, version: int) -> None:
+        if version != self.version:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self.version = version
+
+    def get(self, version: int, key: Tuple[str, int], record_miss: bool = True) -> Optional[str]:
+        with self._lock:
+            self._bind(version)
+            value = self._entries.get(key)
+            if value is None:
+                self._stats["misses"] += record_miss
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, version: int, key: Tuple[str, int], value: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._bind(version)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.version = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+retrieval_cache = RetrievalCache.from_env()
+
+def retrieve_contexts(queries: Sequence[str], top_k: int = 2) -> List[str]:
+    """批量检索，返回与queries一一对应的上下文文本。
+    先查结果缓存；未命中的查询去重后一次批量嵌入、一次多查询检索，结果写回缓存"""
+    retriever = get_retriever()
+    normalized = [normalize_query(q) for q in queries]
+    contexts: Dict[str, str] = {}
+    for query in dict.fromkeys(normalized):
+        hit = retrieval_cache.get(retriever.version, (query, top_k))
+        if hit is not None:
+            contexts[query] = hit
+    if contexts:
+        metrics.inc("autodriver_retrieval_cache_total", len(contexts), result="hit")
+    missing = [query for query in dict.fromkeys(normalized) if query not in contexts]
+    if missing:
+        metrics.inc("autodriver_retrieval_cache_total", len(missing), result="miss")
+        for query, ids in zip(missing, retriever.search_many(missing, top_k)):
+            contexts[query] = "\n".join(retriever.texts[doc_id] for doc_id in ids)
+            retrieval_cache.put(retriever.version, (query, top_k), contexts[query])
+    return [contexts[query] for query in normalized]
+
+def retrieve_context(question: str, top_k: int = 2) -> str:
+    """返回与问题最相关的 top_k 个分片，按相关度换行拼接成纯文本"""
+    return retrieve_contexts([question], top_k)[0]
+
+def _get_retrieval_pool() -> ThreadPoolExecutor:
+    global _retrieval_pool
+    if _retrieval_pool is None:
+        with _vector_db_lock:
+            if _retrieval_pool is None:
+                workers = int(os.getenv("AUTODRIVER_RAG_WORKERS", DEFAULT_RETRIEVAL_WORKERS))
+                _retrieval_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="autodriver-rag")
+    return _retrieval_pool
+
+async def aretrieve_context(question: str, top_k: int = 2) -> str:
+    """异步检索：检索器已就绪且缓存命中时直接返回，不占线程；否则进专用线程池检索（嵌入和FAISS都是阻塞调用）"""
+    retriever = _retriever
+    # 与 get_retriever() 一样对照当前索引版本：索引已更新而检索器还没换新时不能用旧版本的缓存
+    if retriever is not None and retriever.version == get_knowledge_index().version:
+        # 未命中不计数，交给线程里的 retrieve_contexts 统一统计
+        hit = retrieval_cache.get(retriever.version, (normalize_query(question), top_k), record_miss=False)
+        if hit is not None:
+            metrics.inc("autodriver_retrieval_cache_total", result="hit")
+            return hit
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_retrieval_pool(), retrieve_context, question, top_k)
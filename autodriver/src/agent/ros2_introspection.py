@@ -0,0 +1,603 @@
+# src/agent/ros2_introspection.py
+"""ROS2图内省：可插拔后端 + 按 ROS_DOMAIN_ID 分区、带TTL的话题缓存。
+
+后端（AUTODRIVER_ROS2_BACKEND）：
+- rclpy  进程内常驻节点，get_topic_names_and_types() 直接读DDS发现结果，毫秒级
+- cli    `ros2 topic list -t` 子进程，每次约1秒（没装rclpy时的兜底）
+- fake   从文件读话题表（AUTODRIVER_ROS2_FAKE_GRAPH，JSON/YAML），没有ROS环境时测试用，文件改了自动重读
+- snapshot 回放录制的话题快照（AUTODRIVER_ROS2_SNAPSHOT，格式与录制命令见 ros2_snapshot.py），没有ROS的构建机上生成驱动用
+- auto   （默认）配置了快照用snapshot，配置了假图文件用fake，能导入rclpy用rclpy，否则用cli
+
+缓存按domain分区，条目过期(AUTODRIVER_ROS2_TOPIC_TTL_S)或显式 refresh 后重新查询；查询失败抛 IntrospectionError，从不缓存。
+每个后端还提供单话题详情探测 aprobe()（发布者数、QoS、接口定义、一条样本消息）和频率测量 arate()，
+并发调度见 ros2_probe.py。
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.agent.log import get_logger, log_event
+from src.agent.metrics import metrics
+
+logger = get_logger("ros2")
+
+BACKENDS = ("auto", "rclpy", "cli", "fake", "snapshot")
+DEFAULT_TOPIC_TTL_S = 30.0
+DEFAULT_CMD_TIMEOUT_S = 8.0
+# rclpy节点创建后等待DDS发现的时间，太早查询会漏掉话题
+DEFAULT_DISCOVERY_S = 1.0
+# 样本消息里数组最多保留的元素数：关节数组远小于它，压缩图像只需要文件头里的分辨率
+SAMPLE_ARRAY_LIMIT = 4096
+
+
+class IntrospectionError(RuntimeError):
+    """ROS2图查询失败（命令报错/超时、rclpy初始化失败、假图文件读不了等）"""
+
+
+def current_domain() -> int:
+    return int(os.getenv("ROS_DOMAIN_ID", "0") or 0)
+
+
+def exec_ros2_cmd(cmd: str, domain_id: Optional[int] = None, timeout: float = DEFAULT_CMD_TIMEOUT_S) -> str:
+    """执行ROS2命令行并返回stdout；失败/超时抛 IntrospectionError"""
+    env = None
+    if domain_id is not None:
+        env = dict(os.environ, ROS_DOMAIN_ID=str(domain_id))
+    try:
+        result = subprocess.run(cmd.split(), capture_output=True, text=True, timeout=timeout, env=env)
+    except subprocess.TimeoutExpired:
+        raise IntrospectionError(f"ROS2命令执行超时（{timeout}s），检查ROS2环境/机器人连接: {cmd}") from None
+    except OSError as e:
+        raise IntrospectionError(f"无法执行ROS2命令 {cmd}: {e}") from e
+    if result.returncode != 0:
+        raise IntrospectionError(result.stderr.strip() or f"{cmd} 退出码 {result.returncode}")
+    return result.stdout.strip()
+
+
+async def aexec_ros2_cmd(args: List[str], domain_id: Optional[int] = None, timeout: float = DEFAULT_CMD_TIMEOUT_S) -> str:
+    """exec_ros2_cmd 的异步版本：超时或被取消时杀掉子进程"""
+    env = None
+    if domain_id is not None:
+        env = dict(os.environ, ROS_DOMAIN_ID=str(domain_id))
+    cmd = " ".join(args)
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, env=env
+        )
+    except OSError as e:
+        raise IntrospectionError(f"无法执行ROS2命令 {cmd}: {e}") from e
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        raise IntrospectionError(f"ROS2命令执行超时（{timeout}s）: {cmd}") from None
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    if proc.returncode != 0:
+        raise IntrospectionError(stderr.decode("utf-8", "replace").strip() or f"{cmd} 退出码 {proc.returncode}")
+    return stdout.decode("utf-8", "replace").strip()
+
+
+def message_fields(msg: Any) -> Dict[str, Any]:
+    """rclpy消息 → dict（嵌套消息递归展开）；数组只保留前 SAMPLE_ARRAY_LIMIT 个元素"""
+    fields: Dict[str, Any] = {}
+    for name in msg.get_fields_and_field_types():
+        value = getattr(msg, name)
+        if hasattr(value, "get_fields_and_field_types"):
+            value = message_fields(value)
+        elif isinstance(value, (bytes, bytearray)):
+            value = bytes(value[:SAMPLE_ARRAY_LIMIT])
+        elif hasattr(value, "__len__") and not isinstance(value, str):
+            value = list(value[:SAMPLE_ARRAY_LIMIT])
+        fields[name] = value
+    return fields
+
+
+# ========== 后端 ==========
+class IntrospectionBackend:
+    """后端接口：返回 {话题名: [消息类型, ...]}，失败抛 IntrospectionError"""
+
+    name = "base"
+
+    def topic_names_and_types(self) -> Dict[str, List[str]]:
+        raise NotImplementedError
+
+    def probe(self, topic: str, msg_type: str, timeout: float) -> Dict[str, Any]:
+        """单个话题的详情：{"type", "publishers", "qos", "interface", "sample", "error"}，拿不到的项缺省。
+        qos 是每个发布者的QoS：[{"reliability", "durability", "history", "depth"}]。
+        msg_type 为空时由后端自己查；timeout 内收不到样本时带上 error 返回已有的部分"""
+        raise NotImplementedError
+
+    async def aprobe(self, topic: str, msg_type: str, timeout: float) -> Dict[str, Any]:
+        # 默认在线程里跑同步实现；能真正异步的后端覆盖这个方法
+        return await asyncio.to_thread(self.probe, topic, msg_type, timeout)
+
+    async def arate(self, topic: str, window_s: float) -> Optional[float]:
+        """在 window_s 秒内测话题的发布频率（Hz）；收不到两条消息或后端不支持时返回None"""
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class CliBackend(IntrospectionBackend):
+    name = "cli"
+
+    def __init__(self, domain_id: int, timeout: float = DEFAULT_CMD_TIMEOUT_S):
+        self.domain_id = domain_id
+        self.timeout = timeout
+
+    @staticmethod
+    def parse_topic_list(output: str) -> Dict[str, List[str]]:
+        """解析 `ros2 topic list -t` 的输出：每行 "/话题 [类型1, 类型2]"，不带类型的行也接受"""
+        topics: Dict[str, List[str]] = {}
+        for line in output.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            name, _, types = line.partition(" ")
+            types = types.strip().strip("[]")
+            topics[name] = [t.strip() for t in types.split(",") if t.strip()]
+        return topics
+
+    @staticmethod
+    def parse_topic_info(output: str) -> Dict[str, Any]:
+        """解析 `ros2 topic info [-v]` 的输出：Type / Publisher count，带 -v 时还有每个发布者的QoS"""
+        info: Dict[str, Any] = {}
+        qos: List[Dict[str, Any]] = []
+        endpoint: Dict[str, Any] = {}
+        for line in output.splitlines():
+            key, _, value = line.partition(":")
+            key, value = key.strip(), value.strip()
+            if key == "Type":
+                info["type"] = value
+            elif key == "Publisher count":
+                info["publishers"] = int(value or 0)
+            elif key == "Endpoint type":
+                endpoint = {}
+                if value == "PUBLISHER":
+                    qos.append(endpoint)
+            elif key in ("Reliability", "Durability"):
+                endpoint[key.lower()] = value
+            elif key == "History (Depth)":
+                # "KEEP_LAST (10)"；部分发行版是 "UNKNOWN"
+                history, _, depth = value.partition(" (")
+                endpoint["history"] = history
+                if depth.rstrip(")").isdigit():
+                    endpoint["depth"] = int(depth.rstrip(")"))
+        if qos:
+            info["qos"] = qos
+        return info
+
+    @staticmethod
+    def parse_hz(output: str) -> Optional[float]:
+        """`ros2 topic hz` 每秒打印一次 "average rate: 29.998"，取最后一次"""
+        rates = re.findall(r"average rate:\s*([\d.]+)", output)
+        return float(rates[-1]) if rates else None
+
+    @staticmethod
+    def parse_echo(output: str) -> Optional[Dict[str, Any]]:
+        """解析 `ros2 topic echo --once` 的输出（YAML，以 "---" 结尾）"""
+        import yaml
+
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        try:
+            sample = yaml.load(output.split("\n---")[0], Loader=loader)
+        except yaml.YAMLError:
+            return None
+        return sample if isinstance(sample, dict) else None
+
+    def topic_names_and_types(self) -> Dict[str, List[str]]:
+        log_event(logger, logging.INFO, "ros2_exec", cmd="ros2 topic list -t", domain=self.domain_id)
+        return self.parse_topic_list(exec_ros2_cmd("ros2 topic list -t", self.domain_id, self.timeout))
+
+    async def _interface(self, msg_type: str, timeout: float) -> str:
+        return await aexec_ros2_cmd(["ros2", "interface", "show", msg_type], self.domain_id, timeout)
+
+    async def aprobe(self, topic: str, msg_type: str, timeout: float) -> Dict[str, Any]:
+        """三条命令并发：topic info、interface show、echo --once；单条失败只影响对应的项"""
+        echo = ["ros2", "topic", "echo", "--once", "--truncate-length", str(SAMPLE_ARRAY_LIMIT)]
+        if not msg_type.endswith("CompressedImage"):
+            # 只要数组长度，不打印内容；压缩图像要读data开头的文件头
+            echo.append("--no-arr")
+        echo.append(topic)
+        commands = [
+            aexec_ros2_cmd(["ros2", "topic", "info", "-v", topic], self.domain_id, timeout),
+            aexec_ros2_cmd(echo, self.domain_id, timeout),
+        ]
+        if msg_type:
+            commands.append(self._interface(msg_type, timeout))
+        outputs = await asyncio.gather(*commands, return_exceptions=True)
+        result: Dict[str, Any] = {"type": msg_type}
+        errors = [str(out) for out in outputs if isinstance(out, BaseException)]
+        if not isinstance(outputs[0], BaseException):
+            result.update({k: v for k, v in self.parse_topic_info(outputs[0]).items() if v})
+        if not isinstance(outputs[1], BaseException):
+            result["sample"] = self.parse_echo(outputs[1])
+        if len(outputs) > 2:
+            if not isinstance(outputs[2], BaseException):
+                result["interface"] = outputs[2]
+        elif result.get("type"):
+            try:
+                result["interface"] = await self._interface(result["type"], timeout)
+            except IntrospectionError as e:
+                errors.append(str(e))
+        if errors:
+            result["error"] = "; ".join(errors)
+        return result
+
+    async def arate(self, topic: str, window_s: float) -> Optional[float]:
+        """`ros2 topic hz` 跑 window_s 秒后用SIGINT结束，取它最后打印的平均频率"""
+        env = dict(os.environ, ROS_DOMAIN_ID=str(self.domain_id), PYTHONUNBUFFERED="1")
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "ros2", "topic", "hz", topic, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL, env=env
+            )
+        except OSError as e:
+            raise IntrospectionError(f"无法执行ROS2命令 ros2 topic hz {topic}: {e}") from e
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), window_s)
+        except asyncio.TimeoutError:
+            proc.send_signal(signal.SIGINT)
+            try:
+                stdout, _ = await asyncio.wait_for(proc.communicate(), 1.0)
+            except asyncio.TimeoutError:
+                stdout = b""
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+        return self.parse_hz(stdout.decode("utf-8", "replace"))
+
+
+class RclpyBackend(IntrospectionBackend):
+    """常驻的进程内rclpy节点，独立Context，不影响调用方自己的rclpy.init()"""
+
+    name = "rclpy"
+
+    def __init__(self, domain_id: int, discovery_s: float = DEFAULT_DISCOVERY_S):
+        self.domain_id = domain_id
+        self.discovery_s = discovery_s
+        self._context: Any = None
+        self._node: Any = None
+        self._executor: Any = None
+        self._created_at = 0.0
+        self._lock = threading.Lock()
+
+    def _get_node(self) -> Any:
+        if self._node is None:
+            import rclpy
+
+            try:
+                context = rclpy.Context()
+                rclpy.init(context=context, domain_id=self.domain_id)
+                self._node = rclpy.create_node(
+                    f"autodriver_introspection_{os.getpid()}", context=context, start_parameter_services=False
+                )
+            except Exception as e:
+                raise IntrospectionError(f"rclpy初始化失败（domain {self.domain_id}）: {e}") from e
+            self._context = context
+            self._created_at = time.monotonic()
+        return self._node
+
+    def topic_names_and_types(self) -> Dict[str, List[str]]:
+        with self._lock:
+            node = self._get_node()
+            # 只有新建节点后的第一次查询需要等发现；常驻之后图信息由DDS在后台持续更新
+            wait = self.discovery_s - (time.monotonic() - self._created_at)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return {name: list(types) for name, types in node.get_topic_names_and_types()}
+            except Exception as e:
+                raise IntrospectionError(f"读取ROS2话题失败: {e}") from e
+
+    def _ensure_spinning(self) -> None:
+        # 探测样本要处理订阅回调：节点交给后台线程里的执行器常驻spin
+        if self._executor is None:
+            from rclpy.executors import SingleThreadedExecutor
+
+            self._executor = SingleThreadedExecutor(context=self._context)
+            self._executor.add_node(self._node)
+            threading.Thread(target=self._executor.spin, name="autodriver-ros2-probe", daemon=True).start()
+
+    def probe(self, topic: str, msg_type: str, timeout: float) -> Dict[str, Any]:
+        from rosidl_runtime_py.utilities import get_message
+
+        with self._lock:
+            node = self._get_node()
+            self._ensure_spinning()
+            publishers = node.get_publishers_info_by_topic(topic)
+        msg_type = msg_type or (publishers[0].topic_type if publishers else "")
+        result: Dict[str, Any] = {
+            "type": msg_type,
+            "publishers": len(publishers),
+            "qos": [self.qos_fields(p.qos_profile) for p in publishers],
+        }
+        if not msg_type:
+            result["error"] = f"话题 {topic} 没有发布者，无法确定消息类型"
+            return result
+        try:
+            msg_class = get_message(msg_type)
+        except Exception as e:
+            result["error"] = f"加载消息类型 {msg_type} 失败: {e}"
+            return result
+        # 与 `ros2 interface show` 同样的 "类型 字段名" 行
+        result["interface"] = "\n".join(f"{t} {n}" for n, t in msg_class.get_fields_and_field_types().items())
+
+        received = threading.Event()
+        samples: List[Any] = []
+
+        def on_message(msg: Any) -> None:
+            if not samples:
+                samples.append(msg)
+                received.set()
+
+        subscription = self._subscribe(topic, msg_type, on_message)
+        try:
+            received.wait(timeout)
+        finally:
+            self._unsubscribe(subscription)
+        if samples:
+            result["sample"] = message_fields(samples[0])
+        else:
+            result["error"] = f"{timeout}s内没有收到 {topic} 的消息"
+        return result
+
+    @staticmethod
+    def qos_fields(profile: Any) -> Dict[str, Any]:
+        # 与 `ros2 topic info -v` 一致的枚举名
+        return {
+            "reliability": profile.reliability.name,
+            "durability": profile.durability.name,
+            "history": profile.history.name,
+            "depth": int(profile.depth),
+        }
+
+    def _subscribe(self, topic: str, msg_type: str, callback: Any) -> Any:
+        from rclpy.qos import qos_profile_sensor_data
+        from rosidl_runtime_py.utilities import get_message
+
+        with self._lock:
+            node = self._get_node()
+            self._ensure_spinning()
+            # sensor_data（best effort）能同时收到可靠/尽力而为两种发布者的消息
+            return node.create_subscription(get_message(msg_type), topic, callback, qos_profile_sensor_data)
+
+    def _unsubscribe(self, subscription: Any) -> None:
+        with self._lock:
+            self._node.destroy_subscription(subscription)
+
+    def rate(self, topic: str, window_s: float) -> Optional[float]:
+        with self._lock:
+            publishers = self._get_node().get_publishers_info_by_topic(topic)
+        if not publishers:
+            return None
+        stamps: List[float] = []
+        try:
+            subscription = self._subscribe(topic, publishers[0].topic_type, lambda _msg: stamps.append(time.monotonic()))
+        except Exception as e:
+            raise IntrospectionError(f"订阅 {topic} 失败: {e}") from e
+        try:
+            time.sleep(window_s)
+        finally:
+            self._unsubscribe(subscription)
+        if len(stamps) < 2 or stamps[-1] <= stamps[0]:
+            return None
+        return (len(stamps) - 1) / (stamps[-1] - stamps[0])
+
+    async def arate(self, topic: str, window_s: float) -> Optional[float]:
+        return await asyncio.to_thread(self.rate, topic, window_s)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            if self._node is not None:
+                import rclpy
+
+                self._node.destroy_node()
+                rclpy.shutdown(context=self._context)
+                self._node = None
+                self._context = None
+
+
+class FakeBackend(IntrospectionBackend):
+    """文件驱动的假ROS2图。文件格式（JSON或YAML）：
+
+        {"topics": {"/joint_states": ["sensor_msgs/msg/JointState"], ...}}
+        {"topics": ["/a", "/b"]}                           # 不关心类型
+        {"domains": {"0": {"topics": ...}, "7": {...}}}    # 按domain区分
+        {"error": "模拟的失败原因"}                          # 查询时抛 IntrospectionError
+
+    探测用的可选项（与 "topics" 同级）：
+        "samples":    {"/话题": {样本消息字段}}      没有样本的话题探测时报"没有收到消息"
+        "interfaces": {"pkg/msg/Type": "接口定义文本"}
+        "publishers": {"/话题": 发布者数}            缺省：有样本为1，否则为0
+        "delays":     {"/话题": 秒}                  模拟取样本的耗时，超过timeout按超时处理
+        "qos":        {"/话题": [{"reliability": ...}]}
+        "rates":      {"/话题": Hz}
+    """
+
+    name = "fake"
+
+    def __init__(self, path: str, domain_id: int = 0):
+        self.path = path
+        self.domain_id = domain_id
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError as e:
+            raise IntrospectionError(f"假ROS2图文件读取失败: {e}") from e
+        if self.path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(text) or {}
+        return json.loads(text)
+
+    def _graph(self) -> Dict[str, Any]:
+        graph = self._load()
+        if "domains" in graph:
+            graph = graph["domains"].get(str(self.domain_id), {})
+        if graph.get("error"):
+            raise IntrospectionError(str(graph["error"]))
+        return graph
+
+    def topic_names_and_types(self) -> Dict[str, List[str]]:
+        topics = self._graph().get("topics", {})
+        if isinstance(topics, list):
+            return {name: [] for name in topics}
+        return {name: list(types or []) for name, types in topics.items()}
+
+    def has_samples(self) -> bool:
+        return bool(self._graph().get("samples"))
+
+    async def aprobe(self, topic: str, msg_type: str, timeout: float) -> Dict[str, Any]:
+        graph = self._graph()
+        topics = graph.get("topics", {})
+        if not msg_type and isinstance(topics, dict):
+            msg_type = (topics.get(topic) or [""])[0]
+        sample = graph.get("samples", {}).get(topic)
+        result: Dict[str, Any] = {
+            "type": msg_type,
+            "publishers": int(graph.get("publishers", {}).get(topic, 0 if sample is None else 1)),
+            "interface": graph.get("interfaces", {}).get(msg_type, ""),
+        }
+        if topic in graph.get("qos", {}):
+            result["qos"] = graph["qos"][topic]
+        delay = float(graph.get("delays", {}).get(topic, 0))
+        if delay:
+            await asyncio.sleep(min(delay, timeout))
+        if delay > timeout:
+            result["error"] = f"{timeout}s内没有收到 {topic} 的消息"
+        elif sample is None:
+            result["error"] = f"没有收到 {topic} 的消息"
+        else:
+            result["sample"] = sample
+        return result
+
+    async def arate(self, topic: str, window_s: float) -> Optional[float]:
+        rate = self._graph().get("rates", {}).get(topic)
+        return None if rate is None else float(rate)
+
+
+def create_backend(kind: str, domain_id: int) -> IntrospectionBackend:
+    if kind not in BACKENDS:
+        raise ValueError(f"未知的ROS2内省后端: {kind}（可选: {', '.join(BACKENDS)}）")
+    fake_graph = os.getenv("AUTODRIVER_ROS2_FAKE_GRAPH", "")
+    snapshot = os.getenv("AUTODRIVER_ROS2_SNAPSHOT", "")
+    if kind == "auto":
+        if snapshot:
+            kind = "snapshot"
+        elif fake_graph:
+            kind = "fake"
+        else:
+            try:
+                import rclpy  # noqa: F401
+                kind = "rclpy"
+            except ImportError:
+                kind = "cli"
+    if kind == "fake":
+        if not fake_graph:
+            raise ValueError("AUTODRIVER_ROS2_BACKEND=fake 需要设置 AUTODRIVER_ROS2_FAKE_GRAPH")
+        return FakeBackend(fake_graph, domain_id)
+    if kind == "snapshot":
+        if not snapshot:
+            raise ValueError("AUTODRIVER_ROS2_BACKEND=snapshot 需要设置 AUTODRIVER_ROS2_SNAPSHOT")
+        from src.agent.ros2_snapshot import SnapshotBackend
+
+        return SnapshotBackend(snapshot, domain_id)
+    if kind == "rclpy":
+        return RclpyBackend(domain_id, discovery_s=float(os.getenv("AUTODRIVER_ROS2_DISCOVERY_S", DEFAULT_DISCOVERY_S)))
+    return CliBackend(domain_id, timeout=float(os.getenv("AUTODRIVER_ROS2_CMD_TIMEOUT_S", DEFAULT_CMD_TIMEOUT_S)))
+
+
+# ========== 按domain分区的TTL缓存 ==========
+class Ros2Introspector:
+    """每个domain一个后端实例 + 一条缓存；同一domain的并发查询只打一次后端"""
+
+    def __init__(self, backend: str = "auto", ttl_s: float = DEFAULT_TOPIC_TTL_S):
+        self.backend_kind = backend
+        self.ttl_s = ttl_s
+        self._backends: Dict[int, IntrospectionBackend] = {}
+        self._entries: Dict[int, Tuple[float, Dict[str, List[str]]]] = {}
+        self._domain_locks: Dict[int, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Ros2Introspector":
+        """AUTODRIVER_ROS2_BACKEND（auto/rclpy/cli/fake） / AUTODRIVER_ROS2_TOPIC_TTL_S（0=不缓存）"""
+        return cls(
+            backend=os.getenv("AUTODRIVER_ROS2_BACKEND", "auto").lower(),
+            ttl_s=float(os.getenv("AUTODRIVER_ROS2_TOPIC_TTL_S", DEFAULT_TOPIC_TTL_S)),
+        )
+
+    def _domain_lock(self, domain: int) -> threading.Lock:
+        with self._lock:
+            return self._domain_locks.setdefault(domain, threading.Lock())
+
+    def backend(self, domain: int) -> IntrospectionBackend:
+        with self._lock:
+            if domain not in self._backends:
+                self._backends[domain] = create_backend(self.backend_kind, domain)
+            return self._backends[domain]
+
+    def _fresh(self, domain: int) -> Optional[Dict[str, List[str]]]:
+        entry = self._entries.get(domain)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl_s:
+            return entry[1]
+        return None
+
+    def topics(self, domain: Optional[int] = None, refresh: bool = False) -> Dict[str, List[str]]:
+        """{话题名: [类型]}；domain缺省取当前 ROS_DOMAIN_ID，refresh=True 跳过缓存重新查询"""
+        domain = current_domain() if domain is None else domain
+        if not refresh:
+            cached = self._fresh(domain)
+            if cached is not None:
+                metrics.inc("autodriver_ros2_topic_cache_total", result="hit")
+                return cached
+        with self._domain_lock(domain):
+            # 等锁期间别的线程可能刚查完
+            cached = None if refresh else self._fresh(domain)
+            if cached is not None:
+                metrics.inc("autodriver_ros2_topic_cache_total", result="hit")
+                return cached
+            metrics.inc("autodriver_ros2_topic_cache_total", result="miss")
+            backend = self.backend(domain)
+            with metrics.track("ros2", backend.name):
+                topics = backend.topic_names_and_types()
+            self._entries[domain] = (time.monotonic(), topics)
+        log_event(logger, logging.DEBUG, "ros2_topics_refreshed", domain=domain, backend=backend.name, count=len(topics))
+        return topics
+
+    def topic_names(self, domain: Optional[int] = None, refresh: bool = False) -> List[str]:
+        return sorted(self.topics(domain, refresh))
+
+    def invalidate(self, domain: Optional[int] = None) -> None:
+        """丢弃缓存：指定domain或全部"""
+        with self._lock:
+            if domain is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(domain, None)
+
+    def close(self) -> None:
+        with self._lock:
+            backends = list(self._backends.values())
+            self._backends.clear()
+            self._entries.clear()
+        for backend in backends:
+            backend.close()
+
+
+introspector = Ros2Introspector.from_env()
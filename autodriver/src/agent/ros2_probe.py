@@ -0,0 +1,270 @@
+# src/agent/ros2_probe.py
+"""ROS2话题详情探测：对规则匹配上的话题并发执行 topic info / interface show / 取一条样本，
+把实测的关节维度、相机分辨率与编码、消息类型写回机器人配置。
+
+- 并发上限 AUTODRIVER_ROS2_PROBE_CONCURRENCY，单话题超时 AUTODRIVER_ROS2_PROBE_TIMEOUT_S
+- 总耗时约等于最慢的那个话题，而不是逐个探测耗时之和
+- 探测不到的项（没有发布者、超时）保留配置里的默认值
+"""
+import asyncio
+import copy
+import logging
+import os
+import re
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from src.agent.log import get_logger, log_event
+from src.agent.metrics import metrics
+from src.agent.ros2_introspection import (
+    DEFAULT_CMD_TIMEOUT_S,
+    IntrospectionBackend,
+    IntrospectionError,
+    current_domain,
+    introspector,
+)
+
+logger = get_logger("ros2")
+
+DEFAULT_PROBE_CONCURRENCY = 8
+DEFAULT_PROBE_TIMEOUT_S = DEFAULT_CMD_TIMEOUT_S
+# 后端自己按timeout收尾并返回已拿到的部分；外层再留一点余量兜底，防止后端卡死
+PROBE_GRACE_S = 1.0
+
+# 配置里存放话题的各个分区
+TOPIC_SECTIONS = ("publish_topics", "follow_feedback_topics", "main_cmd_topics", "camera_topics")
+
+# joint_dim 各项取自哪些话题（按优先级）：模板按下发指令的布局切分数组，指令话题优先，反馈话题兜底
+JOINT_DIM_SOURCES = {
+    "left_arm": ["publish_topics.left_arm", "main_cmd_topics.joint_left", "follow_feedback_topics.left_arm"],
+    "right_arm": ["publish_topics.right_arm", "main_cmd_topics.joint_right", "follow_feedback_topics.right_arm"],
+    "gripper": [
+        "publish_topics.left_gripper", "main_cmd_topics.gripper_left",
+        "follow_feedback_topics.left_gripper", "follow_feedback_topics.right_gripper",
+    ],
+    "torso": ["publish_topics.torso", "main_cmd_topics.joint_torso"],
+}
+
+# 原始图像编码 → 模板 images_recv 认识的编码名
+_RAW_ENCODINGS = {"16UC1": "depth16", "mono16": "depth16"}
+_COMPRESSED_FORMATS = ("png", "webp", "bmp")
+
+# `ros2 topic echo --no-arr` 把数组打印成 "<sequence type: double, length: 7>"
+_SEQUENCE_LENGTH = re.compile(r"length:\s*(\d+)")
+# 接口定义里的定长数组字段，例如 "float64[7] position"
+_FIXED_ARRAY = re.compile(r"^\s*[\w/]+\[(\d+)\]\s+(\w+)", re.MULTILINE)
+
+
+class TopicProbe(NamedTuple):
+    """单个话题的探测结果；fields 是从样本/接口定义测得的值：dim / width / height / encoding"""
+
+    topic: str
+    msg_type: str = ""
+    publishers: int = 0
+    fields: Optional[Dict[str, Any]] = None
+    error: str = ""
+    elapsed_s: float = 0.0
+
+
+# ========== 样本解析 ==========
+def sequence_length(value: Any) -> Optional[int]:
+    if isinstance(value, (list, tuple, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        match = _SEQUENCE_LENGTH.search(value)
+        return int(match.group(1)) if match else None
+    return None
+
+
+def fixed_array_sizes(interface: str) -> Dict[str, int]:
+    """接口定义里的定长数组：{"position": 7}；样本收不到时用来确定关节维度"""
+    return {name: int(size) for size, name in _FIXED_ARRAY.findall(interface or "")}
+
+
+def image_size(data: Any) -> Optional[Tuple[int, int]]:
+    """从压缩图像的文件头读 (宽, 高)，支持JPEG/PNG；data 可以是bytes或整数列表（echo输出，可能被截断）"""
+    if isinstance(data, (list, tuple)):
+        data = bytes(v for v in data if isinstance(v, int) and 0 <= v < 256)
+    if not isinstance(data, (bytes, bytearray)):
+        return None
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF or marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            # 填充字节 / 无长度的标记
+            i += 2 if marker != 0xFF else 1
+            continue
+        # SOF0..SOF15（C4/C8/CC不是帧头）：长度(2) 精度(1) 高(2) 宽(2)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+    return None
+
+
+def camera_encoding(msg_type: str, sample: Dict[str, Any]) -> str:
+    if msg_type.endswith("CompressedImage") or "format" in sample:
+        # format 形如 "rgb8; jpeg compressed bgr8"
+        fmt = str(sample.get("format", "")).lower()
+        return next((name for name in _COMPRESSED_FORMATS if name in fmt), "jpeg")
+    encoding = str(sample.get("encoding", ""))
+    return _RAW_ENCODINGS.get(encoding, encoding)
+
+
+def measure(msg_type: str, sample: Optional[Dict[str, Any]], interface: str = "") -> Dict[str, Any]:
+    """样本 → 配置用的测量值：关节类消息给 dim，图像给 width/height/encoding"""
+    fields: Dict[str, Any] = {}
+    if sample:
+        if "position" in sample:
+            dim = sequence_length(sample["position"])
+            if dim is not None:
+                fields["dim"] = dim
+        if msg_type.endswith("CompressedImage") or "format" in sample:
+            fields["encoding"] = camera_encoding(msg_type, sample)
+            size = image_size(sample.get("data"))
+            if size:
+                fields["width"], fields["height"] = size
+        elif "width" in sample and "height" in sample:
+            fields["width"], fields["height"] = int(sample["width"]), int(sample["height"])
+            fields["encoding"] = camera_encoding(msg_type, sample)
+    if "dim" not in fields:
+        sizes = fixed_array_sizes(interface)
+        if "position" in sizes:
+            fields["dim"] = sizes["position"]
+    return fields
+
+
+# ========== 并发探测 ==========
+async def probe_topics(
+    topics: Dict[str, str],
+    backend: Optional[IntrospectionBackend] = None,
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, TopicProbe]:
+    """并发探测 {话题: 已知消息类型（可为空）}，返回 {话题: TopicProbe}；单个话题失败不影响其他"""
+    if backend is None:
+        backend = introspector.backend(current_domain())
+    if concurrency is None:
+        concurrency = int(os.getenv("AUTODRIVER_ROS2_PROBE_CONCURRENCY", DEFAULT_PROBE_CONCURRENCY))
+    if timeout is None:
+        timeout = float(os.getenv("AUTODRIVER_ROS2_PROBE_TIMEOUT_S", DEFAULT_PROBE_TIMEOUT_S))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def probe_one(topic: str, msg_type: str) -> TopicProbe:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                raw = await asyncio.wait_for(backend.aprobe(topic, msg_type, timeout), timeout + PROBE_GRACE_S)
+            except asyncio.TimeoutError:
+                raw = {"error": f"探测超时（{timeout}s）"}
+            except IntrospectionError as e:
+                raw = {"error": str(e)}
+            elapsed = time.perf_counter() - start
+        msg_type = raw.get("type") or msg_type
+        probe = TopicProbe(
+            topic=topic,
+            msg_type=msg_type,
+            publishers=int(raw.get("publishers", 0)),
+            fields=measure(msg_type, raw.get("sample"), raw.get("interface", "")),
+            error=raw.get("error", ""),
+            elapsed_s=round(elapsed, 3),
+        )
+        metrics.inc("autodriver_ros2_probe_total", result="error" if probe.error else "ok")
+        return probe
+
+    with metrics.track("ros2", f"{backend.name}_probe"):
+        results = await asyncio.gather(*(probe_one(topic, msg_type) for topic, msg_type in topics.items()))
+    failed = [p.topic for p in results if p.error]
+    log_event(
+        logger, logging.INFO if not failed else logging.WARNING, "ros2_topics_probed",
+        backend=backend.name, count=len(results), failed=failed,
+        slowest_s=max((p.elapsed_s for p in results), default=0.0),
+    )
+    return {p.topic: p for p in results}
+
+
+# ========== 写回配置 ==========
+def _section_topic(robot_config: Dict[str, Any], key: str) -> str:
+    section, name = key.split(".")
+    return robot_config.get(section, {}).get(name, "")
+
+
+def apply_probes(robot_config: Dict[str, Any], probes: Dict[str, TopicProbe]) -> Dict[str, Any]:
+    """把探测结果写进配置副本：joint_dim / camera_size / camera_encoding / topic_types"""
+    config = copy.deepcopy(robot_config)
+
+    def measured(key: str, field: str) -> Optional[Any]:
+        probe = probes.get(_section_topic(config, key))
+        return (probe.fields or {}).get(field) if probe else None
+
+    joint_dim = config.setdefault("joint_dim", {})
+    for name, sources in JOINT_DIM_SOURCES.items():
+        dim = next((d for d in (measured(key, "dim") for key in sources) if d is not None), None)
+        if dim is not None:
+            joint_dim[name] = dim
+            if name == "torso":
+                # 模板按 torso_cut 截取躯干反馈；指令维度已知时直接截到同样长度
+                joint_dim["torso_cut"] = dim
+
+    camera_size = config.setdefault("camera_size", {})
+    camera_encoding = config.setdefault("camera_encoding", {})
+    for name in config.get("camera_topics", {}):
+        key = f"camera_topics.{name}"
+        width, height = measured(key, "width"), measured(key, "height")
+        if width and height:
+            camera_size[name] = (width, height)
+        encoding = measured(key, "encoding")
+        if encoding:
+            camera_encoding[name] = encoding
+
+    topic_types = config.setdefault("topic_types", {})
+    for topic, probe in probes.items():
+        if probe.msg_type:
+            topic_types[topic] = probe.msg_type
+    return config
+
+
+def config_topics(robot_config: Dict[str, Any]) -> List[str]:
+    """配置里出现过的话题（去重，保持顺序）"""
+    seen: Dict[str, None] = {}
+    for section in TOPIC_SECTIONS:
+        for topic in robot_config.get(section, {}).values():
+            if topic:
+                seen.setdefault(topic, None)
+    return list(seen)
+
+
+async def probe_robot_config(
+    robot_config: Dict[str, Any], known_types: Optional[Dict[str, List[str]]] = None, **kwargs: Any
+) -> Dict[str, Any]:
+    """探测配置里的全部话题并写回实测值；known_types 缺省取当前domain话题列表缓存里的类型。
+    其余参数（backend/concurrency/timeout）透传给 probe_topics"""
+    if known_types is None:
+        try:
+            # 话题列表可能要跑 ros2 CLI，放到线程里，不阻塞事件循环
+            known_types = await asyncio.to_thread(introspector.topics)
+        except IntrospectionError:
+            known_types = {}
+    topics = {topic: (known_types.get(topic) or [""])[0] for topic in config_topics(robot_config)}
+    probes = await probe_topics(topics, **kwargs)
+    return apply_probes(robot_config, probes)
+
+
+def probe_robot_config_sync(robot_config: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+    """同步入口；在事件循环线程里被调用时换到独立线程跑，避免嵌套事件循环"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(probe_robot_config(robot_config, **kwargs))
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, probe_robot_config(robot_config, **kwargs)).result()
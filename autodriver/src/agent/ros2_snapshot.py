@@ -0,0 +1,399 @@
+# src/agent/ros2_snapshot.py
+"""ROS2话题快照：在机器人上录一次（话题/类型/QoS/实测频率/每个话题一条样本），在没有ROS的构建机上回放生成驱动。
+
+文件格式（.r2snap，UTF-8文本，逐行JSON，可以直接 less/grep）：
+    第1行      {"format": "autodriver-ros2-snapshot", "version": 1, "domain_id": 0, "recorded_at": ..., ...}
+    之后每行    一个话题 {"name", "types", "publishers", "qos", "rate_hz", "sample", "error"}
+               或一个接口定义 {"interface": "pkg/msg/Type", "text": ...}（同类型只存一次）
+    倒数第2行  索引 {"topics": {话题: [类型列表, 偏移, 长度]}, "interfaces": {类型: [偏移, 长度]}}
+    最后一行    定长尾部 "R2SNAPIX" + 16位十进制索引偏移
+
+读取时整个文件mmap，只解析尾部和索引：列话题与文件大小无关，探测某个话题时才解析它那一行。
+样本里的bytes（压缩图像的data）存成 {"$b64": "..."}，读回来还是bytes。
+
+命令行：
+    python -m src.agent.ros2_snapshot record -o robot.r2snap --domain 3      # 需要ROS2环境
+    python -m src.agent.ros2_snapshot info robot.r2snap
+    AUTODRIVER_ROS2_SNAPSHOT=robot.r2snap  # 之后 ros2_get_topic_list / ros2_parse_topic_to_config 都读快照
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import mmap
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.agent.log import get_logger, log_event
+from src.agent.ros2_introspection import (
+    FakeBackend,
+    IntrospectionBackend,
+    IntrospectionError,
+    current_domain,
+    introspector,
+)
+from src.agent.ros2_probe import DEFAULT_PROBE_TIMEOUT_S, PROBE_GRACE_S
+
+logger = get_logger("ros2")
+
+FORMAT = "autodriver-ros2-snapshot"
+VERSION = 1
+SUFFIX = ".r2snap"
+FOOTER_MAGIC = b"R2SNAPIX"
+FOOTER_SIZE = len(FOOTER_MAGIC) + 16 + 1
+# 录制时多数时间在等样本/测频率，并发可以比探测高
+DEFAULT_RECORD_CONCURRENCY = 32
+DEFAULT_RATE_WINDOW_S = 2.0
+
+
+class SnapshotError(IntrospectionError):
+    """快照文件不存在、格式不对或已损坏"""
+
+
+# ========== 编码 ==========
+def _encode(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"$b64": base64.b64encode(bytes(value)).decode("ascii")}
+    return str(value)
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "$b64" in obj:
+        return base64.b64decode(obj["$b64"])
+    return obj
+
+
+def _dumps(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=_encode).encode("utf-8")
+
+
+def compact_sample(msg_type: str, sample: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """图像样本的 data 从整数列表（`ros2 topic echo` 的输出）转成bytes，体积约为原来的1/3"""
+    if not sample or not msg_type.endswith("Image"):
+        return sample
+    data = sample.get("data")
+    if isinstance(data, list):
+        sample = dict(sample, data=bytes(v for v in data if isinstance(v, int) and 0 <= v < 256))
+    return sample
+
+
+def is_snapshot(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            head = f.read(64)
+    except OSError:
+        return False
+    return head.startswith(b"{") and FORMAT.encode() in head
+
+
+# ========== 写 ==========
+class SnapshotWriter:
+    """流式写入：话题逐条追加，close() 时写索引和尾部，再原子替换到目标路径
+
+        with SnapshotWriter(path, domain_id=0) as writer:
+            writer.add_topic({"name": "/a", "types": [...], "sample": {...}})
+            writer.add_interface("pkg/msg/Type", "...")
+    """
+
+    def __init__(self, path: str, **meta: Any):
+        self.path = path
+        self._tmp = f"{path}.tmp"
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self._tmp, "wb")
+        self._topics: Dict[str, List[Any]] = {}
+        self._interfaces: Dict[str, List[int]] = {}
+        self._write_line(dict({"format": FORMAT, "version": VERSION}, **meta))
+
+    def _write_line(self, record: Dict[str, Any]) -> Tuple[int, int]:
+        data = _dumps(record)
+        offset = self._file.tell()
+        self._file.write(data + b"\n")
+        return offset, len(data)
+
+    def add_topic(self, record: Dict[str, Any]) -> None:
+        offset, length = self._write_line(record)
+        self._topics[record["name"]] = [list(record.get("types") or []), offset, length]
+
+    def add_interface(self, msg_type: str, text: str) -> None:
+        if msg_type and text and msg_type not in self._interfaces:
+            self._interfaces[msg_type] = list(self._write_line({"interface": msg_type, "text": text}))
+
+    def has_interface(self, msg_type: str) -> bool:
+        return msg_type in self._interfaces
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        index_offset, _ = self._write_line({"topics": self._topics, "interfaces": self._interfaces})
+        self._file.write(FOOTER_MAGIC + f"{index_offset:016d}".encode() + b"\n")
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_snapshot(path: str, topics: List[Dict[str, Any]], interfaces: Optional[Dict[str, str]] = None, **meta: Any) -> None:
+    """一次性写出（测试、格式转换用）；录制用流式的 record_snapshot"""
+    with SnapshotWriter(path, **meta) as writer:
+        for msg_type, text in (interfaces or {}).items():
+            writer.add_interface(msg_type, text)
+        for record in topics:
+            writer.add_topic(record)
+
+
+# ========== 读 ==========
+class SnapshotReader:
+    """mmap打开快照；topics() 只用索引，record() 按需解析单个话题并缓存"""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"话题快照打开失败 {path}: {e}") from e
+        try:
+            self.meta = json.loads(self._mm[:self._mm.find(b"\n")])
+            footer = self._mm[-FOOTER_SIZE:]
+            if self.meta.get("format") != FORMAT or not footer.startswith(FOOTER_MAGIC):
+                raise ValueError("不是AutoDriver话题快照或文件不完整")
+            if int(self.meta.get("version", 0)) > VERSION:
+                raise ValueError(f"快照版本 {self.meta['version']} 高于当前支持的 {VERSION}")
+            index_offset = int(footer[len(FOOTER_MAGIC):-1])
+            index = json.loads(self._mm[index_offset:len(self._mm) - FOOTER_SIZE])
+        except (ValueError, KeyError) as e:
+            self._mm.close()
+            raise SnapshotError(f"话题快照格式错误 {path}: {e}") from e
+        self._topic_index: Dict[str, List[Any]] = index["topics"]
+        self._interface_index: Dict[str, List[int]] = index["interfaces"]
+        self._records: Dict[str, Dict[str, Any]] = {}
+
+    def _line(self, offset: int, length: int) -> Dict[str, Any]:
+        return json.loads(self._mm[offset:offset + length], object_hook=_decode)
+
+    def __len__(self) -> int:
+        return len(self._topic_index)
+
+    def __contains__(self, topic: str) -> bool:
+        return topic in self._topic_index
+
+    def topics(self) -> Dict[str, List[str]]:
+        return {name: list(entry[0]) for name, entry in self._topic_index.items()}
+
+    def record(self, topic: str) -> Optional[Dict[str, Any]]:
+        record = self._records.get(topic)
+        if record is None:
+            entry = self._topic_index.get(topic)
+            if entry is None:
+                return None
+            record = self._records[topic] = self._line(entry[1], entry[2])
+        return record
+
+    def interface(self, msg_type: str) -> str:
+        entry = self._interface_index.get(msg_type)
+        return self._line(*entry)["text"] if entry else ""
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """按文件顺序逐条解析全部话题（导出/统计用），不进缓存"""
+        for _, offset, length in sorted(self._topic_index.values(), key=lambda entry: entry[1]):
+            yield self._line(offset, length)
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+_readers: Dict[str, Tuple[Tuple[int, int], SnapshotReader]] = {}
+_readers_lock = threading.Lock()
+
+
+def open_snapshot(path: str) -> SnapshotReader:
+    """按路径复用已打开的reader；文件被重新录制（mtime/大小变了）时重新打开"""
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        raise SnapshotError(f"话题快照打开失败 {path}: {e}") from e
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _readers_lock:
+        cached = _readers.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        reader = SnapshotReader(path)
+        _readers[path] = (signature, reader)
+    # 旧reader可能还有别的线程在读，交给GC关闭
+    return reader
+
+
+# ========== 回放后端 ==========
+class SnapshotBackend(IntrospectionBackend):
+    """把快照当作ROS2图：话题列表来自索引，探测结果来自录制的样本，不需要ROS环境"""
+
+    name = "snapshot"
+
+    def __init__(self, path: str, domain_id: int = 0):
+        self.path = path
+        # 快照只含录制时的一个domain；domain_id 只为与其他后端的构造参数一致
+        self.domain_id = domain_id
+
+    def topic_names_and_types(self) -> Dict[str, List[str]]:
+        return open_snapshot(self.path).topics()
+
+    def has_samples(self) -> bool:
+        return len(open_snapshot(self.path)) > 0
+
+    async def aprobe(self, topic: str, msg_type: str, timeout: float) -> Dict[str, Any]:
+        reader = open_snapshot(self.path)
+        record = reader.record(topic)
+        if record is None:
+            return {"type": msg_type, "publishers": 0, "error": f"快照里没有话题 {topic}"}
+        msg_type = msg_type or (record.get("types") or [""])[0]
+        result: Dict[str, Any] = {
+            "type": msg_type,
+            "publishers": int(record.get("publishers", 0)),
+            "qos": record.get("qos", []),
+            "interface": reader.interface(msg_type),
+        }
+        if record.get("sample") is not None:
+            result["sample"] = record["sample"]
+        else:
+            result["error"] = record.get("error") or f"录制时没有收到 {topic} 的消息"
+        return result
+
+    async def arate(self, topic: str, window_s: float) -> Optional[float]:
+        record = open_snapshot(self.path).record(topic)
+        return None if record is None else record.get("rate_hz")
+
+
+def file_backend(path: str, domain_id: int = 0) -> IntrospectionBackend:
+    """话题图文件 → 后端：.r2snap 快照用 SnapshotBackend，JSON/YAML 假图用 FakeBackend"""
+    if is_snapshot(path):
+        return SnapshotBackend(path, domain_id)
+    return FakeBackend(path, domain_id)
+
+
+# ========== 录制 ==========
+async def record_snapshot(
+    path: str,
+    backend: Optional[IntrospectionBackend] = None,
+    topics: Optional[List[str]] = None,
+    concurrency: int = DEFAULT_RECORD_CONCURRENCY,
+    timeout: float = DEFAULT_PROBE_TIMEOUT_S,
+    rate_window_s: float = DEFAULT_RATE_WINDOW_S,
+) -> Dict[str, Any]:
+    """并发录制话题快照；topics 缺省录全部话题，rate_window_s=0 不测频率。返回录制统计"""
+    if backend is None:
+        backend = introspector.backend(current_domain())
+    start = time.perf_counter()
+    graph = await asyncio.to_thread(backend.topic_names_and_types)
+    names = sorted(graph) if topics is None else list(topics)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def capture(topic: str) -> Tuple[Dict[str, Any], Optional[float]]:
+        msg_type = (graph.get(topic) or [""])[0]
+        async with semaphore:
+            probe = asyncio.wait_for(backend.aprobe(topic, msg_type, timeout), timeout + PROBE_GRACE_S)
+            rate = backend.arate(topic, rate_window_s) if rate_window_s > 0 else asyncio.sleep(0)
+            raw, hz = await asyncio.gather(probe, rate, return_exceptions=True)
+        if isinstance(raw, asyncio.TimeoutError):
+            raw = {"error": f"探测超时（{timeout}s）"}
+        elif isinstance(raw, IntrospectionError):
+            raw = {"error": str(raw)}
+        elif isinstance(raw, (asyncio.CancelledError, KeyboardInterrupt)):
+            raise raw
+        elif isinstance(raw, BaseException):
+            # 后端的其他异常只记在这个话题上，不中断整份快照
+            raw = {"error": f"{type(raw).__name__}: {raw}"}
+        return dict(raw, name=topic, types=graph.get(topic) or [t for t in [raw.get("type")] if t]), (
+            hz if isinstance(hz, (int, float)) else None
+        )
+
+    failed: List[str] = []
+    meta = {
+        "domain_id": getattr(backend, "domain_id", None),
+        "backend": backend.name,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "rate_window_s": rate_window_s,
+    }
+    with SnapshotWriter(path, **meta) as writer:
+        # 谁先探测完先写谁，内存里不攒全部样本
+        for future in asyncio.as_completed([capture(topic) for topic in names]):
+            raw, hz = await future
+            msg_type = raw.get("type", "")
+            if raw.get("interface") and not writer.has_interface(msg_type):
+                writer.add_interface(msg_type, raw["interface"])
+            record = {
+                "name": raw["name"],
+                "types": raw["types"],
+                "publishers": int(raw.get("publishers", 0)),
+                "qos": raw.get("qos", []),
+                "rate_hz": None if hz is None else round(hz, 3),
+                "sample": compact_sample(msg_type, raw.get("sample")),
+            }
+            if raw.get("error"):
+                record["error"] = raw["error"]
+                failed.append(raw["name"])
+            writer.add_topic(record)
+    report = {
+        "path": path,
+        "topics": len(names),
+        "failed": len(failed),
+        "bytes": os.path.getsize(path),
+        "elapsed_s": round(time.perf_counter() - start, 3),
+    }
+    log_event(logger, logging.INFO if not failed else logging.WARNING, "ros2_snapshot_recorded", backend=backend.name, **report)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AutoDriver ROS2话题快照")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="录制当前ROS2图的话题快照")
+    record.add_argument("-o", "--output", required=True, help=f"快照文件（建议后缀 {SUFFIX}）")
+    record.add_argument("--domain", type=int, default=None, help="ROS_DOMAIN_ID，缺省取环境变量")
+    record.add_argument("--topic", action="append", dest="topics", help="只录这些话题（可重复），缺省录全部")
+    record.add_argument("-c", "--concurrency", type=int, default=DEFAULT_RECORD_CONCURRENCY)
+    record.add_argument("--timeout", type=float, default=DEFAULT_PROBE_TIMEOUT_S, help="单话题取样本的超时秒数")
+    record.add_argument("--rate-window", type=float, default=DEFAULT_RATE_WINDOW_S, help="测频率的时长秒数，0=不测")
+    info = commands.add_parser("info", help="打印快照概况")
+    info.add_argument("snapshot")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        domain = current_domain() if args.domain is None else args.domain
+        report = asyncio.run(record_snapshot(
+            args.output, backend=introspector.backend(domain), topics=args.topics,
+            concurrency=args.concurrency, timeout=args.timeout, rate_window_s=args.rate_window,
+        ))
+        print(json.dumps(report, ensure_ascii=False, indent=2), file=sys.stderr)
+        return 1 if report["failed"] == report["topics"] else 0
+
+    reader = open_snapshot(args.snapshot)
+    summary = dict(reader.meta, topics=len(reader), with_sample=0, topic_list=[])
+    for record in reader.iter_records():
+        summary["with_sample"] += record.get("sample") is not None
+        summary["topic_list"].append(
+            {"name": record["name"], "types": record.get("types"), "rate_hz": record.get("rate_hz"), "error": record.get("error", "")}
+        )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+# src/agent/shm_client.py
+"""生成驱动共享内存导出的读取端：其他进程零拷贝读取驱动节点的最新相机帧和关节向量。
+
+驱动配置 shm_export 非空（如 "autodriver"）时，节点把各相机解码后的帧（image_<相机名>）和
+follower_arms / leader_arms 写进 multiprocessing.shared_memory 环形缓冲（写入端见 data/common/shm_export.py.j2）：
+    目录段 <前缀>          SHM_MAGIC + u32 长度 + JSON {"version", "pid", "streams": {流名: {"segment", "shape", "dtype", "slots"}}}
+    数据段 <前缀>_<流名>   64字节段头 + slots 个槽；每槽 64字节槽头（begin seq / end seq / 时间戳ns）+ 数据
+
+latest() 返回的是共享内存上的只读 numpy 视图，写方在之后 slots-1 次写入内不会覆盖它；
+用完后 valid() 为False说明读的过程中被覆盖了（seqlock），需要长期保留时用 read() 拷一份一致的数据。
+
+    from src.agent.shm_client import ShmClient
+    with ShmClient("autodriver") as client:
+        frame = client.wait("image_top_left")
+        policy(frame.data)                       # (720, 1280, 3) uint8，不拷贝
+        assert client.valid("image_top_left", frame)
+
+命令行：
+    python -m src.agent.shm_client info autodriver
+"""
+import argparse
+import json
+import struct
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+# 与 data/common/shm_export.py.j2 保持一致
+SHM_MAGIC = b"ADSHM001"
+SHM_VERSION = 1
+SHM_HEADER = struct.Struct("<8sIIQ8s4I")
+SHM_HEADER_BYTES = 64
+SHM_LATEST_OFFSET = 48
+SHM_SLOT_HEADER_BYTES = 64
+DEFAULT_POLL_S = 0.0005
+_ATTACH_LOCK = threading.Lock()
+
+
+class ShmExportError(RuntimeError):
+    """共享内存段不存在（驱动没启动或没开 shm_export）或格式不对"""
+
+
+class ShmFrame(NamedTuple):
+    seq: int
+    stamp_ns: int
+    data: np.ndarray
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """只附着不托管：读方退出时不能让 resource_tracker 把驱动的段删掉"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.12 及以前没有 track 参数：附着期间不登记。不能附着后再取消登记，
+        # 读写同进程时那样会把写方的登记一并删掉
+        from multiprocessing import resource_tracker
+
+        with _ATTACH_LOCK:
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args: None
+            try:
+                return shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+
+
+class ShmStream:
+    """一个数据流（一路相机或一组关节向量）的读取端"""
+
+    def __init__(self, name: str, segment: str):
+        self.name = name
+        try:
+            self.shm = _attach(segment)
+        except FileNotFoundError as e:
+            raise ShmExportError(f"共享内存段不存在: {segment}") from e
+        magic, slots, ndim, slot_bytes, dtype, *shape = SHM_HEADER.unpack_from(self.shm.buf, 0)
+        if magic != SHM_MAGIC:
+            self.shm.close()
+            raise ShmExportError(f"不是AutoDriver导出的共享内存段: {segment}")
+        self.slots = slots
+        self.shape = tuple(shape[:ndim])
+        self.dtype = np.dtype(dtype.rstrip(b"\0").decode())
+        # 视图都建在 np.frombuffer 上：还有视图在用时 close() 会报 BufferError，而不是解除映射后访问越界
+        buf = np.frombuffer(self.shm.buf, np.uint8)
+        self._latest = np.ndarray((1,), np.uint64, buf, SHM_LATEST_OFFSET)
+        self._meta = np.ndarray((slots, 3), np.uint64, buf, SHM_HEADER_BYTES, (slot_bytes, 8))
+        strides = (slot_bytes,) + np.empty(self.shape, self.dtype).strides
+        self._data = np.ndarray((slots,) + self.shape, self.dtype, buf, SHM_HEADER_BYTES + SHM_SLOT_HEADER_BYTES, strides)
+        self._data.flags.writeable = False
+
+    @property
+    def seq(self) -> int:
+        """最新一帧的序号，0=还没有数据"""
+        return int(self._latest[0])
+
+    def latest(self) -> Optional[ShmFrame]:
+        """最新完整的一帧（共享内存上的只读视图，不拷贝）；还没有数据时返回None"""
+        while True:
+            seq = int(self._latest[0])
+            if not seq:
+                return None
+            index = seq % self.slots
+            stamp_ns = int(self._meta[index, 2])
+            # 槽头 end 还是这个seq，说明写方还没绕回来覆盖它
+            if int(self._meta[index, 1]) == seq and int(self._meta[index, 0]) == seq:
+                return ShmFrame(seq, stamp_ns, self._data[index])
+
+    def valid(self, frame: ShmFrame) -> bool:
+        """frame 的数据是否仍未被覆盖：用完视图后调用，为False时这一帧作废"""
+        return int(self._meta[frame.seq % self.slots, 0]) == frame.seq
+
+    def read(self, out: Optional[np.ndarray] = None) -> Optional[ShmFrame]:
+        """拷贝一份一致的最新帧到 out（缺省新建）"""
+        while True:
+            frame = self.latest()
+            if frame is None:
+                return None
+            if out is None:
+                out = np.empty(self.shape, self.dtype)
+            np.copyto(out, frame.data)
+            if self.valid(frame):
+                return ShmFrame(frame.seq, frame.stamp_ns, out)
+
+    def wait(self, after_seq: int = 0, timeout: float = 1.0, poll_s: float = DEFAULT_POLL_S) -> Optional[ShmFrame]:
+        """等到比 after_seq 新的一帧；超时返回None"""
+        deadline = time.monotonic() + timeout
+        while int(self._latest[0]) <= after_seq:
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_s)
+        return self.latest()
+
+    def close(self) -> None:
+        # numpy视图引用着 shm.buf，先释放才能 close
+        self._latest = self._meta = self._data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # 调用方还拿着 latest() 返回的视图：交出映射，等最后一个视图释放时由mmap自己解除；
+            # 只关文件描述符，免得 SharedMemory.__del__ 再 close 一次报错
+            self.shm._buf = self.shm._mmap = None
+            self.shm.close()
+
+
+class ShmClient:
+    """按前缀附着驱动导出的全部数据流；数据流在第一次访问时才附着"""
+
+    def __init__(self, prefix: str = "autodriver"):
+        self.prefix = prefix
+        try:
+            directory = _attach(prefix)
+        except FileNotFoundError as e:
+            raise ShmExportError(f"没有找到共享内存导出 {prefix}（驱动未启动或 shm_export 未配置）") from e
+        try:
+            head = bytes(directory.buf[:len(SHM_MAGIC) + 4])
+            if head[:len(SHM_MAGIC)] != SHM_MAGIC:
+                raise ShmExportError(f"不是AutoDriver导出的目录段: {prefix}")
+            (length,) = struct.unpack("<I", head[len(SHM_MAGIC):])
+            start = len(SHM_MAGIC) + 4
+            self.meta: Dict[str, Any] = json.loads(bytes(directory.buf[start:start + length]))
+        finally:
+            directory.close()
+        if self.meta.get("version") != SHM_VERSION:
+            raise ShmExportError(f"不支持的导出版本: {self.meta.get('version')}")
+        self._streams: Dict[str, ShmStream] = {}
+
+    @property
+    def streams(self) -> List[str]:
+        return list(self.meta["streams"])
+
+    def stream(self, name: str) -> ShmStream:
+        stream = self._streams.get(name)
+        if stream is None:
+            if name not in self.meta["streams"]:
+                raise KeyError(f"没有导出数据流 {name}，可用: {self.streams}")
+            stream = self._streams[name] = ShmStream(name, self.meta["streams"][name]["segment"])
+        return stream
+
+    def latest(self, name: str) -> Optional[ShmFrame]:
+        return self.stream(name).latest()
+
+    def valid(self, name: str, frame: ShmFrame) -> bool:
+        return self.stream(name).valid(frame)
+
+    def read(self, name: str, out: Optional[np.ndarray] = None) -> Optional[ShmFrame]:
+        return self.stream(name).read(out)
+
+    def wait(self, name: str, after_seq: int = 0, timeout: float = 1.0) -> Optional[ShmFrame]:
+        return self.stream(name).wait(after_seq, timeout)
+
+    def close(self) -> None:
+        for stream in self._streams.values():
+            stream.close()
+        self._streams = {}
+
+    def __enter__(self) -> "ShmClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+# ========== 命令行 ==========
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AutoDriver 共享内存导出读取")
+    commands = parser.add_subparsers(dest="command", required=True)
+    info = commands.add_parser("info", help="打印各数据流的形状、最新序号和数据年龄")
+    info.add_argument("prefix", nargs="?", default="autodriver")
+    args = parser.parse_args(argv)
+
+    try:
+        client = ShmClient(args.prefix)
+    except ShmExportError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    with client:
+        summary = dict(client.meta, streams={})
+        now_ns = time.time_ns()
+        for name, spec in client.meta["streams"].items():
+            frame = client.latest(name)
+            summary["streams"][name] = dict(
+                spec,
+                seq=frame.seq if frame else 0,
+                age_ms=round((now_ns - frame.stamp_ns) / 1e6, 1) if frame else None,
+            )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+# src/agent/startup.py
+"""启动预热：导入src.agent不做任何重量级初始化，服务可以在后台显式预热，
+把LLM客户端构造、工具绑定、缓存库打开、向量库构建从第一次请求里挪走。"""
+import threading
+import time
+from typing import Dict, Optional
+
+
+def warmup(vector_store: bool = True) -> Dict[str, float]:
+    """同步预热，返回各步骤耗时(秒)；可重复调用，已初始化的部分直接跳过"""
+    timings: Dict[str, float] = {}
+
+    start = time.perf_counter()
+    from src.agent.nodes import get_model_with_tools
+    get_model_with_tools()
+    timings["llm_client"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from src.agent.cache import llm_cache
+    llm_cache.open()
+    timings["llm_cache"] = time.perf_counter() - start
+
+    if vector_store:
+        start = time.perf_counter()
+        from src.agent.rag import get_retriever
+        get_retriever()
+        timings["vector_store"] = time.perf_counter() - start
+    return timings
+
+
+_warmup_thread: Optional[threading.Thread] = None
+
+
+def start_background_warmup(vector_store: bool = True) -> threading.Thread:
+    """在守护线程里预热，不阻塞服务启动；重复调用返回同一个线程"""
+    global _warmup_thread
+    if _warmup_thread is None:
+        _warmup_thread = threading.Thread(
+            target=warmup, kwargs={"vector_store": vector_store}, name="autodriver-warmup", daemon=True
+        )
+        _warmup_thread.start()
+    return _warmup_thread
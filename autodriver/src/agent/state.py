@@ -1,12 +1,13 @@
 # src/agent/state.py
 from typing import TypedDict, Union, List, Annotated, Dict, Any
 from langchain_core.messages import BaseMessage
-import operator
+from langgraph.graph.message import add_messages
 
 # 完整的计算Agent状态定义，严格遵循官方设计原则：只存原始数据、结构化、扁平化
 class CalcAgentState(TypedDict):
-    # 消息列表：用户/AI/工具消息，operator.add 实现消息列表的自动追加（核心特性）
-    messages: Annotated[List[BaseMessage], operator.add]
+    # 消息列表：用户/AI/工具消息，add_messages 实现消息列表的自动追加（核心特性）
+    # 同id消息覆盖而不是重复追加，字典格式的输入消息自动转换为BaseMessage
+    messages: Annotated[List[BaseMessage], add_messages]
     # 解析后的用户输入（可选，工程化推荐，便于后续扩展）
     parsed_input: Union[dict, None]
     # LLM调用次数统计，双重兜底防None
@@ -16,4 +17,11 @@ class CalcAgentState(TypedDict):
     ros2_topic_list: List[str]          # 存储ros2 topic list执行结果的话题列表
     ros2_parsed_config: Dict[str, Any]  # 解析后的机器人完整配置字典(填充模板核心数据)
     generated_node_py: str              # 最终渲染好的node.py完整代码文本
-    ros2_triggered: bool                # ROS2功能触发标记：True=生成代码，False=走原有逻辑
\ No newline at end of file
+    ros2_triggered: bool                # ROS2功能触发标记：True=生成代码，False=走原有逻辑
+
+    # ========== 本地算术快速通道 ==========
+    fast_path_hit: bool                 # True=本地已算出结果，跳过所有LLM调用直接结束
+
+    # ========== 上下文窗口管理 ==========
+    context_summary: str                # 已折叠出窗口的历史轮次的滚动摘要
+    context_window_start: int           # messages中窗口起点下标，之前的消息只以摘要形式进入prompt
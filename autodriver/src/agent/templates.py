@@ -0,0 +1,135 @@
+# src/agent/templates.py
+"""驱动代码模板注册表：按 目标框架(ros2/ros1/dora) × 厂商 查找Jinja2模板并渲染。
+
+模板放在 data/<目标>/template/<厂商>/node_template.py.j2，厂商没有专属模板时用同目标下的 default。
+各目标共用的运行时代码片段（图像解码流水线等）放在 data/common/，模板里用 {% include "common/..." %} 内联进生成的驱动。
+路径相对包所在目录解析（AUTODRIVER_TEMPLATE_DIR 可换），与当前工作目录无关。
+
+模板编译一次后缓存在Jinja环境里，渲染前只比较一次文件mtime，改了模板自动重新编译；
+配置区由模板逐项渲染成Python字面量（pyliteral 过滤器），不再用正则替换源码。
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from src.agent.log import get_logger
+from src.agent.topic_rules import DEFAULT_VENDOR
+
+logger = get_logger("templates")
+
+TEMPLATE_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data")
+TARGETS = ("ros2", "ros1", "dora")
+TEMPLATE_FILE = "node_template.py.j2"
+FALLBACK_VENDOR = "default"
+DEFAULT_TEMPLATE_CACHE_SIZE = 64
+
+# 配置区各项上方的注释
+CONFIG_COMMENTS = {
+    "publish_topics": "发布话题: 机器人指令下发 (上位机→机器人)",
+    "follow_feedback_topics": "订阅话题-跟随反馈: 机器人关节实时状态 (机器人→上位机)",
+    "main_cmd_topics": "订阅话题-主指令: 上位机下发的关节+位姿指令",
+    "camera_topics": "订阅话题-相机图像",
+    "camera_size": "相机分辨率配置 (宽, 高)，通过样本消息测得",
+    "camera_encoding": "相机编码 (jpeg/png/bgr8/rgb8/depth16)，通过样本消息的format/encoding得到",
+    "camera_decode_scale": "可选：按 1/2、1/4、1/8 缩小解码的相机 {相机名: 2/4/8}，如腕部相机；缓冲区按 camera_size 缩小后的尺寸分配",
+    "joint_dim": "关节维度配置 (通过ros2 topic echo解析得到)",
+    "control_hz": "控制频率",
+    "shm_export": "可选：共享内存导出名前缀（如 autodriver），非空时把最新相机帧和关节向量写进共享内存，其他进程用 src/agent/shm_client.py 零拷贝读取",
+    "topic_types": "各话题的消息类型",
+    "vendor": "机器人厂商（决定话题规则和模板）",
+}
+
+
+def pyliteral(value: Any, indent: int = 0, width: int = 100) -> str:
+    """值 → Python源码字面量；放不进一行的dict逐项换行，续行按 indent 缩进"""
+    if isinstance(value, str):
+        # JSON字符串同时是合法的Python字符串字面量，且保留中文
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, dict):
+        flat = "{" + ", ".join(f"{pyliteral(k)}: {pyliteral(v)}" for k, v in value.items()) + "}"
+        if len(flat) + indent <= width or not value:
+            return flat
+        pad = " " * (indent + 4)
+        items = "".join(f"{pad}{pyliteral(k)}: {pyliteral(v, indent + 4, width)},\n" for k, v in value.items())
+        return "{\n" + items + " " * indent + "}"
+    if isinstance(value, tuple):
+        inner = ", ".join(pyliteral(v) for v in value)
+        return f"({inner},)" if len(value) == 1 else f"({inner})"
+    if isinstance(value, list):
+        return "[" + ", ".join(pyliteral(v) for v in value) + "]"
+    if value is None or isinstance(value, (bool, int, float)):
+        return repr(value)
+    raise TypeError(f"配置里有无法写成Python字面量的值: {value!r}")
+
+
+class TemplateRegistry:
+    """Jinja2环境 + 模板查找；进程内共享，线程安全（Jinja的模板缓存自带锁）"""
+
+    def __init__(self, root: str = TEMPLATE_ROOT, cache_size: int = DEFAULT_TEMPLATE_CACHE_SIZE):
+        self.root = root
+        self.cache_size = cache_size
+        self._env: Any = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "TemplateRegistry":
+        """AUTODRIVER_TEMPLATE_DIR：模板根目录（其下是 <目标>/template/<厂商>/）"""
+        return cls(root=os.path.expanduser(os.getenv("AUTODRIVER_TEMPLATE_DIR", TEMPLATE_ROOT)))
+
+    @property
+    def env(self) -> Any:
+        if self._env is None:
+            with self._lock:
+                if self._env is None:
+                    from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
+                    env = Environment(
+                        # 自定义模板目录里没有的片段（common/*）回落到包内自带的
+                        loader=FileSystemLoader(list(dict.fromkeys([self.root, TEMPLATE_ROOT]))),
+                        # 每次取模板只比较mtime，文件没变就复用编译好的模板
+                        auto_reload=True,
+                        cache_size=self.cache_size,
+                        undefined=StrictUndefined,
+                        keep_trailing_newline=True,
+                        trim_blocks=True,
+                        lstrip_blocks=True,
+                    )
+                    env.filters["pyliteral"] = pyliteral
+                    env.globals["config_comments"] = CONFIG_COMMENTS
+                    self._env = env
+        return self._env
+
+    def available(self) -> Dict[str, List[str]]:
+        """{目标: [有模板的厂商]}"""
+        found: Dict[str, List[str]] = {}
+        for target in TARGETS:
+            base = os.path.join(self.root, target, "template")
+            try:
+                vendors = sorted(os.listdir(base))
+            except OSError:
+                continue
+            found[target] = [v for v in vendors if os.path.isfile(os.path.join(base, v, TEMPLATE_FILE))]
+        return found
+
+    def resolve(self, target: str = "ros2", vendor: Optional[str] = None) -> str:
+        """模板名（相对模板根目录）；厂商没有专属模板时回落到 default"""
+        if target not in TARGETS:
+            raise ValueError(f"未知的目标框架: {target}（可选: {', '.join(TARGETS)}）")
+        for candidate in (vendor, FALLBACK_VENDOR):
+            if candidate and os.path.isfile(os.path.join(self.root, target, "template", candidate, TEMPLATE_FILE)):
+                return f"{target}/template/{candidate}/{TEMPLATE_FILE}"
+        raise FileNotFoundError(f"没有 {target} 的驱动模板（厂商 {vendor or FALLBACK_VENDOR}），模板目录: {self.root}")
+
+    def render(self, robot_config: Dict[str, Any], target: str = "ros2", vendor: Optional[str] = None) -> str:
+        """渲染驱动代码；vendor 缺省取配置里的 vendor，老配置没有这一项时按 DEFAULT_VENDOR"""
+        vendor = vendor or robot_config.get("vendor") or DEFAULT_VENDOR
+        template = self.env.get_template(self.resolve(target, vendor))
+        return template.render(robot_config=robot_config, target=target, vendor=vendor)
+
+
+registry = TemplateRegistry.from_env()
+
+
+def render_driver(robot_config: Dict[str, Any], target: str = "ros2", vendor: Optional[str] = None) -> str:
+    return registry.render(robot_config, target, vendor)
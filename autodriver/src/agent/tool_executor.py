@@ -0,0 +1,143 @@
+# src/agent/tool_executor.py
+"""并发工具执行器：同一轮的多个tool_call并发执行，结果按tool_call_id原顺序返回。
+
+- 每个工具可单独配置超时时间和并发上限
+- 使用专用的有界线程池，不占用asyncio默认线程池；提供了异步实现的工具（如knowledge_query）直接await，不进线程池
+- 单个调用失败/超时只影响它自己，以 status="error" 的ToolMessage返回给LLM
+"""
+import asyncio
+import math
+import os
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional
+
+from langchain_core.messages import ToolMessage
+from langchain_core.messages.tool import ToolCall
+
+from src.agent.metrics import metrics
+
+# ========== 默认配置 ==========
+DEFAULT_TOOL_TIMEOUT = 30.0
+DEFAULT_TOOL_CONCURRENCY = 8
+DEFAULT_MAX_WORKERS = 8
+# ros2_parse_topic_to_config 超时的估算：一台双臂机器人配置里的话题数上限，以及话题列表查询等额外余量（秒）
+PARSE_TOOL_TOPICS = 24
+PARSE_TOOL_MARGIN_S = 5.0
+
+
+def parse_tool_timeout() -> float:
+    """ros2_parse_topic_to_config 的超时：AUTODRIVER_ROS2_PARSE_TIMEOUT_S 显式指定，
+    否则按探测设置推算 ceil(话题数/探测并发) × (单话题超时 + PROBE_GRACE_S) + 余量"""
+    override = os.getenv("AUTODRIVER_ROS2_PARSE_TIMEOUT_S")
+    if override:
+        return float(override)
+    from src.agent.ros2_probe import DEFAULT_PROBE_CONCURRENCY, DEFAULT_PROBE_TIMEOUT_S, PROBE_GRACE_S
+
+    concurrency = max(1, int(os.getenv("AUTODRIVER_ROS2_PROBE_CONCURRENCY", DEFAULT_PROBE_CONCURRENCY)))
+    timeout = float(os.getenv("AUTODRIVER_ROS2_PROBE_TIMEOUT_S", DEFAULT_PROBE_TIMEOUT_S))
+    return math.ceil(PARSE_TOOL_TOPICS / concurrency) * (timeout + PROBE_GRACE_S) + PARSE_TOOL_MARGIN_S
+
+
+# 单个工具的超时时间（秒），未配置的工具使用 DEFAULT_TOOL_TIMEOUT
+TOOL_TIMEOUTS: Dict[str, float] = {
+    "add": 1.0,
+    "multiply": 1.0,
+    "divide": 1.0,
+    "knowledge_query": 15.0,
+    "ros2_get_topic_list": 10.0,
+    # 含话题并发探测，随探测并发/单话题超时推算（默认 3批 × 9秒 + 5秒）
+    "ros2_parse_topic_to_config": parse_tool_timeout(),
+    "ros2_render_node_template": 5.0,
+}
+
+# 单个工具的并发上限，未配置的工具使用 DEFAULT_TOOL_CONCURRENCY
+# ROS2命令会拉起子进程访问同一个ROS2图，串行执行避免互相干扰
+TOOL_CONCURRENCY: Dict[str, int] = {
+    "knowledge_query": 4,
+    "ros2_get_topic_list": 1,
+}
+
+
+class ToolExecutor:
+    """并发执行一轮tool_calls，线程池懒加载、进程内复用"""
+
+    def __init__(
+        self,
+        tools_by_name: Mapping[str, Any],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        timeouts: Optional[Mapping[str, float]] = None,
+        concurrency: Optional[Mapping[str, int]] = None,
+    ):
+        self.tools_by_name = tools_by_name
+        self.max_workers = max_workers
+        self.timeouts = dict(TOOL_TIMEOUTS if timeouts is None else timeouts)
+        self.concurrency = dict(TOOL_CONCURRENCY if concurrency is None else concurrency)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # asyncio.Semaphore绑定事件循环，按循环分别维护
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @classmethod
+    def from_env(cls, tools_by_name: Mapping[str, Any]) -> "ToolExecutor":
+        """AUTODRIVER_TOOL_WORKERS 控制线程池大小；探测相关的环境变量在构造时重新读取"""
+        return cls(
+            tools_by_name,
+            max_workers=int(os.getenv("AUTODRIVER_TOOL_WORKERS", DEFAULT_MAX_WORKERS)),
+            timeouts=dict(TOOL_TIMEOUTS, ros2_parse_topic_to_config=parse_tool_timeout()),
+        )
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="autodriver-tool")
+        return self._pool
+
+    def _get_semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphores = self._semaphores.setdefault(loop, {})
+        if tool_name not in semaphores:
+            semaphores[tool_name] = asyncio.Semaphore(self.concurrency.get(tool_name, DEFAULT_TOOL_CONCURRENCY))
+        return semaphores[tool_name]
+
+    async def run(self, tool_calls: List[ToolCall]) -> List[ToolMessage]:
+        """并发执行全部调用，返回顺序与tool_calls一致"""
+        return list(await asyncio.gather(*(self._run_one(call) for call in tool_calls)))
+
+    async def _run_one(self, call: ToolCall) -> ToolMessage:
+        name = call["name"]
+        tool_func = self.tools_by_name.get(name)
+        if tool_func is None:
+            return self._error(call, f"未知工具: {name}", "UnknownTool")
+        timeout = self.timeouts.get(name, DEFAULT_TOOL_TIMEOUT)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            async with self._get_semaphore(name):
+                if getattr(tool_func, "coroutine", None) is not None:
+                    # 提供了异步实现的工具直接在事件循环里跑，由工具自己决定哪些部分进线程
+                    pending = tool_func.ainvoke(call["args"])
+                else:
+                    pending = loop.run_in_executor(self._get_pool(), tool_func.invoke, call["args"])
+                result = await asyncio.wait_for(pending, timeout=timeout)
+        except asyncio.TimeoutError:
+            return self._error(call, f"工具 {name} 执行超时（{timeout}s）", "Timeout", start)
+        except Exception as e:
+            return self._error(call, f"工具 {name} 执行失败: {e}", type(e).__name__, start)
+        # 耗时包含排队等待并发名额的时间，反映的是调用方实际感受到的延迟
+        metrics.observe("autodriver_tool_duration_seconds", time.perf_counter() - start, tool=name)
+        return ToolMessage(content=str(result), tool_call_id=call["id"], name=name)
+
+    @staticmethod
+    def _error(call: ToolCall, content: str, error: str, start: Optional[float] = None) -> ToolMessage:
+        if start is not None:
+            metrics.observe("autodriver_tool_duration_seconds", time.perf_counter() - start, tool=call["name"])
+        metrics.inc("autodriver_errors_total", kind="tool", name=call["name"], error=error)
+        return ToolMessage(content=content, tool_call_id=call["id"], name=call["name"], status="error")
+
+    def shutdown(self, wait: bool = False) -> None:
+        """释放线程池（超时未完成的工具线程不会被强制终止）"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
@@ -0,0 +1,235 @@
+# src/agent/topic_rules.py
+"""ROS2话题分类：按厂商的YAML规则文件把话题列表归到机器人配置的各个配置项。
+
+规则文件在 data/ros2/rules/<厂商>.yaml（AUTODRIVER_ROS2_RULES_DIR 可换目录），格式：
+
+    vendor: galaxea
+    detect: [/hdas/, /motion_target/]          # 厂商自动识别用的模式
+    rules:                                      # 配置项 → 正则（re.search 语义，不要用命名分组）
+      publish_topics.left_arm: target_joint_state_arm_left
+    defaults:                                   # 可选：覆盖默认配置里与硬件相关的值
+      joint_dim: {left_arm: 7}
+
+每个厂商的规则只编译一次：所有模式合成一个正则，每个话题一次匹配就知道命中了哪些配置项；
+再用全部模式的"或"先筛一遍，大部分无关话题一次搜索就被排除。规则文件改动后按mtime自动重新加载。
+"""
+import copy
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Pattern, Tuple
+
+from src.agent.log import get_logger, log_event
+
+logger = get_logger("ros2")
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "ros2", "rules")
+DEFAULT_VENDOR = "galaxea"
+
+# 机器人配置骨架：话题配置项全空，硬件参数是 GALAXEALITE 模板的默认值，厂商规则文件里的 defaults 覆盖其上
+BASE_CONFIG: Dict[str, Any] = {
+    "publish_topics": {"left_arm": "", "right_arm": "", "left_gripper": "", "right_gripper": "", "torso": ""},
+    "follow_feedback_topics": {"left_arm": "", "right_arm": "", "left_gripper": "", "right_gripper": "", "torso": ""},
+    "main_cmd_topics": {"joint_left": "", "joint_right": "", "joint_torso": "", "pose_left": "", "pose_right": "", "pose_torso": "", "gripper_left": "", "gripper_right": ""},
+    "camera_topics": {"top_left": "", "top_right": "", "wrist_left": "", "wrist_right": ""},
+    "camera_size": {"top_left": (1280, 720), "top_right": (1280, 720), "wrist_left": (640, 360), "wrist_right": (640, 360)},
+    "camera_encoding": {"top_left": "jpeg", "top_right": "jpeg", "wrist_left": "jpeg", "wrist_right": "jpeg"},
+    "camera_decode_scale": {},
+    "joint_dim": {"left_arm": 6, "right_arm": 6, "gripper": 1, "torso": 3, "torso_cut": -1},
+    "control_hz": 30,
+    "shm_export": "",
+}
+
+
+class RuleSet:
+    """一个厂商编译好的话题分类规则"""
+
+    def __init__(
+        self,
+        vendor: str,
+        rules: List[Tuple[str, str]],
+        detect: Iterable[str] = (),
+        defaults: Optional[Dict[str, Any]] = None,
+        description: str = "",
+    ):
+        self.vendor = vendor
+        self.description = description
+        self.rules = rules
+        self.detect = list(detect)
+        self.defaults = defaults or {}
+        for slot, _ in rules:
+            section, _, name = slot.partition(".")
+            if not isinstance(BASE_CONFIG.get(section), dict) or name not in BASE_CONFIG[section]:
+                raise ValueError(f"厂商 {vendor} 的规则里有未知配置项: {slot}")
+
+        # 相同的模式只匹配一次，命中后分给所有用它的配置项
+        self.patterns: List[str] = list(dict.fromkeys(pattern for _, pattern in rules))
+        self._slots_by_pattern: List[List[str]] = [
+            [slot for slot, p in rules if p == pattern] for pattern in self.patterns
+        ]
+        try:
+            # 每个模式一个可选前瞻：一次 match 得到该话题命中的全部模式
+            self._matcher = re.compile(
+                "".join(f"(?:(?=.*?(?P<p{i}>{pattern})))?" for i, pattern in enumerate(self.patterns))
+            )
+            self._prefilter = re.compile("|".join(f"(?:{pattern})" for pattern in self.patterns))
+        except re.error as e:
+            raise ValueError(f"厂商 {vendor} 的规则正则有误: {e}") from e
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], source: str = "") -> "RuleSet":
+        vendor = data.get("vendor") or os.path.splitext(os.path.basename(source))[0]
+        rules = data.get("rules") or {}
+        if not isinstance(rules, dict):
+            raise ValueError(f"规则文件 {source} 的 rules 必须是 配置项→正则 的映射")
+        return cls(
+            vendor=str(vendor),
+            rules=[(str(slot), str(pattern)) for slot, pattern in rules.items()],
+            detect=[str(p) for p in data.get("detect") or []],
+            defaults=data.get("defaults") or {},
+            description=str(data.get("description", "")),
+        )
+
+    def match(self, topic: str) -> List[str]:
+        """话题命中的配置项（可能多个，例如同一话题既是下发话题也是主指令话题）"""
+        if not self._prefilter.search(topic):
+            return []
+        groups = self._matcher.match(topic).groupdict()
+        slots: List[str] = []
+        for i, slot_list in enumerate(self._slots_by_pattern):
+            if groups[f"p{i}"] is not None:
+                slots.extend(slot_list)
+        return slots
+
+    def classify(self, topics: Iterable[str]) -> Dict[str, str]:
+        """{配置项: 话题}；每个配置项取列表里第一个命中的话题，全部配置项都有了就提前结束"""
+        assigned: Dict[str, str] = {}
+        total = len(self.rules)
+        for topic in topics:
+            for slot in self.match(topic):
+                assigned.setdefault(slot, topic)
+            if len(assigned) == total:
+                break
+        return assigned
+
+    def build_config(self, topics: Iterable[str]) -> Dict[str, Any]:
+        """话题列表 → 完整机器人配置（骨架 + 厂商defaults + 分类结果）"""
+        config = copy.deepcopy(BASE_CONFIG)
+        for section, values in self.defaults.items():
+            if isinstance(values, dict) and isinstance(config.get(section), dict):
+                config[section].update(values)
+            else:
+                config[section] = values
+        # YAML里分辨率写成列表，统一成和骨架一样的元组
+        config["camera_size"] = {k: tuple(v) for k, v in config["camera_size"].items()}
+        for slot, topic in self.classify(topics).items():
+            section, _, name = slot.partition(".")
+            config[section][name] = topic
+        config["vendor"] = self.vendor
+        return config
+
+
+# ========== 规则文件加载（按mtime失效） ==========
+class _Detector(NamedTuple):
+    """所有厂商的识别模式合成的一个正则，命名分组 v<i> 对应 vendors[i]"""
+
+    pattern: Optional[Pattern[str]]
+    vendors: List[str]
+
+
+class _Loaded(NamedTuple):
+    signature: Tuple[Tuple[str, int], ...]
+    rule_sets: Dict[str, RuleSet]
+    detector: _Detector
+
+
+_cache: Dict[str, _Loaded] = {}
+_cache_lock = threading.Lock()
+
+
+def rules_dir() -> str:
+    return os.path.expanduser(os.getenv("AUTODRIVER_ROS2_RULES_DIR", RULES_DIR))
+
+
+def _rule_files(directory: str) -> List[str]:
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return []
+    return [os.path.join(directory, n) for n in names if n.endswith((".yaml", ".yml"))]
+
+
+def compile_detector(rule_sets: Dict[str, RuleSet]) -> _Detector:
+    vendors = [v for v, rule_set in rule_sets.items() if rule_set.detect]
+    if not vendors:
+        return _Detector(None, [])
+    pattern = "|".join(
+        f"(?P<v{i}>{'|'.join(f'(?:{p})' for p in rule_sets[v].detect)})" for i, v in enumerate(vendors)
+    )
+    return _Detector(re.compile(pattern), vendors)
+
+
+def _load(directory: Optional[str] = None) -> _Loaded:
+    import yaml
+
+    directory = directory or rules_dir()
+    files = _rule_files(directory)
+    signature = tuple((path, os.stat(path).st_mtime_ns) for path in files)
+    with _cache_lock:
+        cached = _cache.get(directory)
+        if cached is not None and cached.signature == signature:
+            return cached
+        rule_sets: Dict[str, RuleSet] = {}
+        for path in files:
+            with open(path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+            rule_set = RuleSet.from_dict(data, source=path)
+            rule_sets[rule_set.vendor] = rule_set
+        if not rule_sets:
+            raise ValueError(f"话题规则目录里没有规则文件: {directory}")
+        loaded = _cache[directory] = _Loaded(signature, rule_sets, compile_detector(rule_sets))
+        log_event(logger, logging.INFO, "topic_rules_loaded", directory=directory, vendors=sorted(rule_sets))
+        return loaded
+
+
+def load_rule_sets(directory: Optional[str] = None) -> Dict[str, RuleSet]:
+    """{厂商: RuleSet}；文件没变时直接返回已编译的规则"""
+    return _load(directory).rule_sets
+
+
+# ========== 厂商识别 ==========
+def detect_vendor(topics: Iterable[str], rule_sets: Optional[Dict[str, RuleSet]] = None) -> str:
+    """命中识别模式最多的厂商；一个都没命中时返回 DEFAULT_VENDOR"""
+    if rule_sets is None:
+        loaded = _load()
+        rule_sets, detector = loaded.rule_sets, loaded.detector
+    else:
+        detector = compile_detector(rule_sets)
+    fallback = DEFAULT_VENDOR if DEFAULT_VENDOR in rule_sets else next(iter(rule_sets))
+    if detector.pattern is None:
+        return fallback
+    hits = [0] * len(detector.vendors)
+    for topic in topics:
+        m = detector.pattern.search(topic)
+        if m is not None:
+            hits[int(m.lastgroup[1:])] += 1
+    if not any(hits):
+        return fallback
+    return detector.vendors[hits.index(max(hits))]
+
+
+def get_rule_set(vendor: str = "auto", topics: Iterable[str] = ()) -> RuleSet:
+    """vendor="auto" 时按话题自动识别（AUTODRIVER_ROS2_VENDOR 可固定厂商）"""
+    rule_sets = load_rule_sets()
+    if vendor == "auto":
+        vendor = os.getenv("AUTODRIVER_ROS2_VENDOR", "auto").lower()
+    if vendor == "auto":
+        vendor = detect_vendor(topics)
+    if vendor not in rule_sets:
+        raise ValueError(f"没有厂商 {vendor} 的话题规则（可选: {', '.join(sorted(rule_sets))}）")
+    return rule_sets[vendor]
+
+
+def build_robot_config(topics: List[str], vendor: str = "auto") -> Dict[str, Any]:
+    return get_rule_set(vendor, topics).build_config(topics)
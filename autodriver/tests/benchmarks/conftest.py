@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+from typing import Any, Callable, Dict
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+@pytest.fixture(scope="session")
+def bench_report() -> Callable[[str, Dict[str, Any]], None]:
+    """打印基准结果；设置 AUTODRIVER_BENCH_DIR 时另存为 <dir>/<name>.json，便于跨提交对比"""
+
+    def write(name: str, report: Dict[str, Any]) -> None:
+        report = dict(report, benchmark=name, commit=_git_commit())
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        print(text)
+        output_dir = os.getenv("AUTODRIVER_BENCH_DIR")
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            with open(os.path.join(output_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+                f.write(text)
+
+    return write
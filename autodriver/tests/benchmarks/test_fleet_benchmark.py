@@ -0,0 +1,55 @@
+"""车队批量生成基准：几十台机器人的快照 → 驱动目录，去重后只渲染不同的配置，结果以JSON输出。
+
+    python -m pytest tests/benchmarks/test_fleet_benchmark.py -s
+"""
+import json
+import os
+import time
+
+from src.agent.fleet import generate_fleet, load_fleet
+
+N_ROBOTS = int(os.getenv("AUTODRIVER_FLEET_BENCH_ROBOTS", "48"))
+N_VARIANTS = 4
+WORKERS = int(os.getenv("AUTODRIVER_FLEET_BENCH_WORKERS", "2"))
+
+TOPICS = [
+    "/motion_target/target_joint_state_arm_left",
+    "/motion_target/target_joint_state_arm_right",
+    "/hdas/feedback_arm_left",
+    "/hdas/feedback_arm_right",
+    "/hdas/camera_wrist_left/color/image_raw/compressed",
+]
+
+
+def test_fleet_generation(tmp_path, bench_report) -> None:
+    snaps = tmp_path / "snaps"
+    snaps.mkdir()
+    for i in range(N_ROBOTS):
+        # 每种型号的关节维度不同；同型号的机器人配置相同
+        dim = 6 + i % N_VARIANTS
+        graph = {
+            "topics": {t: ["sensor_msgs/msg/JointState"] for t in TOPICS},
+            "samples": {t: {"position": [0.0] * dim} for t in TOPICS if "joint" in t or "feedback" in t},
+            "delays": {t: 0.05 for t in TOPICS},
+        }
+        (snaps / f"robot_{i:03d}.json").write_text(json.dumps(graph), encoding="utf-8")
+
+    start = time.perf_counter()
+    manifest = generate_fleet(load_fleet(str(snaps)), str(tmp_path / "out"), workers=WORKERS)
+    elapsed = time.perf_counter() - start
+    summary = manifest["summary"]
+
+    bench_report("fleet", {
+        "robots": N_ROBOTS,
+        "workers": WORKERS,
+        "unique_drivers": summary["unique_drivers"],
+        "elapsed_s": round(elapsed, 3),
+        "stages": summary["stages"],
+    })
+
+    assert summary["errors"] == 0
+    assert summary["unique_drivers"] == N_VARIANTS
+    assert len(os.listdir(tmp_path / "out" / "drivers")) == N_VARIANTS
+    # 探测在机器人之间并发：远小于逐台串行的 N*0.05 秒
+    assert summary["stages"]["probe_s"] < N_ROBOTS * 0.05
+    assert elapsed < 30
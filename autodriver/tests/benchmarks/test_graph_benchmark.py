@@ -0,0 +1,189 @@
+"""端到端图基准：用离线假模型跑计算器 / 知识库 / ROS2 三条路径，测每个节点的耗时、端到端耗时和图框架开销。
+
+假模型不访问网络，LLM耗时完全由注入的延迟决定，测出来的差异只来自图本身和工具。
+
+    python -m pytest tests/benchmarks/test_graph_benchmark.py -s
+    AUTODRIVER_BENCH_DIR=bench python -m pytest tests/benchmarks/test_graph_benchmark.py   # 写出 bench/graph.json
+"""
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+
+from src.agent.batch import percentile
+from src.agent.cache import llm_cache
+from src.agent.models import FakeChatModel
+from src.agent import ros2_introspection
+from src.agent.nodes import set_model
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ITERATIONS = int(os.getenv("AUTODRIVER_BENCH_ITERATIONS", "20"))
+# 图框架开销（端到端 - 各节点耗时之和）的p50预算（秒）
+OVERHEAD_BUDGET_S = float(os.getenv("AUTODRIVER_GRAPH_OVERHEAD_BUDGET_S", "0.05"))
+
+PATHS = {
+    "calculator": "请帮我算一下 12 乘 7 等于多少",
+    "calculator_fast_path": "3 + 4",
+    "knowledge": "计算器支持哪些运算？",
+    "ros2": "帮我生成ROS2驱动代码",
+}
+
+# galaxea 机器人上 `ros2 topic list` 的典型输出
+FAKE_TOPICS = [
+    "/motion_target/target_joint_state_arm_left",
+    "/motion_target/target_joint_state_arm_right",
+    "/motion_target/target_position_gripper_left",
+    "/motion_target/target_position_gripper_right",
+    "/motion_target/target_joint_state_torso",
+    "/motion_target/target_pose_arm_left",
+    "/motion_target/target_pose_arm_right",
+    "/hdas/feedback_arm_left",
+    "/hdas/feedback_arm_right",
+    "/hdas/feedback_gripper_left",
+    "/hdas/feedback_gripper_right",
+    "/hdas/feedback_torso",
+    "/hdas/camera_head/left_raw/image_raw_color/compressed",
+    "/hdas/camera_head/right_raw/image_raw_color/compressed",
+    "/hdas/camera_wrist_left/color/image_raw/compressed",
+    "/hdas/camera_wrist_right/color/image_raw/compressed",
+]
+
+
+class NodeTimer(BaseCallbackHandler):
+    """按 langgraph_node 统计节点耗时和节点内的LLM耗时"""
+
+    def __init__(self) -> None:
+        self._starts: Dict[UUID, tuple] = {}
+        self.node_s: Dict[str, float] = defaultdict(float)
+        self.llm_s: Dict[str, float] = defaultdict(float)
+
+    def on_chain_start(self, serialized: Any, inputs: Any, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        # 路由函数等子链也带着同一个langgraph_node，只统计节点本身
+        if node and kwargs.get("name") == node:
+            self._starts[run_id] = ("node", node, time.perf_counter())
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        self._starts[run_id] = ("llm", (metadata or {}).get("langgraph_node", "?"), time.perf_counter())
+
+    def _end(self, run_id: UUID) -> None:
+        entry = self._starts.pop(run_id, None)
+        if entry is not None:
+            kind, node, start = entry
+            (self.node_s if kind == "node" else self.llm_s)[node] += time.perf_counter() - start
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "mean_ms": round(1000 * sum(values) / len(values), 3),
+        "p50_ms": round(1000 * percentile(values, 50), 3),
+        "p95_ms": round(1000 * percentile(values, 95), 3),
+    }
+
+
+async def _run_path(graph: Any, query: str, iterations: int) -> Dict[str, Any]:
+    e2e: List[float] = []
+    overhead: List[float] = []
+    per_node: Dict[str, List[float]] = defaultdict(list)
+    per_llm: Dict[str, List[float]] = defaultdict(list)
+    llm_calls = 0
+    for _ in range(iterations):
+        timer = NodeTimer()
+        start = time.perf_counter()
+        result = await graph.ainvoke(
+            {"messages": [HumanMessage(content=query)], "llm_calls": 0}, config={"callbacks": [timer]}
+        )
+        elapsed = time.perf_counter() - start
+        e2e.append(elapsed)
+        overhead.append(max(0.0, elapsed - sum(timer.node_s.values())))
+        for node, seconds in timer.node_s.items():
+            per_node[node].append(seconds)
+        for node, seconds in timer.llm_s.items():
+            per_llm[node].append(seconds)
+        llm_calls = result.get("llm_calls", 0)
+    return {
+        "iterations": iterations,
+        "llm_calls": llm_calls,
+        "end_to_end": _stats(e2e),
+        "graph_overhead": _stats(overhead),
+        "nodes": {node: _stats(v) for node, v in per_node.items()},
+        "llm": {node: _stats(v) for node, v in per_llm.items()},
+    }
+
+
+@pytest.fixture()
+def offline_graph(monkeypatch, tmp_path_factory):
+    """假模型 + 关闭LLM缓存 + 假ROS2图 + 假嵌入/临时知识库索引目录，返回编译好的graph"""
+    monkeypatch.chdir(PROJECT_ROOT)
+    monkeypatch.setenv("AUTODRIVER_RAG_INDEX_DIR", str(tmp_path_factory.mktemp("knowledge_index")))
+    monkeypatch.setenv("AUTODRIVER_EMBEDDINGS", "fake")
+    monkeypatch.setattr(llm_cache, "enabled", False)
+    fake_graph = tmp_path_factory.mktemp("ros2") / "graph.json"
+    fake_graph.write_text(json.dumps({"topics": FAKE_TOPICS}), encoding="utf-8")
+    monkeypatch.setenv("AUTODRIVER_ROS2_FAKE_GRAPH", str(fake_graph))
+    monkeypatch.setattr(ros2_introspection, "introspector", ros2_introspection.Ros2Introspector(backend="fake"))
+
+    def use_model(**kwargs: Any) -> FakeChatModel:
+        model = FakeChatModel(**kwargs)
+        set_model(model)
+        return model
+
+    from src.agent.graph import graph
+    from src.agent.rag import get_vector_db
+    get_vector_db()  # 向量库构建不计入知识库路径的耗时
+    yield graph, use_model
+    from src.agent import nodes
+    nodes._llm.clear()
+
+
+def test_graph_benchmark(offline_graph, bench_report) -> None:
+    graph, use_model = offline_graph
+    use_model()
+
+    async def run_all() -> Dict[str, Any]:
+        await _run_path(graph, PATHS["calculator"], 2)  # 预热：首次编译正则、建线程池等
+        return {name: await _run_path(graph, query, ITERATIONS) for name, query in PATHS.items()}
+
+    report = {"model": "fake", "latency_s": 0.0, "paths": asyncio.run(run_all())}
+    bench_report("graph", report)
+
+    paths = report["paths"]
+    assert paths["calculator"]["llm_calls"] == 3  # 决策 → 工具 → 决策 → 总结
+    assert "execute_tool" in paths["calculator"]["nodes"]
+    assert paths["calculator_fast_path"]["llm_calls"] == 0
+    assert "execute_tool" in paths["knowledge"]["nodes"]
+    assert "llm_decide" not in paths["ros2"]["llm"]  # ROS2分支直接调用工具链，决策不走LLM
+    for name, result in paths.items():
+        assert result["graph_overhead"]["p50_ms"] / 1000 < OVERHEAD_BUDGET_S, name
+
+
+def test_injected_latency_is_reflected_in_llm_time(offline_graph) -> None:
+    graph, use_model = offline_graph
+    use_model(latency_s=0.02, tokens_per_s=2000)
+
+    result = asyncio.run(_run_path(graph, PATHS["calculator"], 1))
+    for node in ("llm_decide", "llm_summarize"):
+        assert result["llm"][node]["mean_ms"] >= 20
+    assert result["end_to_end"]["mean_ms"] >= 20 * result["llm_calls"]
@@ -0,0 +1,82 @@
+"""生成驱动的图像解码流水线基准：四路720p相机，订阅回调的耗时（只入队）与解码线程池的持续吞吐，结果以JSON输出。
+装了OpenCV时用JPEG帧，否则用rgb8原始帧。
+
+    python -m pytest tests/benchmarks/test_image_decode_benchmark.py -s
+"""
+import collections
+import os
+import threading
+import time
+
+import numpy as np
+
+from src.agent.templates import TemplateRegistry
+
+N_FRAMES = int(os.getenv("AUTODRIVER_DECODE_BENCH_FRAMES", "60"))
+CAMERAS = ("top_left", "top_right", "wrist_left", "wrist_right")
+WIDTH, HEIGHT = 1280, 720
+
+
+def _runtime() -> dict:
+    namespace = {"collections": collections, "threading": threading, "time": time, "np": np}
+    try:
+        import cv2
+
+        namespace["cv2"] = cv2
+    except ImportError:
+        pass
+    source = TemplateRegistry().env.get_template("common/image_decode.py.j2").render()
+    exec(compile(source, "image_decode", "exec"), namespace)
+    return namespace
+
+
+def test_decode_pool_throughput(bench_report) -> None:
+    runtime = _runtime()
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    if "cv2" in runtime:
+        encoding, payload = "jpeg", runtime["cv2"].imencode(".jpg", image)[1].tobytes()
+    else:
+        encoding, payload = "rgb8", image.tobytes()
+    specs = {name: (WIDTH, HEIGHT, encoding, 1) for name in CAMERAS}
+
+    done = threading.Semaphore(0)
+    pool = runtime["ImageDecodePool"](specs, lambda name, frame: done.release(), depth=N_FRAMES)
+    try:
+        # 串行解码（原来在回调里逐路解码）的单帧耗时
+        start = time.perf_counter()
+        for name in CAMERAS:
+            pool.decode(name, payload)
+        inline_ms = (time.perf_counter() - start) * 1000
+
+        submit_us = []
+        start = time.perf_counter()
+        for _ in range(N_FRAMES):
+            for name in CAMERAS:
+                t0 = time.perf_counter()
+                pool.submit(name, payload)
+                submit_us.append((time.perf_counter() - t0) * 1e6)
+        for _ in range(N_FRAMES * len(CAMERAS)):
+            assert done.acquire(timeout=30)
+        elapsed = time.perf_counter() - start
+        stats = pool.snapshot_stats()
+    finally:
+        pool.close()
+
+    submit_us.sort()
+    fps = N_FRAMES / elapsed
+    bench_report("image_decode", {
+        "encoding": encoding,
+        "cameras": len(CAMERAS),
+        "frames_per_camera": N_FRAMES,
+        "inline_4cam_ms": round(inline_ms, 3),
+        "submit_us_p50": round(submit_us[len(submit_us) // 2], 2),
+        "submit_us_p99": round(submit_us[int(len(submit_us) * 0.99)], 2),
+        "pool_fps_per_camera": round(fps, 1),
+        "decode_avg_ms": {name: s["avg_ms"] for name, s in stats.items()},
+    })
+
+    assert all(s["decoded"] == N_FRAMES and s["dropped"] == 0 for s in stats.values())
+    # 回调只入队：远小于解码一帧的耗时
+    assert submit_us[len(submit_us) // 2] * 4 / 1000 < inline_ms
+    assert fps >= 30
@@ -0,0 +1,73 @@
+"""知识库导入基准：合成文档树（Markdown/YAML/.msg/源码混合），比较进程内解析与进程池解析的吞吐，
+并记录主进程内存峰值（tracemalloc），验证流水线不会把整棵树先读进内存。
+
+    python -m pytest tests/benchmarks/test_ingest_benchmark.py -s
+    AUTODRIVER_INGEST_BENCH_FILES=20000 python -m pytest tests/benchmarks/test_ingest_benchmark.py -s
+"""
+import os
+import time
+import tracemalloc
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from src.agent.ingest import ingest_directory
+from src.agent.knowledge_index import KnowledgeIndex
+
+N_FILES = int(os.getenv("AUTODRIVER_INGEST_BENCH_FILES", "800"))
+WORKERS = int(os.getenv("AUTODRIVER_INGEST_BENCH_WORKERS", "4"))
+
+
+def _write_corpus(root, n_files: int) -> int:
+    total = 0
+    for i in range(n_files):
+        pkg = root / f"pkg{i % 20}"
+        kind = i % 4
+        if kind == 0:
+            path = pkg / "docs" / f"guide{i}.md"
+            text = "".join(f"## 第{j}节\n机器人{i}号关节{j}的标定步骤：先回零，再读取编码器。\n" for j in range(30))
+        elif kind == 1:
+            path = pkg / "config" / f"arm{i}.yaml"
+            text = "arm:\n" + "".join(f"  joint{j}:\n    limit: {j * 0.1:.1f}\n    topic: /arm{i}/joint{j}\n" for j in range(30))
+        elif kind == 2:
+            path = pkg / "msg" / f"State{i}.msg"
+            text = "".join(f"# 第{j}个字段\nfloat64 value{j}\n" for j in range(30))
+        else:
+            path = pkg / "src" / f"driver{i}.cpp"
+            text = "".join(f"// 驱动函数{j}\nvoid step{i}_{j}(double dt) {{ /* 控制循环 */ }}\n" for j in range(30))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        total += len(text.encode("utf-8"))
+    return total
+
+
+def _run(docs, index_dir, workers: int, trace: bool = False) -> dict:
+    index = KnowledgeIndex(str(index_dir), DeterministicFakeEmbedding(size=64), "fake-64")
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    stats = ingest_directory(index, str(docs), workers=workers)
+    elapsed = time.perf_counter() - start
+    report = {"workers": workers, "chunks": stats["chunks_embedded"]}
+    if trace:
+        # tracemalloc本身开销很大，只看内存峰值，不看耗时
+        report["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+        tracemalloc.stop()
+    else:
+        report.update(elapsed_s=round(elapsed, 3), files_per_s=round(stats["added"] / elapsed, 1))
+    return report
+
+
+def test_ingest_throughput(tmp_path, bench_report) -> None:
+    docs = tmp_path / "docs"
+    corpus_bytes = _write_corpus(docs, N_FILES)
+    serial = _run(docs, tmp_path / "serial", workers=0)
+    pooled = _run(docs, tmp_path / "pooled", workers=WORKERS)
+    memory = _run(docs, tmp_path / "memory", workers=WORKERS, trace=True)
+    bench_report("ingest", {
+        "files": N_FILES,
+        "corpus_mb": round(corpus_bytes / 2 ** 20, 2),
+        "runs": [serial, pooled],
+        "main_process_peak_traced_mb": memory["peak_traced_mb"],
+    })
+
+    assert serial["chunks"] == pooled["chunks"] == memory["chunks"] > N_FILES
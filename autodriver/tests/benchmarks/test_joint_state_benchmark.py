@@ -0,0 +1,99 @@
+"""生成驱动的关节回调基准：每条消息 np.array + concatenate 并抢图像共用的锁（原实现） vs JointStateStore 原地写入，
+另起一个线程模拟解码回调持有 self.lock，结果以JSON输出。
+
+    python -m pytest tests/benchmarks/test_joint_state_benchmark.py -s
+"""
+import array
+import collections
+import os
+import threading
+import time
+
+import numpy as np
+
+from src.agent.templates import TemplateRegistry
+
+N_MESSAGES = int(os.getenv("AUTODRIVER_STATE_BENCH_MESSAGES", "20000"))
+JOINT_DIM = {"left_arm": 7, "right_arm": 7, "gripper": 1, "torso": 4, "torso_cut": 4}
+
+
+class _Pose:
+    class _V:
+        x = y = z = w = 0.5
+
+    def __init__(self):
+        self.pose = type("Pose", (), {"position": self._V(), "orientation": self._V()})()
+
+
+def _legacy_main(lock, recv, joints, poses) -> None:
+    """原模板 synchronized_main_callback 的数据处理部分"""
+    parts = [np.array(j, dtype=np.float32) for j in joints]
+    for p in poses:
+        parts.append(np.array([p.pose.position.x, p.pose.position.y, p.pose.position.z,
+                               p.pose.orientation.x, p.pose.orientation.y, p.pose.orientation.z, p.pose.orientation.w], dtype=np.float32))
+    merged = np.concatenate(parts)
+    with lock:
+        recv["leader_arms"] = merged
+
+
+def test_joint_state_store_cost(bench_report) -> None:
+    namespace = {"array": array, "collections": collections, "threading": threading, "time": time, "np": np}
+    exec(compile(TemplateRegistry().env.get_template("common/joint_state.py.j2").render(), "joint_state", "exec"), namespace)
+    jd = JOINT_DIM
+    store = namespace["JointStateStore"](namespace["leader_layout"](jd))
+    pose_values = namespace["pose_values"]
+    joints = [array.array("d", np.random.default_rng(i).normal(size=jd[k])) for i, k in
+              enumerate(("left_arm", "gripper", "right_arm", "gripper", "torso"))]
+    poses = [_Pose() for _ in range(3)]
+    joint_names = ("joint_left", "gripper_left", "joint_right", "gripper_right", "joint_torso")
+    pose_names = ("pose_left", "pose_right", "pose_torso")
+
+    # 解码线程：以~30Hz×4路的节奏持有图像锁写字典（原实现里关节回调要和它抢同一把锁）
+    image_lock, stop = threading.Lock(), threading.Event()
+
+    def decoder() -> None:
+        while not stop.is_set():
+            with image_lock:
+                time.sleep(0.0005)
+            time.sleep(0.008)
+
+    thread = threading.Thread(target=decoder, daemon=True)
+    thread.start()
+    try:
+        recv = {}
+        start = time.perf_counter()
+        for _ in range(N_MESSAGES):
+            _legacy_main(image_lock, recv, joints, poses)
+        legacy_us = (time.perf_counter() - start) / N_MESSAGES * 1e6
+
+        start = time.perf_counter()
+        for _ in range(N_MESSAGES):
+            for name, values in zip(joint_names, joints):
+                store.set(name, values)
+            for name, pose in zip(pose_names, poses):
+                store.set(name, pose_values(pose))
+            recv["leader_arms"] = store.commit()
+        store_us = (time.perf_counter() - start) / N_MESSAGES * 1e6
+    finally:
+        stop.set()
+        thread.join()
+
+    start = time.perf_counter()
+    for _ in range(N_MESSAGES):
+        seq, _, view = store.latest()
+        float(view[0])
+        store.valid(seq)
+    read_us = (time.perf_counter() - start) / N_MESSAGES * 1e6
+
+    bench_report("joint_state", {
+        "messages": N_MESSAGES,
+        "state_dim": store.size,
+        "legacy_us_per_msg": round(legacy_us, 2),
+        "store_us_per_msg": round(store_us, 2),
+        "snapshot_read_us": round(read_us, 2),
+        "speedup": round(legacy_us / store_us, 2),
+    })
+
+    assert np.allclose(recv["leader_arms"], np.concatenate([np.asarray(j, dtype=np.float32) for j in joints] + [np.full(21, 0.5, dtype=np.float32)]))
+    # 不再每条消息分配新数组：提交的视图在 STATE_BUFFERS 块缓冲区间轮转
+    assert len({id(store.commit()) for _ in range(10)}) == namespace["STATE_BUFFERS"]
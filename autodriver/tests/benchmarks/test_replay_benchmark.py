@@ -0,0 +1,83 @@
+"""生成驱动的指令下发基准：逐值Python清洗 + 每帧新建消息（原实现） vs ReplayPlan 向量化 + 复用消息，结果以JSON输出。
+
+    python -m pytest tests/benchmarks/test_replay_benchmark.py -s
+"""
+import array
+import collections
+import os
+import threading
+import time
+
+import numpy as np
+
+from src.agent.templates import TemplateRegistry
+
+N_FRAMES = int(os.getenv("AUTODRIVER_REPLAY_BENCH_FRAMES", "5000"))
+JOINT_DIM = {"left_arm": 7, "right_arm": 7, "gripper": 1, "torso": 4}
+
+
+class Msg:
+    position: object = None
+
+
+class NullPublisher:
+    def publish(self, msg) -> None:
+        pass
+
+
+def _legacy_replay(publishers, jd, values) -> None:
+    """原模板的 ros_replay：逐值 normalize_precision，五条新消息"""
+
+    def normalize_precision(val, decimals=3):
+        val = float(val)
+        if np.isnan(val) or np.isinf(val):
+            return 0.0
+        return round(val, decimals)
+
+    left_arm = [normalize_precision(v) for v in values[:jd["left_arm"]]]
+    left_gripper = [normalize_precision(v) for v in values[jd["left_arm"]:jd["left_arm"] + jd["gripper"]]]
+    right_arm = [normalize_precision(v) for v in values[jd["left_arm"] + jd["gripper"]:jd["left_arm"] + jd["gripper"] + jd["right_arm"]]]
+    right_gripper = [normalize_precision(v) for v in values[jd["left_arm"] + jd["gripper"] + jd["right_arm"]:jd["left_arm"] + 2 * jd["gripper"] + jd["right_arm"]]]
+    torso = [normalize_precision(v) for v in values[-jd["torso"]:]]
+    for publisher, position in zip(publishers, (left_arm, right_arm, left_gripper, right_gripper, torso)):
+        msg = Msg()
+        msg.position = position
+        publisher.publish(msg)
+
+
+def test_replay_cost(bench_report) -> None:
+    namespace = {"array": array, "collections": collections, "threading": threading, "time": time, "np": np}
+    exec(compile(TemplateRegistry().env.get_template("common/joint_replay.py.j2").render(), "joint_replay", "exec"), namespace)
+    jd = JOINT_DIM
+    la, g, ra, t = jd["left_arm"], jd["gripper"], jd["right_arm"], jd["torso"]
+    publishers = [NullPublisher() for _ in range(5)]
+    plan = namespace["ReplayPlan"](
+        [(publishers[0], 0, la), (publishers[1], la + g, ra), (publishers[2], la, g), (publishers[3], la + g + ra, g), (publishers[4], -t, t)],
+        Msg,
+    )
+    commands = np.random.default_rng(0).normal(size=(N_FRAMES, la + 2 * g + ra + t))
+
+    start = time.perf_counter()
+    for row in commands:
+        _legacy_replay(publishers, jd, row)
+    legacy_us = (time.perf_counter() - start) / N_FRAMES * 1e6
+
+    start = time.perf_counter()
+    for row in commands:
+        plan.publish(row)
+    plan_us = (time.perf_counter() - start) / N_FRAMES * 1e6
+
+    start = time.perf_counter()
+    plan.publish_trajectory(commands, hz=1e9)
+    trajectory_us = (time.perf_counter() - start) / N_FRAMES * 1e6
+
+    bench_report("replay", {
+        "frames": N_FRAMES,
+        "legacy_us_per_frame": round(legacy_us, 2),
+        "plan_us_per_frame": round(plan_us, 2),
+        "trajectory_us_per_frame": round(trajectory_us, 2),
+        "speedup": round(legacy_us / plan_us, 2),
+    })
+
+    assert plan_us < legacy_us
+    assert trajectory_us < plan_us
@@ -0,0 +1,55 @@
+"""检索吞吐基准：逐条检索 vs 批量检索 vs 结果缓存命中，离线假嵌入，结果以JSON输出。
+
+    python -m pytest tests/benchmarks/test_retrieval_benchmark.py -s
+"""
+import os
+import time
+
+import pytest
+
+N_QUERIES = int(os.getenv("AUTODRIVER_RETRIEVAL_BENCH_QUERIES", "400"))
+
+_TEMPLATES = ["机器人第{i}次前进怎么操作", "计算器第{i}个问题：除法规则", "型号A1的第{i}条说明", "故障码E01第{i}次出现怎么办"]
+
+
+@pytest.fixture
+def offline_rag(tmp_path, monkeypatch):
+    from src.agent import rag
+
+    monkeypatch.setenv("AUTODRIVER_EMBEDDINGS", "fake")
+    monkeypatch.setenv("AUTODRIVER_RAG_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setenv("AUTODRIVER_KNOWLEDGE_DIR", str(tmp_path / "knowledge"))
+    for name in ("_vector_db", "_knowledge_index", "_retriever"):
+        monkeypatch.setattr(rag, name, None)
+    rag.get_retriever()
+    return rag
+
+
+def test_retrieval_throughput(offline_rag, bench_report, monkeypatch) -> None:
+    rag = offline_rag
+    queries = [_TEMPLATES[i % len(_TEMPLATES)].format(i=i) for i in range(N_QUERIES)]
+
+    monkeypatch.setattr(rag, "retrieval_cache", rag.RetrievalCache(max_entries=0))
+    start = time.perf_counter()
+    one_by_one = [rag.retrieve_context(q) for q in queries]
+    sequential_s = time.perf_counter() - start
+
+    monkeypatch.setattr(rag, "retrieval_cache", rag.RetrievalCache())
+    start = time.perf_counter()
+    batched = rag.retrieve_contexts(queries)
+    batch_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cached = rag.retrieve_contexts(queries)
+    cached_s = time.perf_counter() - start
+
+    bench_report("retrieval", {
+        "queries": N_QUERIES,
+        "sequential_qps": round(N_QUERIES / sequential_s, 1),
+        "batch_qps": round(N_QUERIES / batch_s, 1),
+        "cached_qps": round(N_QUERIES / cached_s, 1),
+        "cache": rag.retrieval_cache.stats(),
+    })
+
+    assert batched == one_by_one == cached
+    assert cached_s < batch_s
@@ -0,0 +1,46 @@
+"""话题探测基准：逐个探测 vs 并发探测，假ROS2图模拟每个话题取样本的耗时，结果以JSON输出。
+
+    python -m pytest tests/benchmarks/test_ros2_probe_benchmark.py -s
+"""
+import asyncio
+import json
+import os
+import time
+
+from src.agent.ros2_introspection import FakeBackend
+from src.agent.ros2_probe import probe_topics
+
+N_TOPICS = int(os.getenv("AUTODRIVER_PROBE_BENCH_TOPICS", "24"))
+# 单个话题取样本的模拟耗时（秒）；真实机器人上取决于发布频率和DDS发现
+SAMPLE_DELAY_S = float(os.getenv("AUTODRIVER_PROBE_BENCH_DELAY_S", "0.05"))
+
+
+def test_probe_parallel_vs_sequential(tmp_path, bench_report) -> None:
+    topics = {f"/robot/joint_{i}": "sensor_msgs/msg/JointState" for i in range(N_TOPICS)}
+    graph = {
+        "topics": {topic: [msg_type] for topic, msg_type in topics.items()},
+        "samples": {topic: {"position": [0.0] * 6} for topic in topics},
+        "delays": {topic: SAMPLE_DELAY_S for topic in topics},
+    }
+    path = tmp_path / "graph.json"
+    path.write_text(json.dumps(graph), encoding="utf-8")
+    backend = FakeBackend(str(path))
+
+    start = time.perf_counter()
+    sequential = asyncio.run(probe_topics(topics, backend=backend, concurrency=1, timeout=1.0))
+    sequential_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = asyncio.run(probe_topics(topics, backend=backend, concurrency=N_TOPICS, timeout=1.0))
+    parallel_s = time.perf_counter() - start
+
+    bench_report("ros2_probe", {
+        "topics": N_TOPICS,
+        "sample_delay_s": SAMPLE_DELAY_S,
+        "sequential_s": round(sequential_s, 3),
+        "parallel_s": round(parallel_s, 3),
+        "speedup": round(sequential_s / parallel_s, 1),
+    })
+
+    assert {t: p.fields for t, p in parallel.items()} == {t: p.fields for t, p in sequential.items()}
+    assert parallel_s < sequential_s / 4
@@ -0,0 +1,66 @@
+"""话题快照基准：几千个话题的快照 vs 同内容的JSON假图，比较列话题和探测少量话题的耗时，结果以JSON输出。
+
+    python -m pytest tests/benchmarks/test_ros2_snapshot_benchmark.py -s
+"""
+import asyncio
+import json
+import os
+import time
+
+from src.agent.ros2_introspection import FakeBackend
+from src.agent.ros2_probe import probe_topics
+from src.agent.ros2_snapshot import SnapshotBackend, write_snapshot
+
+N_TOPICS = int(os.getenv("AUTODRIVER_SNAPSHOT_BENCH_TOPICS", "1000"))
+JOINT = "sensor_msgs/msg/JointState"
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_snapshot_load(tmp_path, bench_report) -> None:
+    topics = [f"/robot/joint_{i:05d}" for i in range(N_TOPICS)]
+    graph = {
+        "topics": {t: [JOINT] for t in topics},
+        # 每个话题一条带数组的样本，接近真实录制的体积
+        "samples": {t: {"name": [f"j{k}" for k in range(7)], "position": [0.1] * 7, "effort": [0.0] * 512} for t in topics},
+    }
+    graph_path = tmp_path / "graph.json"
+    graph_path.write_text(json.dumps(graph), encoding="utf-8")
+    snap_path = str(tmp_path / "graph.r2snap")
+
+    start = time.perf_counter()
+    write_snapshot(snap_path, [
+        {"name": t, "types": [JOINT], "publishers": 1, "qos": [], "rate_hz": 100.0, "sample": graph["samples"][t]} for t in topics
+    ])
+    write_s = time.perf_counter() - start
+
+    fake, snapshot = FakeBackend(str(graph_path)), SnapshotBackend(snap_path)
+    assert snapshot.topic_names_and_types() == fake.topic_names_and_types()
+    json_list_s = _best_of(fake.topic_names_and_types)
+    snap_list_s = _best_of(snapshot.topic_names_and_types)
+
+    wanted = {t: JOINT for t in topics[:16]}
+    json_probe_s = _best_of(lambda: asyncio.run(probe_topics(wanted, backend=fake)), repeat=1)
+    snap_probe_s = _best_of(lambda: asyncio.run(probe_topics(wanted, backend=snapshot)), repeat=3)
+
+    bench_report("ros2_snapshot", {
+        "topics": N_TOPICS,
+        "json_bytes": os.path.getsize(graph_path),
+        "snapshot_bytes": os.path.getsize(snap_path),
+        "write_s": round(write_s, 3),
+        "json_list_ms": round(json_list_s * 1000, 2),
+        "snapshot_list_ms": round(snap_list_s * 1000, 2),
+        "json_probe16_ms": round(json_probe_s * 1000, 2),
+        "snapshot_probe16_ms": round(snap_probe_s * 1000, 2),
+    })
+
+    # 列话题只解析索引，探测只解析用到的那几行
+    assert snap_list_s < json_list_s
+    assert snap_probe_s < json_probe_s
@@ -0,0 +1,108 @@
+"""共享内存导出基准：四路720p相机按30Hz写入，另一个读方零拷贝跟读，对比 pickle 传一帧的开销，结果以JSON输出。
+
+    python -m pytest tests/benchmarks/test_shm_export_benchmark.py -s
+"""
+import array
+import collections
+import json
+import os
+import pickle
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.agent.shm_client import ShmClient
+from src.agent.templates import TemplateRegistry
+
+DURATION_S = float(os.getenv("AUTODRIVER_SHM_BENCH_SECONDS", "1.0"))
+CAMERAS = ("top_left", "top_right", "wrist_left", "wrist_right")
+WIDTH, HEIGHT, HZ = 1280, 720, 30
+
+
+def _writer_runtime() -> dict:
+    namespace = {
+        "array": array, "collections": collections, "json": json, "os": os, "struct": struct,
+        "threading": threading, "time": time, "np": np, "shared_memory": shared_memory,
+    }
+    env = TemplateRegistry().env
+    for name in ("image_decode.py.j2", "joint_state.py.j2", "shm_export.py.j2"):
+        exec(compile(env.get_template(f"common/{name}").render(), name, "exec"), namespace)
+    return namespace
+
+
+def test_shm_export_4x720p(bench_report) -> None:
+    runtime = _writer_runtime()
+    specs = {name: (WIDTH, HEIGHT, "rgb8", 1) for name in CAMERAS}
+    writer = runtime["ShmExporter"](f"adbench_{os.getpid()}", runtime["shm_streams"](specs, {}))
+    frame = np.random.default_rng(0).integers(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    stop = threading.Event()
+    publish_ms = []
+
+    def produce() -> None:
+        period, start, tick = 1.0 / HZ, time.monotonic(), 0
+        while not stop.is_set():
+            for name in CAMERAS:
+                t0 = time.perf_counter()
+                writer.publish(f"image_{name}", frame)
+                publish_ms.append((time.perf_counter() - t0) * 1000)
+            tick += 1
+            time.sleep(max(0.0, start + tick * period - time.monotonic()))
+
+    try:
+        client = ShmClient(writer.prefix)
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+        seen = {name: 0 for name in CAMERAS}
+        received = {name: 0 for name in CAMERAS}
+        read_us, latency_ms, torn, zero_copy = [], [], 0, True
+        deadline = time.monotonic() + DURATION_S
+        while time.monotonic() < deadline:
+            for name in CAMERAS:
+                stream = client.stream(f"image_{name}")
+                frame_view = stream.wait(seen[name], timeout=0.2)
+                if frame_view is None:
+                    continue
+                t0 = time.perf_counter()
+                current = stream.latest()
+                # 读方实际用到数据：取一个像素，不拷贝整帧
+                int(current.data[HEIGHT // 2, WIDTH // 2, 0])
+                torn += not stream.valid(current)
+                read_us.append((time.perf_counter() - t0) * 1e6)
+                latency_ms.append((time.time_ns() - current.stamp_ns) / 1e6)
+                # 读方拿到的是共享内存段里的槽本身，不是拷贝
+                zero_copy &= np.shares_memory(current.data, stream._data)
+                received[name] += 1
+                seen[name] = current.seq
+        stop.set()
+        thread.join()
+        client.close()
+    finally:
+        writer.close()
+
+    start = time.perf_counter()
+    for _ in range(8):
+        pickle.loads(pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL))
+    pickle_ms = (time.perf_counter() - start) / 8 * 1000
+
+    read_us.sort()
+    publish_ms.sort()
+    # 读方实际收到的帧数（读得慢时中间的帧会被跳过，不等于写方的 seq）
+    fps = {name: round(count / DURATION_S, 1) for name, count in received.items()}
+    bench_report("shm_export", {
+        "cameras": len(CAMERAS),
+        "frame_bytes": frame.nbytes,
+        "reader_fps_per_camera": fps,
+        "publish_ms_p50": round(publish_ms[len(publish_ms) // 2], 3),
+        "latest_valid_us_p50": round(read_us[len(read_us) // 2], 2),
+        "latency_ms_p50": round(sorted(latency_ms)[len(latency_ms) // 2], 3),
+        "pickle_roundtrip_ms": round(pickle_ms, 3),
+        "torn_reads": torn,
+    })
+
+    # 单帧耗时只报告不断言（共享机器上抖动大）；断言零拷贝、读到的帧都完整，
+    # 且读方实际收到的帧率不低于一半：环形缓冲吞吐掉下来时基准要失败
+    assert zero_copy and torn == 0
+    assert min(fps.values()) >= HZ * 0.5, fps
@@ -0,0 +1,71 @@
+"""启动性能基准：冷启动导入耗时 + 首个请求耗时 + 显式预热耗时，结果以JSON输出，超出预算即失败。
+
+    python -m pytest tests/benchmarks/test_startup.py -s
+    AUTODRIVER_BENCH_DIR=bench python -m pytest tests/benchmarks/test_startup.py   # 写出 bench/startup.json
+"""
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 预算（秒），可通过环境变量按机器调整
+IMPORT_BUDGET_S = float(os.getenv("AUTODRIVER_IMPORT_BUDGET_S", "5.0"))
+FIRST_REQUEST_BUDGET_S = float(os.getenv("AUTODRIVER_FIRST_REQUEST_BUDGET_S", "0.5"))
+
+# 导入图时不应加载的重量级模块：LLM SDK、向量库、langchain_community
+HEAVY_MODULES = ["langchain_community", "dashscope", "faiss", "aiohttp"]
+
+_PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+from src.agent.graph import graph
+import_s = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules]
+
+from langchain_core.messages import HumanMessage
+start = time.perf_counter()
+result = asyncio.run(graph.ainvoke({{"messages": [HumanMessage(content="Add 3 and 4")], "llm_calls": 0}}))
+first_request_s = time.perf_counter() - start
+
+from src.agent.startup import warmup
+warmup_s = warmup()
+
+print(json.dumps({{
+    "import_s": import_s,
+    "heavy_modules_loaded": loaded,
+    "first_request_s": first_request_s,
+    "first_request_answer": result["messages"][-1].content,
+    "warmup_s": warmup_s,
+}}))
+"""
+
+
+def _run_probe(index_dir: str) -> dict:
+    # 全新解释器进程，测的是真实冷启动
+    # 预热只构造客户端不发请求，没有真实密钥时用占位值；知识库索引建在临时目录，不碰用户缓存
+    env = dict(
+        os.environ, AUTODRIVER_LLM_CACHE="0", AUTODRIVER_EMBEDDINGS="fake", AUTODRIVER_RAG_INDEX_DIR=index_dir
+    )
+    env.setdefault("DASHSCOPE_API_KEY", "benchmark-placeholder")
+    env.pop("AUTODRIVER_WARMUP_ON_LOAD", None)
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_startup_benchmark(bench_report, tmp_path) -> None:
+    report = _run_probe(str(tmp_path))
+    bench_report("startup", report)
+
+    assert report["heavy_modules_loaded"] == []
+    assert report["first_request_answer"] == "3 + 4 = 7"
+    assert report["import_s"] < IMPORT_BUDGET_S
+    assert report["first_request_s"] < FIRST_REQUEST_BUDGET_S
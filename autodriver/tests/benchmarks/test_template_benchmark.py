@@ -0,0 +1,43 @@
+"""模板渲染基准：首次渲染（读文件+编译）vs 之后每次渲染，后者应与生成数量无关，结果以JSON输出。
+
+    python -m pytest tests/benchmarks/test_template_benchmark.py -s
+"""
+import os
+import time
+
+from src.agent.templates import TemplateRegistry
+from src.agent.topic_rules import build_robot_config
+
+N_DRIVERS = int(os.getenv("AUTODRIVER_TEMPLATE_BENCH_DRIVERS", "300"))
+
+
+def test_render_throughput(bench_report) -> None:
+    registry = TemplateRegistry()
+    configs = [
+        build_robot_config([f"/robot_{i}/hdas/feedback_arm_left", f"/robot_{i}/motion_target/target_joint_state_arm_left"])
+        for i in range(N_DRIVERS)
+    ]
+
+    start = time.perf_counter()
+    registry.render(configs[0])
+    first_s = time.perf_counter() - start
+
+    timings = []
+    for config in configs:
+        start = time.perf_counter()
+        registry.render(config)
+        timings.append(time.perf_counter() - start)
+    half = len(timings) // 2
+    early_ms = sum(timings[:half]) / half * 1000
+    late_ms = sum(timings[half:]) / (len(timings) - half) * 1000
+
+    bench_report("templates", {
+        "drivers": N_DRIVERS,
+        "first_render_ms": round(first_s * 1000, 2),
+        "cached_render_ms_first_half": round(early_ms, 3),
+        "cached_render_ms_second_half": round(late_ms, 3),
+    })
+
+    assert late_ms < first_s * 1000
+    # 渲染耗时不随已生成的数量增长
+    assert late_ms < early_ms * 2
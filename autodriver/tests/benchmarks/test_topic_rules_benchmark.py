@@ -0,0 +1,63 @@
+"""话题分类基准：逐条规则 re.search 全部话题（旧实现） vs 编译好的合并匹配器，结果以JSON输出。
+
+模拟车队机器：多个命名空间下的机器人，每台带大量与驱动无关的话题。
+
+    python -m pytest tests/benchmarks/test_topic_rules_benchmark.py -s
+"""
+import os
+import re
+import time
+
+from src.agent.topic_rules import load_rule_sets
+
+N_ROBOTS = int(os.getenv("AUTODRIVER_RULES_BENCH_ROBOTS", "40"))
+NOISE_PER_ROBOT = int(os.getenv("AUTODRIVER_RULES_BENCH_NOISE", "100"))
+ROUNDS = 20
+
+
+def _fleet_topics(rule_set_topics: list) -> list:
+    topics = []
+    for r in range(N_ROBOTS):
+        topics.extend(f"/robot_{r}/diagnostics/sensor_{i}/status" for i in range(NOISE_PER_ROBOT))
+    # 驱动相关话题在列表末尾：旧实现要把每条规则都扫到最后
+    topics.extend(f"/robot_{N_ROBOTS - 1}{t}" for t in rule_set_topics)
+    return topics
+
+
+def _legacy_classify(rules: list, topics: list) -> dict:
+    assigned = {}
+    for slot, pattern in rules:
+        for topic in topics:
+            if re.search(pattern, topic):
+                assigned[slot] = topic
+                break
+    return assigned
+
+
+def test_classifier_throughput(bench_report) -> None:
+    rule_set = load_rule_sets()["galaxea"]
+    topics = _fleet_topics([
+        "/motion_target/target_joint_state_arm_left", "/motion_target/target_joint_state_arm_right",
+        "/hdas/feedback_arm_left", "/hdas/feedback_torso", "/hdas/camera_head/left_raw/image_raw_color/compressed",
+    ])
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        legacy = _legacy_classify(rule_set.rules, topics)
+    legacy_s = (time.perf_counter() - start) / ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        compiled = rule_set.classify(topics)
+    compiled_s = (time.perf_counter() - start) / ROUNDS
+
+    bench_report("topic_rules", {
+        "topics": len(topics),
+        "rules": len(rule_set.rules),
+        "legacy_ms": round(legacy_s * 1000, 2),
+        "compiled_ms": round(compiled_s * 1000, 2),
+        "speedup": round(legacy_s / compiled_s, 1),
+    })
+
+    assert compiled == legacy
+    assert compiled_s < legacy_s
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agent.batch import percentile, read_inputs, run_batch
+
+pytestmark = pytest.mark.anyio
+
+
+class EchoGraph:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, inputs: dict) -> dict:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        query = inputs["messages"][-1].content
+        if query == "boom":
+            raise RuntimeError("bad query")
+        return {"messages": [AIMessage(content=query.upper())], "llm_calls": 1}
+
+
+async def test_batch_streams_results_and_resumes(tmp_path) -> None:
+    src = tmp_path / "in.jsonl"
+    src.write_text("\n".join(json.dumps({"id": i, "query": q}) for i, q in enumerate(["a", "b", "boom", "c"])))
+    out = tmp_path / "out.jsonl"
+    graph = EchoGraph()
+
+    report = await run_batch(read_inputs(str(src)), str(out), concurrency=2, graph=graph)
+    assert report["completed"] == 4 and report["errors"] == 1
+    assert graph.max_in_flight <= 2
+    records = {r["id"]: r for r in map(json.loads, out.read_text().splitlines())}
+    assert records["1"]["answer"] == "B"
+    assert "bad query" in records["2"]["error"]
+
+    rerun = await run_batch(read_inputs(str(src)), str(out), concurrency=2, graph=graph)
+    assert rerun["skipped"] == 4 and rerun["completed"] == 0
+    retried = await run_batch(read_inputs(str(src)), str(out), graph=graph, retry_errors=True)
+    assert retried["skipped"] == 3 and retried["completed"] == 1
+
+
+def test_percentile_nearest_rank() -> None:
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 95) == 0.0
@@ -0,0 +1,45 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from agent.cache import LLMResponseCache
+
+
+def test_cache_key_covers_messages_tools_and_params() -> None:
+    msgs = [SystemMessage(content="sys"), HumanMessage(content="Add 3 and 4")]
+    key = LLMResponseCache.make_key(msgs, tools=[{"name": "add"}], params={"model": "m"})
+    # 首尾空白与消息id不影响键
+    same = LLMResponseCache.make_key(
+        [SystemMessage(content="sys "), HumanMessage(content="Add 3 and 4", id="x")],
+        tools=[{"name": "add"}],
+        params={"model": "m"},
+    )
+    assert key == same
+    assert key != LLMResponseCache.make_key(msgs, tools=[], params={"model": "m"})
+    assert key != LLMResponseCache.make_key(msgs, tools=[{"name": "add"}], params={"model": "n"})
+
+
+def test_cache_survives_restart_and_counts(tmp_path) -> None:
+    db_path = str(tmp_path / "llm_cache.sqlite3")
+    cache = LLMResponseCache(db_path=db_path)
+    key = cache.make_key([HumanMessage(content="E01是什么故障")])
+    assert cache.get(key) is None
+    cache.put(key, AIMessage(content="电机卡死"))
+    assert cache.get(key).content == "电机卡死"
+
+    restarted = LLMResponseCache(db_path=db_path)
+    assert restarted.get(key).content == "电机卡死"
+    stats = restarted.stats()
+    assert stats["disk_hits"] == 1 and stats["misses"] == 0
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_cache_ttl_and_lru_eviction() -> None:
+    cache = LLMResponseCache(db_path=None, max_entries=2, ttl_seconds=60)
+    keys = [cache.make_key([HumanMessage(content=str(i))]) for i in range(3)]
+    for k in keys:
+        cache.put(k, AIMessage(content=k))
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) is not None
+
+    expired = LLMResponseCache(db_path=None, ttl_seconds=-1)
+    expired.put(keys[0], AIMessage(content="old"))
+    assert expired.get(keys[0]) is None
@@ -0,0 +1,32 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agent.context import count_tokens, select_window_start, split_turns
+
+
+def _tool_turn(i: int) -> list:
+    return [
+        HumanMessage(content=f"机器人故障码E0{i}是什么意思？" * 5),
+        AIMessage(content="", tool_calls=[{"name": "knowledge_query", "args": {"query": "E0"}, "id": f"c{i}"}]),
+        ToolMessage(content="电机卡死，重启机器人并清除前方障碍物" * 5, tool_call_id=f"c{i}"),
+        AIMessage(content="电机卡死"),
+    ]
+
+
+def test_split_turns_keeps_tool_pairs_together() -> None:
+    messages = _tool_turn(1) + _tool_turn(2)
+    assert split_turns(messages) == [(0, 4), (4, 8)]
+
+
+def test_window_respects_budget_and_turn_boundaries() -> None:
+    messages = _tool_turn(1) + _tool_turn(2) + _tool_turn(3)
+    turn_tokens = count_tokens(messages[:4])
+    start = select_window_start(messages, max_tokens=turn_tokens * 2)
+    assert start == 4
+    # 预算再紧也至少保留最后一轮，且窗口起点永远落在HumanMessage上
+    assert select_window_start(messages, max_tokens=1) == 8
+    assert isinstance(messages[select_window_start(messages, max_tokens=1)], HumanMessage)
+
+
+def test_window_never_moves_backwards() -> None:
+    messages = _tool_turn(1) + _tool_turn(2)
+    assert select_window_start(messages, max_tokens=10**6, not_before=4) == 4
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from agent.embeddings import EmbeddingCache, LocalEmbeddings, decode_vector, encode_vector
+
+
+class CountingLocalEmbeddings(LocalEmbeddings):
+    """不加载sentence-transformers：按文本长度生成归一化向量，并记录交给模型的文本"""
+
+    def __init__(self, **kwargs):
+        super().__init__(model_name="test-model", **kwargs)
+        self.encoded = []
+
+    def _encode(self, texts):
+        self.encoded.extend(texts)
+        vecs = np.array([[len(t), 1.0, -0.5, 0.25] for t in texts], dtype=np.float32)
+        return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("storage, tol", [("float32", 0.0), ("float16", 1e-3), ("int8", 1e-2)])
+def test_vector_roundtrip(storage, tol) -> None:
+    vec = np.random.default_rng(0).normal(size=64).astype(np.float32)
+    vec /= np.linalg.norm(vec)
+    assert np.abs(decode_vector(encode_vector(vec, storage), storage) - vec).max() <= tol
+
+
+def test_embed_many_dedupes_and_caches_on_disk(tmp_path) -> None:
+    db = str(tmp_path / "emb.sqlite3")
+    first = CountingLocalEmbeddings(cache=EmbeddingCache(db, storage="float16"))
+    vectors = first.embed_documents(["甲", "乙乙", "甲"])
+    assert first.encoded == ["甲", "乙乙"]
+    assert vectors[0] == vectors[2]
+
+    # 新实例共用磁盘缓存：命中的文本不再编码，向量与首次完全一致
+    second = CountingLocalEmbeddings(cache=EmbeddingCache(db, storage="float16"))
+    assert second.embed_documents(["乙乙", "丙丙丙"]) == [vectors[1], second.embed_documents(["丙丙丙"])[0]]
+    assert second.encoded == ["丙丙丙"]
+    assert second.cache.stats()["hits"] == 2
+
+
+def test_query_instruction_is_part_of_the_cache_key(tmp_path) -> None:
+    emb = CountingLocalEmbeddings(cache=EmbeddingCache(None), query_instruction="查询：")
+    emb.embed_query("故障码")
+    emb.embed_documents(["故障码"])
+    assert emb.encoded == ["查询：故障码", "故障码"]
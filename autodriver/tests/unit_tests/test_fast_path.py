@@ -0,0 +1,28 @@
+import pytest
+
+from agent.fast_path import answer_arithmetic
+
+
+@pytest.mark.parametrize(
+    "query, answer",
+    [
+        ("Add 3 and 4", "3 + 4 = 7"),
+        ("multiply 6 by 7", "6 * 7 = 42"),
+        ("What is (1 + 2) * 3?", "(1 + 2) * 3 = 9"),
+        ("3加4等于多少", "3 + 4 = 7"),
+        ("计算8除以2", "8 / 2 = 4"),
+        ("3和4的积是多少", "3 * 4 = 12"),
+        ("7/2", "7/2 = 3.5"),
+        ("divide 8 by 0", "8 / 0 无法计算：除数不能为0"),
+    ],
+)
+def test_arithmetic_answered_locally(query: str, answer: str) -> None:
+    assert answer_arithmetic(query) == answer
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["机器人前进指令是什么？", "生成我的ROS2机器人对应的node.py驱动代码", "Add 3 and 4 then explain", "2 ** 100", "3"],
+)
+def test_ambiguous_input_falls_through(query: str) -> None:
+    assert answer_arithmetic(query) is None
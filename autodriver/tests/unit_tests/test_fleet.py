@@ -0,0 +1,109 @@
+import importlib
+import json
+
+import pytest
+
+from agent.fleet import agenerate_fleet, generate_fleet, load_fleet, main
+
+pytestmark = pytest.mark.anyio
+
+JOINT = "sensor_msgs/msg/JointState"
+GALAXEA = ["/motion_target/target_joint_state_arm_left", "/hdas/feedback_arm_left"]
+AGILEX = ["/master/joint_left", "/puppet/joint_left", "/camera_l"]
+
+
+def _snapshot(path, topics, dim=None) -> str:
+    graph = {"topics": {t: [JOINT] for t in topics}}
+    if dim is not None:
+        graph["samples"] = {t: {"position": [0.0] * dim} for t in topics}
+    path.write_text(json.dumps(graph), encoding="utf-8")
+    return str(path)
+
+
+async def test_fleet_dedupes_identical_configs(tmp_path) -> None:
+    snaps = tmp_path / "snaps"
+    snaps.mkdir()
+    for i in range(4):
+        _snapshot(snaps / f"r{i}.json", GALAXEA, dim=7)
+    # 实测维度不同 → 配置不同，单独一份驱动
+    _snapshot(snaps / "r_dim6.json", GALAXEA, dim=6)
+    (snaps / "bad.json").write_text('{"error": "离线"}', encoding="utf-8")
+    robots = load_fleet(str(snaps)) + [
+        {"id": "agx", "topics": AGILEX},
+        {"id": "agx_ros1", "topics": AGILEX, "target": "ros1"},
+    ]
+
+    out = tmp_path / "out"
+    manifest = await agenerate_fleet(robots, str(out), workers=0)
+    summary = manifest["summary"]
+    assert (summary["robots"], summary["errors"]) == (8, 1)
+    assert summary["unique_drivers"] == 4 and summary["deduplicated"] == 3
+
+    records = {r["id"]: r for r in manifest["robots"]}
+    assert "离线" in records["bad.json"]["error"] and "driver" not in records["bad.json"]
+    assert len({records[f"r{i}.json"]["driver"] for i in range(4)}) == 1
+    assert records["r_dim6.json"]["config_hash"] != records["r0.json"]["config_hash"]
+    assert records["r0.json"]["probed"] and "probed" not in records["agx"]
+    assert records["agx"]["vendor"] == "agilex"
+    assert records["agx"]["config_hash"] != records["agx_ros1"]["config_hash"]
+
+    driver = out / records["r0.json"]["driver"]
+    assert "ROS2RobotDriverNode" in driver.read_text(encoding="utf-8")
+    config = json.loads((driver.parent / "config.json").read_text(encoding="utf-8"))
+    assert config["joint_dim"]["left_arm"] == 7
+    assert json.loads((out / "manifest.json").read_text(encoding="utf-8"))["summary"] == summary
+
+
+async def test_fleet_isolates_broken_probe_backend(tmp_path, monkeypatch) -> None:
+    snaps = tmp_path / "snaps"
+    snaps.mkdir()
+    for name in ("ok", "broken"):
+        _snapshot(snaps / f"{name}.json", GALAXEA, dim=7)
+    backend_cls = importlib.import_module("src.agent.ros2_introspection").FakeBackend
+    aprobe = backend_cls.aprobe
+
+    async def flaky_aprobe(self, topic, msg_type, timeout):
+        if self.path.endswith("broken.json"):
+            raise OSError("快照读取失败")
+        return await aprobe(self, topic, msg_type, timeout)
+
+    monkeypatch.setattr(backend_cls, "aprobe", flaky_aprobe)
+    manifest = await agenerate_fleet(load_fleet(str(snaps)), str(tmp_path / "out"), workers=0)
+
+    records = {r["id"]: r for r in manifest["robots"]}
+    assert records["broken.json"]["error"] == "OSError: 快照读取失败" and "driver" not in records["broken.json"]
+    assert records["ok.json"]["probed"] and records["ok.json"]["driver"]
+    assert (manifest["summary"]["errors"], manifest["summary"]["unique_drivers"]) == (1, 1)
+
+
+def test_fleet_rejects_duplicate_ids(tmp_path) -> None:
+    snaps = tmp_path / "snaps"
+    snaps.mkdir()
+    _snapshot(snaps / "r01.json", GALAXEA)
+    (snaps / "r01.yaml").write_text(json.dumps({"topics": {t: [JOINT] for t in AGILEX}}), encoding="utf-8")
+    # 快照目录按完整文件名取id：同名不同扩展名是两台机器人
+    robots = load_fleet(str(snaps))
+    assert [r["id"] for r in robots] == ["r01.json", "r01.yaml"]
+    manifest = generate_fleet(robots, str(tmp_path / "out"), workers=0)
+    assert (manifest["summary"]["robots"], manifest["summary"]["unique_drivers"]) == (2, 2)
+
+    duplicated = [{"id": "r01", "topics": GALAXEA}, {"id": "r01", "topics": AGILEX}]
+    with pytest.raises(ValueError, match="r01"):
+        generate_fleet(duplicated, str(tmp_path / "dup"), workers=0)
+    spec = tmp_path / "fleet.json"
+    spec.write_text(json.dumps({"robots": duplicated}), encoding="utf-8")
+    assert main([str(spec), "-o", str(tmp_path / "dup"), "-w", "0"]) == 1
+    assert not (tmp_path / "dup").exists()
+
+
+def test_load_fleet_spec_applies_defaults(tmp_path) -> None:
+    spec = {
+        "defaults": {"vendor": "galaxea", "target": "dora"},
+        "robots": [{"id": "a", "snapshot": "snaps/a.json"}, {"domain_id": 3, "target": "ros1"}],
+    }
+    path = tmp_path / "fleet.json"
+    path.write_text(json.dumps(spec), encoding="utf-8")
+    robots = load_fleet(str(path))
+    assert robots[0]["snapshot"] == str(tmp_path / "snaps" / "a.json")
+    assert (robots[0]["vendor"], robots[0]["target"]) == ("galaxea", "dora")
+    assert (robots[1]["id"], robots[1]["target"]) == ("1", "ros1")
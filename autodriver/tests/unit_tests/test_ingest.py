@@ -0,0 +1,145 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from agent.ingest import bounded_map, ingest_directory, parse_interface, parse_yaml
+from agent.knowledge_index import KnowledgeIndex, SourceDoc, content_hash
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def _index(path) -> KnowledgeIndex:
+    return KnowledgeIndex(str(path), CountingEmbeddings(size=16), "fake-16")
+
+
+def _write_tree(root) -> None:
+    (root / "galaxea_msgs" / "srv").mkdir(parents=True)
+    (root / "galaxea_msgs" / "srv" / "SetMode.srv").write_text("# 模式编号\nint32 mode\n---\nbool success\n", encoding="utf-8")
+    (root / "config").mkdir()
+    (root / "config" / "arm.yaml").write_text("arm:\n  joints: 7\n  topics:\n    - name: /joint_states\n", encoding="utf-8")
+    (root / "driver.cpp").write_text("// 电机驱动\nvoid move_forward(int distance) {}\n", encoding="utf-8")
+    (root / "faq.md").write_text("# 常见问题\n故障码E02：电池电压过低\n", encoding="utf-8")
+    (root / "copy.txt").write_text("故障码E02：电池电压过低\n", encoding="utf-8")
+    (root / "broken.md").write_bytes(b"\xff\xfe not utf-8")
+    (root / "image.png").write_bytes(b"\x89PNG")
+
+
+def _texts(index: KnowledgeIndex) -> list:
+    return [row["text"] for row in index.rows()]
+
+
+def test_parsers_keep_structure() -> None:
+    text = parse_interface("# 模式编号\nint32 mode\n---\nbool success\n", "galaxea_msgs/srv/SetMode.srv")
+    assert text.splitlines() == [
+        "ROS接口 galaxea_msgs/SetMode（srv）",
+        "galaxea_msgs/SetMode 请求：",
+        "# 模式编号",
+        "int32 mode",
+        "galaxea_msgs/SetMode 响应：",
+        "bool success",
+    ]
+    assert parse_yaml("arm:\n  joints: 7\n  topics:\n    - name: /a\n", "arm.yaml").splitlines()[1:] == [
+        "arm.joints: 7",
+        "arm.topics[0].name: /a",
+    ]
+    assert parse_yaml("key: {{ value }", "bad.yaml").endswith("key: {{ value }")
+
+
+def test_directory_ingest_is_incremental_and_dedupes(tmp_path) -> None:
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    _write_tree(docs)
+
+    index = _index(tmp_path / "index")
+    stats = ingest_directory(index, str(docs), batch_size=2)
+    # 5个可读文件；broken.md 读不了跳过，png 不支持
+    assert stats["added"] == 5
+    assert sorted(index.manifest["sources"]) == [
+        f"file:{docs / name}" for name in ("config/arm.yaml", "copy.txt", "driver.cpp", "faq.md", "galaxea_msgs/srv/SetMode.srv")
+    ]
+    assert any("arm.joints: 7" in text for text in _texts(index))
+
+    # 改一个文件、删一个文件：只重新嵌入改动的那个
+    (docs / "driver.cpp").write_text("// 电机驱动\nvoid stop_robot() {}\n", encoding="utf-8")
+    (docs / "faq.md").unlink()
+    reopened = _index(tmp_path / "index")
+    stats = ingest_directory(reopened, str(docs))
+    assert (stats["added"], stats["updated"], stats["removed"], stats["unchanged"]) == (0, 1, 1, 3)
+    assert reopened.embeddings.embedded == 1
+    texts = _texts(reopened)
+    assert len(texts) == len(set(texts))
+    assert not any("move_forward" in text for text in texts)
+
+
+def test_roots_with_same_relative_path_coexist(tmp_path) -> None:
+    roots = {}
+    for name in ("docs", "knowledge"):
+        roots[name] = tmp_path / name
+        roots[name].mkdir()
+        (roots[name] / "README.md").write_text(f"{name} 目录的说明", encoding="utf-8")
+    index = _index(tmp_path / "index")
+    builtin = SourceDoc("builtin:a", content_hash("内置条目"), "内置条目", root="builtin")
+    ingest_directory(index, str(roots["knowledge"]), extra=[builtin])
+    ingest_directory(index, str(roots["docs"]))
+    embedded = index.embeddings.embedded
+    # 两个目录来回导入：同名文件各占一条，不互相覆盖，也不重新嵌入
+    for name in ("knowledge", "docs", "knowledge"):
+        stats = ingest_directory(index, str(roots[name]))
+        assert (stats["added"], stats["updated"], stats["removed"], stats["unchanged"]) == (0, 0, 0, 1)
+    assert index.embeddings.embedded == embedded
+    assert sorted(_texts(index)) == sorted(["docs 目录的说明", "knowledge 目录的说明", "内置条目"])
+    # 不带内置条目的导入（命令行 --no-builtin）不会删掉它们；带着的同步照常清理
+    assert index.manifest["sources"]["builtin:a"]["root"] == "builtin"
+    assert ingest_directory(index, str(roots["knowledge"]), extra=[builtin._replace(source_id="builtin:b")])["removed"] == 1
+    assert "builtin:a" not in index.manifest["sources"]
+
+
+def test_identical_chunks_are_stored_once(tmp_path) -> None:
+    index = _index(tmp_path)
+    line = "故障码E02：电池电压过低"
+    stats = index.ingest([SourceDoc("a", content_hash(line), line), SourceDoc("b", content_hash(line), line)])
+    assert (stats["chunks_embedded"], stats["chunks_reused"]) == (1, 1)
+
+    # 删掉其中一个来源，另一个还引用着这个分片，不能删
+    index.ingest([SourceDoc("b", content_hash(line), line)])
+    assert _texts(index) == [line]
+    index.ingest([])
+    assert _texts(index) == []
+
+
+def test_process_pool_matches_serial(tmp_path) -> None:
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    _write_tree(docs)
+    serial = _index(tmp_path / "serial")
+    ingest_directory(serial, str(docs), workers=0)
+    pooled = _index(tmp_path / "pooled")
+    ingest_directory(pooled, str(docs), workers=2)
+    assert pooled.manifest["sources"] == serial.manifest["sources"]
+
+
+def test_bounded_map_limits_inflight() -> None:
+    lock = threading.Lock()
+    state = {"submitted": 0, "consumed": 0, "max_ahead": 0}
+
+    def items():
+        for i in range(20):
+            with lock:
+                state["submitted"] += 1
+                state["max_ahead"] = max(state["max_ahead"], state["submitted"] - state["consumed"])
+            yield i
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = []
+        for value in bounded_map(pool, lambda x: x * 2, items(), window=3):
+            state["consumed"] += 1
+            results.append(value)
+    assert results == [i * 2 for i in range(20)]
+    assert state["max_ahead"] <= 3
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from agent.knowledge_index import INDEX_FILE, IndexConfig, KnowledgeIndex
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def _index(path, embedding_id="fake-16", **config) -> KnowledgeIndex:
+    return KnowledgeIndex(str(path), CountingEmbeddings(size=16), embedding_id, config=IndexConfig(**config))
+
+
+def _texts(index: KnowledgeIndex) -> list:
+    store = index.store
+    return sorted(store.docstore.search(i).page_content for i in store.index_to_docstore_id.values())
+
+
+def test_sync_only_embeds_changes(tmp_path) -> None:
+    sources = {"a": "机器人前进指令：move_forward", "b": "故障码E01：电机卡死", "c": "支持型号A1、B2"}
+    first = _index(tmp_path)
+    assert first.sync(sources)["chunks_embedded"] == 3
+    assert first.version == 1
+
+    # 新进程重新打开：内容没变，不做任何嵌入
+    second = _index(tmp_path)
+    stats = second.sync(sources)
+    assert stats["chunks_embedded"] == 0
+    assert stats["unchanged"] == 3
+    assert second.embeddings.embedded == 0
+    assert second.version == 1
+    assert second.store.similarity_search("故障码E01：电机卡死", k=1)[0].page_content == "故障码E01：电机卡死"
+
+    # 改一条、删一条、加一条：只嵌入两条
+    changed = {"a": "机器人前进指令：move_forward(distance)", "c": sources["c"], "d": "紧急停止：stop_robot()"}
+    third = _index(tmp_path)
+    stats = third.sync(changed)
+    assert (stats["added"], stats["updated"], stats["removed"], stats["unchanged"]) == (1, 1, 1, 1)
+    assert third.embeddings.embedded == 2
+    assert third.version == 2
+    assert _texts(third) == sorted(changed.values())
+
+
+def test_rebuilds_on_embedding_change_or_corrupt_index(tmp_path) -> None:
+    sources = {"a": "文本一", "b": "文本二"}
+    _index(tmp_path).sync(sources)
+
+    other_model = _index(tmp_path, embedding_id="fake-16-v2")
+    assert other_model.sync(sources)["rebuilt"] == 1
+    assert other_model.embeddings.embedded == 2
+
+    with open(os.path.join(tmp_path, INDEX_FILE), "wb") as f:
+        f.write(b"garbage")
+    repaired = _index(tmp_path, embedding_id="fake-16-v2")
+    assert repaired.sync(sources)["rebuilt"] == 1
+    assert _texts(repaired) == ["文本一", "文本二"]
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_compact_storage_keeps_nearest_neighbour(tmp_path, storage) -> None:
+    sources = {str(i): f"第{i}条知识" for i in range(20)}
+    index = _index(tmp_path, storage=storage)
+    index.sync(sources)
+    # 重新打开（mmap只读）后依然能查到自己
+    reopened = _index(tmp_path, storage=storage)
+    reopened.sync(sources)
+    assert reopened.embeddings.embedded == 0
+    assert reopened.store.similarity_search("第7条知识", k=1)[0].page_content == "第7条知识"
+
+
+@pytest.mark.parametrize("config", [{"index_type": "hnsw"}, {"index_type": "ivfpq", "pq_m": 4, "pq_nbits": 4}])
+def test_ann_index_handles_deletes_and_reopen(tmp_path, config) -> None:
+    sources = {str(i): f"第{i}条知识" for i in range(40)}
+    index = _index(tmp_path, **config)
+    index.sync(sources)
+    assert index.manifest["effective_index_type"] == config["index_type"]
+
+    del sources["7"]
+    sources["new"] = "新增的一条知识"
+    reopened = _index(tmp_path, **config)
+    stats = reopened.sync(sources)
+    assert (stats["added"], stats["removed"]) == (1, 1)
+    assert reopened.store.index.ntotal == 40
+    assert _texts(reopened) == sorted(sources.values())
+    assert reopened.store.similarity_search("第3条知识", k=1)[0].page_content == "第3条知识"
+
+
+def test_ivfpq_falls_back_to_flat_until_trainable(tmp_path) -> None:
+    config = {"index_type": "ivfpq", "pq_m": 4, "pq_nbits": 5}  # 至少32个向量才能训练
+    sources = {str(i): f"知识{i}" for i in range(10)}
+    index = _index(tmp_path, **config)
+    index.sync(sources)
+    assert index.manifest["effective_index_type"] == "flat"
+
+    sources.update({str(i): f"知识{i}" for i in range(10, 40)})
+    grown = _index(tmp_path, **config)
+    grown.sync(sources)
+    assert grown.manifest["effective_index_type"] == "ivfpq"
+    assert grown.version == 2
@@ -0,0 +1,44 @@
+from http import HTTPStatus
+
+import pytest
+
+from agent.llm import AsyncChatTongyi
+
+pytestmark = pytest.mark.anyio
+
+
+def _resp(content: str, finish_reason: str = "null") -> dict:
+    return {
+        "status_code": HTTPStatus.OK,
+        "request_id": "req-1",
+        "output": {"choices": [{"finish_reason": finish_reason, "message": {"role": "assistant", "content": content}}]},
+        "usage": {"input_tokens": 3, "output_tokens": 2},
+    }
+
+
+async def test_astream_yields_tokens_without_threads(monkeypatch) -> None:
+    async def fake_call(self, **kwargs):
+        assert kwargs["stream"] and kwargs["incremental_output"]
+
+        async def gen():
+            for piece, reason in [("电机", "null"), ("卡死", "stop")]:
+                yield _resp(piece, reason)
+
+        return gen()
+
+    monkeypatch.setattr(AsyncChatTongyi, "_aio_call", fake_call)
+    model = AsyncChatTongyi(model="qwen-test", api_key="dummy")
+    chunks = [c.content async for c in model.astream("E01是什么故障") if c.content]
+    assert chunks == ["电机", "卡死"]
+
+
+async def test_ainvoke_uses_async_call(monkeypatch) -> None:
+    async def fake_call(self, **kwargs):
+        assert not kwargs.get("stream")
+        return _resp("7", "stop")
+
+    monkeypatch.setattr(AsyncChatTongyi, "_aio_call", fake_call)
+    model = AsyncChatTongyi(model="qwen-test", api_key="dummy")
+    result = await model.ainvoke("Add 3 and 4")
+    assert result.content == "7"
+    assert result.response_metadata["token_usage"]["output_tokens"] == 2
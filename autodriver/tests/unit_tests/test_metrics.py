@@ -0,0 +1,62 @@
+import json
+import logging
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agent.log import JsonFormatter, get_logger, log_event
+from agent.metrics import MetricsRegistry
+
+
+def test_track_records_duration_and_errors() -> None:
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    with registry.track("tool", "add"):
+        pass
+    with pytest.raises(ValueError):
+        with registry.track("tool", "add"):
+            raise ValueError("boom")
+
+    snap = registry.snapshot()
+    (hist,) = snap["histograms"]["autodriver_tool_duration_seconds"]
+    assert hist["labels"] == {"tool": "add"}
+    assert hist["count"] == 2
+    (err,) = snap["counters"]["autodriver_errors_total"]
+    assert err["labels"] == {"kind": "tool", "name": "add", "error": "ValueError"}
+
+
+def test_record_llm_tokens_and_prometheus_export() -> None:
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.describe("autodriver_llm_latency_seconds", "LLM latency")
+    registry.record_llm("llm_decide", 0.5, AIMessage(content="x", usage_metadata={
+        "input_tokens": 12, "output_tokens": 3, "total_tokens": 15,
+    }))
+    # 通义的用量在 response_metadata.token_usage 里
+    registry.record_llm("llm_decide", 0.05, AIMessage(content="y", response_metadata={
+        "token_usage": {"input_tokens": 8, "output_tokens": 2},
+    }))
+
+    text = registry.to_prometheus()
+    assert "# HELP autodriver_llm_latency_seconds LLM latency" in text
+    assert 'autodriver_llm_latency_seconds_bucket{node="llm_decide",le="0.1"} 1' in text
+    assert 'autodriver_llm_latency_seconds_bucket{node="llm_decide",le="+Inf"} 2' in text
+    assert 'autodriver_llm_prompt_tokens_total{node="llm_decide"} 20' in text
+    assert 'autodriver_llm_completion_tokens_total{node="llm_decide"} 5' in text
+
+
+def test_disabled_registry_records_nothing() -> None:
+    registry = MetricsRegistry(enabled=False)
+    registry.inc("autodriver_errors_total", kind="tool", name="add")
+    with registry.track("node", "parse_input"):
+        pass
+    assert registry.snapshot() == {"counters": {}, "histograms": {}}
+
+
+def test_log_event_is_level_gated_and_structured(caplog) -> None:
+    logger = get_logger("test")
+    with caplog.at_level(logging.WARNING, logger="autodriver"):
+        log_event(logger, logging.DEBUG, "hidden", x=1)
+        log_event(logger, logging.WARNING, "shown", count=3)
+    (record,) = caplog.records
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["event"] == "shown"
+    assert payload["count"] == 3
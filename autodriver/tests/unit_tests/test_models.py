@@ -0,0 +1,51 @@
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agent.models import FakeChatModel, create_chat_model
+from agent.tools import tools
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_fake_model_calls_tools_by_rule() -> None:
+    model = FakeChatModel().bind_tools(tools)
+
+    msg = await model.ainvoke([HumanMessage(content="请帮我算一下 12 乘 7")])
+    assert msg.tool_calls[0]["name"] == "multiply"
+    assert msg.tool_calls[0]["args"] == {"a": 12, "b": 7}
+
+    msg = await model.ainvoke([HumanMessage(content="机器人故障码E01是什么？")])
+    assert msg.tool_calls[0]["name"] == "knowledge_query"
+    assert msg.usage_metadata["input_tokens"] > 0
+
+
+async def test_fake_model_answers_from_tool_result_and_streams() -> None:
+    model = FakeChatModel()
+    history = [HumanMessage(content="12 乘 7"), ToolMessage(content="84", tool_call_id="1")]
+    assert (await model.ainvoke(history)).content == "回答：84"
+
+    chunks = [c async for c in model.astream(history)]
+    assert len(chunks) > 1
+    assert "".join(c.content for c in chunks) == "回答：84"
+
+
+async def test_fake_model_scripted_responses_and_latency() -> None:
+    model = FakeChatModel(responses=[AIMessage(content="一"), AIMessage(content="二")], latency_s=0.05)
+    start = time.perf_counter()
+    first = await model.ainvoke([HumanMessage(content="x")])
+    assert time.perf_counter() - start >= 0.05
+    second = await model.ainvoke([HumanMessage(content="x")])
+    third = await model.ainvoke([HumanMessage(content="x")])
+    assert [first.content, second.content, third.content] == ["一", "二", "一"]
+
+
+def test_create_chat_model_provider(monkeypatch) -> None:
+    monkeypatch.setenv("AUTODRIVER_MODEL_PROVIDER", "fake")
+    monkeypatch.setenv("AUTODRIVER_FAKE_LATENCY_S", "0.1")
+    model = create_chat_model()
+    assert isinstance(model, FakeChatModel)
+    assert model.latency_s == 0.1
+    with pytest.raises(ValueError):
+        create_chat_model("nope")
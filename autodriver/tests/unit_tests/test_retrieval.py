@@ -0,0 +1,172 @@
+import asyncio
+import importlib
+
+import pytest
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from agent import rag
+from agent.ingest import main as ingest_main
+from agent.knowledge_index import KnowledgeIndex, SourceDoc, content_hash
+from agent.lexical import BM25Index, identifiers, reciprocal_rank_fusion, tokenize
+from agent.rag import HybridRetriever
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    queries: int = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+class BatchCountingEmbeddings(DeterministicFakeEmbedding):
+    batches: list = []
+
+    def embed_queries(self, texts):
+        self.batches.append(len(texts))
+        return [self.embed_query(t) for t in texts]
+
+
+@pytest.fixture
+def global_index(tmp_path, monkeypatch):
+    """rag 全局状态指向临时目录，检索结果缓存清空"""
+    monkeypatch.setenv("AUTODRIVER_EMBEDDINGS", "fake")
+    monkeypatch.setenv("AUTODRIVER_RAG_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setenv("AUTODRIVER_KNOWLEDGE_DIR", str(tmp_path / "knowledge"))
+    for name in ("_vector_db", "_knowledge_index", "_retriever"):
+        monkeypatch.setattr(rag, name, None)
+    monkeypatch.setattr(rag, "retrieval_cache", rag.RetrievalCache())
+    return tmp_path
+
+
+def _retriever(tmp_path, mode="hybrid") -> HybridRetriever:
+    index = KnowledgeIndex(str(tmp_path), CountingEmbeddings(size=16), "fake-16")
+    index.sync({f"builtin:{i}": text for i, text in enumerate(rag.knowledge_base)})
+    return HybridRetriever(index.store, index.rows(), index.version, mode=mode)
+
+
+def test_tokenize_mixes_cjk_ngrams_and_identifiers() -> None:
+    tokens = tokenize("故障码E01：move_forward")
+    assert {"故", "故障", "障码", "e01", "move_forward", "move", "forward"} <= set(tokens)
+    assert identifiers("型号A1和B2支持move_forward吗？加 3 和 4") == ["a1", "b2", "move_forward"]
+
+
+def test_bm25_ranks_exact_term_first() -> None:
+    index = BM25Index([("a", "机器人前进指令"), ("b", "故障码E01：电机卡死"), ("c", "故障码E02：过热")])
+    assert index.search("E01是什么故障", 3)[0][0] == "b"
+    assert index.docs_containing_all(["故障", "e02"]) == {2}
+    assert reciprocal_rank_fusion([["x", "y"], ["y", "z"]], 2) == ["y", "x"]
+
+
+def test_exact_lookup_skips_embedding(tmp_path) -> None:
+    retriever = _retriever(tmp_path)
+    embeddings = retriever.store.embedding_function
+    embeddings.queries = 0  # 建空索引时探测维度用过一次
+
+    texts = retriever.retrieve("机器人故障码E01怎么处理", 2)
+    assert len(texts) == 2
+    assert "E01" in texts[0]
+    assert "move_forward" in retriever.retrieve("move_forward 的参数是什么", 1)[0]
+    assert embeddings.queries == 0
+
+    # 没有标识符的自然语言问题走融合检索，嵌入一次
+    assert len(retriever.retrieve("机器人怎么紧急停下来", 3)) == 3
+    assert embeddings.queries == 1
+
+
+def test_modes_honour_top_k(tmp_path) -> None:
+    for mode in ("dense", "lexical", "hybrid"):
+        retriever = _retriever(tmp_path / mode, mode=mode)
+        assert len(retriever.search("计算器支持哪些运算", 1)) == 1
+        assert len(retriever.search("计算器支持哪些运算", 3)) == 3
+    with pytest.raises(ValueError):
+        _retriever(tmp_path / "bad", mode="sparse")
+
+
+def test_retriever_built_once_per_index_version(global_index) -> None:
+    tmp_path = global_index
+    first = rag.get_retriever()
+    assert rag.get_retriever() is first
+    assert len(rag.retrieve_context("机器人支持哪些型号", top_k=2).split("\n")) == 2
+
+    (tmp_path / "knowledge").mkdir()
+    (tmp_path / "knowledge" / "faults.md").write_text("故障码E02：电池电压过低，请充电", encoding="utf-8")
+    rag.refresh_vector_db()
+    assert rag.get_retriever() is not first
+    assert rag.retrieve_context("E02", top_k=1).startswith("故障码E02")
+
+
+def test_batch_embeds_once_and_searches_once(tmp_path) -> None:
+    index = KnowledgeIndex(str(tmp_path), BatchCountingEmbeddings(size=16), "fake-16")
+    index.sync({f"builtin:{i}": text for i, text in enumerate(rag.knowledge_base)})
+    retriever = HybridRetriever(index.store, index.rows(), index.version)
+    batches = index.embeddings.batches
+    batches.clear()
+
+    queries = ["机器人怎么前进", "机器人故障码E01", "计算器能做除法吗", "机器人怎么停下来"]
+    results = retriever.search_many(queries, 2)
+    assert [len(r) for r in results] == [2, 2, 2, 2]
+    # E01 走精确匹配，其余三条合并成一批嵌入
+    assert batches == [3]
+    assert results == [retriever.search(q, 2) for q in queries]
+
+
+def test_result_cache_dedupes_and_invalidates(global_index) -> None:
+    cache = rag.retrieval_cache
+    contexts = rag.retrieve_contexts(["机器人怎么前进", " 机器人怎么前进\n", "ｍｏｖｅ＿ｆｏｒｗａｒｄ", "move_forward"], top_k=1)
+    # 首尾空白、全角字符规范化后是同一个键
+    assert contexts[0] == contexts[1]
+    assert contexts[2] == contexts[3]
+    assert cache.stats()["entries"] == 2
+    assert rag.retrieve_context("机器人怎么前进", top_k=1) == contexts[0]
+    assert cache.stats()["hits"] == 1
+
+    (global_index / "knowledge").mkdir()
+    (global_index / "knowledge" / "extra.md").write_text("机器人后退指令：move_backward(distance)", encoding="utf-8")
+    rag.refresh_vector_db()
+    rag.retrieve_context("机器人怎么前进", top_k=1)
+    stats = cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["hits"] == 1
+    assert cache.version == rag.get_knowledge_index().version
+
+
+def test_async_retrieval_uses_cache(global_index) -> None:
+    first = asyncio.run(rag.aretrieve_context("故障码E01怎么办"))
+    assert "E01" in first
+    misses = rag.retrieval_cache.stats()["misses"]
+    assert asyncio.run(rag.aretrieve_context("故障码E01怎么办")) == first
+    stats = rag.retrieval_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, misses)
+
+    # 索引在进程内被更新（检索器还是旧的）：不能再命中旧版本的缓存
+    text = "故障码E01：电机驱动器过流，先断电再检查电机相线"
+    rag.get_knowledge_index().ingest([SourceDoc("file:e01.md", content_hash(text), text)], prune=False)
+    asyncio.run(rag.aretrieve_context("故障码E01怎么办"))
+    stats = rag.retrieval_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, misses + 1)
+    assert rag.retrieval_cache.version == rag.get_knowledge_index().version
+
+
+def test_runtime_sync_keeps_cli_ingested_docs(global_index, monkeypatch) -> None:
+    docs = global_index / "docs"
+    docs.mkdir()
+    (docs / "faults.md").write_text("故障码E77：关节编码器通信中断，请检查线缆", encoding="utf-8")
+    (global_index / "knowledge").mkdir()
+    (global_index / "knowledge" / "notes.md").write_text("机器人后退指令：move_backward(distance)", encoding="utf-8")
+    # 命令行内部按 src.agent.rag 取全局索引：那一份模块的全局状态也要隔离
+    monkeypatch.setattr(importlib.import_module("src.agent.rag"), "_knowledge_index", None)
+    assert ingest_main([str(docs), "--workers", "0", "--index-dir", str(global_index / "index")]) == 0
+
+    # 智能体第一次检索时同步知识目录（prune=True），不能删掉命令行导入的 docs/ 文档
+    assert rag.retrieve_context("E77", top_k=1).startswith("故障码E77")
+    sources = rag.get_knowledge_index().manifest["sources"]
+    faults, notes = f"file:{docs / 'faults.md'}", f"file:{global_index / 'knowledge' / 'notes.md'}"
+    assert {faults, notes} <= set(sources)
+    assert sources[faults]["root"] == str(docs)
+
+    # 知识目录里删掉的文件照常清理
+    (global_index / "knowledge" / "notes.md").unlink()
+    assert rag.refresh_vector_db()["removed"] == 1
+    assert faults in rag.get_knowledge_index().manifest["sources"]
@@ -0,0 +1,95 @@
+import importlib
+import json
+import threading
+import time
+
+import pytest
+
+from agent import ros2_introspection
+from agent.ros2_introspection import CliBackend, IntrospectionBackend, IntrospectionError, Ros2Introspector
+
+# 包上的 tools 属性是工具列表，这里要的是模块本身
+agent_tools = importlib.import_module("agent.tools")
+
+
+@pytest.fixture
+def fake_graph(tmp_path, monkeypatch):
+    path = tmp_path / "graph.json"
+    monkeypatch.setenv("AUTODRIVER_ROS2_FAKE_GRAPH", str(path))
+    monkeypatch.delenv("ROS_DOMAIN_ID", raising=False)
+
+    def write(graph: dict) -> None:
+        path.write_text(json.dumps(graph), encoding="utf-8")
+
+    return write
+
+
+def test_parse_cli_topic_list() -> None:
+    output = "/joint_states [sensor_msgs/msg/JointState]\n/tf [tf2_msgs/msg/TFMessage, foo/msg/Bar]\n\n/bare\n"
+    assert CliBackend.parse_topic_list(output) == {
+        "/joint_states": ["sensor_msgs/msg/JointState"],
+        "/tf": ["tf2_msgs/msg/TFMessage", "foo/msg/Bar"],
+        "/bare": [],
+    }
+
+
+def test_cache_is_per_domain_with_ttl_and_refresh(fake_graph, monkeypatch) -> None:
+    fake_graph({"domains": {"0": {"topics": {"/a": ["std_msgs/msg/String"]}}, "7": {"topics": ["/b"]}}})
+    introspector = Ros2Introspector(backend="fake", ttl_s=60)
+    assert introspector.topics() == {"/a": ["std_msgs/msg/String"]}
+    monkeypatch.setenv("ROS_DOMAIN_ID", "7")
+    assert introspector.topic_names() == ["/b"]
+
+    # TTL内读缓存，显式refresh才看到变化
+    fake_graph({"domains": {"0": {"topics": ["/a", "/c"]}, "7": {"topics": ["/b"]}}})
+    assert introspector.topic_names(domain=0) == ["/a"]
+    assert introspector.topic_names(domain=0, refresh=True) == ["/a", "/c"]
+
+    expiring = Ros2Introspector(backend="fake", ttl_s=0.05)
+    assert expiring.topic_names(domain=7) == ["/b"]
+    fake_graph({"domains": {"7": {"topics": ["/b", "/d"]}}})
+    time.sleep(0.06)
+    assert expiring.topic_names(domain=7) == ["/b", "/d"]
+
+
+def test_errors_are_never_cached(fake_graph, monkeypatch) -> None:
+    # 工具内部按 src.agent.* 导入（异常类型也是那一份），替换那一份模块里的全局内省器
+    tool_module = importlib.import_module("src.agent.ros2_introspection")
+    monkeypatch.setattr(tool_module, "introspector", tool_module.Ros2Introspector(backend="fake", ttl_s=60))
+    fake_graph({"error": "daemon not running"})
+    assert agent_tools.ros2_get_topic_list.invoke({}) == ["CMD_ERROR: daemon not running"]
+    fake_graph({"topics": ["/joint_states"]})
+    assert agent_tools.ros2_get_topic_list.invoke({}) == ["/joint_states"]
+
+
+def test_concurrent_queries_hit_backend_once(monkeypatch) -> None:
+    class SlowBackend(IntrospectionBackend):
+        name = "slow"
+        calls = 0
+
+        def topic_names_and_types(self):
+            SlowBackend.calls += 1
+            time.sleep(0.1)
+            return {"/a": []}
+
+    monkeypatch.setattr(ros2_introspection, "create_backend", lambda kind, domain: SlowBackend())
+    introspector = Ros2Introspector(backend="auto", ttl_s=60)
+    threads = [threading.Thread(target=introspector.topics, kwargs={"domain": 3}) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert SlowBackend.calls == 1
+
+
+def test_backend_selection(monkeypatch) -> None:
+    monkeypatch.delenv("AUTODRIVER_ROS2_FAKE_GRAPH", raising=False)
+    with pytest.raises(ValueError):
+        ros2_introspection.create_backend("fake", 0)
+    with pytest.raises(ValueError):
+        ros2_introspection.create_backend("dds", 0)
+    monkeypatch.setenv("AUTODRIVER_ROS2_FAKE_GRAPH", "/nonexistent/graph.json")
+    backend = ros2_introspection.create_backend("auto", 0)
+    assert backend.name == "fake"
+    with pytest.raises(IntrospectionError):
+        backend.topic_names_and_types()
@@ -0,0 +1,119 @@
+import importlib
+import json
+import struct
+import time
+
+import pytest
+
+from agent.ros2_introspection import CliBackend, FakeBackend
+from agent.ros2_probe import image_size, measure, probe_topics
+
+pytestmark = pytest.mark.anyio
+
+agent_tools = importlib.import_module("agent.tools")
+
+
+def _jpeg_header(width: int, height: int) -> bytes:
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + bytes(9)
+    sof0 = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + bytes(3)
+    return b"\xff\xd8" + app0 + sof0
+
+
+def _png_header(width: int, height: int) -> bytes:
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height)
+
+
+def test_measure_samples_and_interfaces() -> None:
+    # echo 的输出被截断时末尾是字符串 '...'
+    assert image_size(list(_jpeg_header(1920, 1080)) + ["..."]) == (1920, 1080)
+    assert image_size(_png_header(640, 480)) == (640, 480)
+    assert image_size(b"not an image") is None
+
+    assert measure("sensor_msgs/msg/JointState", {"position": "<sequence type: double, length: 7>"}) == {"dim": 7}
+    assert measure("sensor_msgs/msg/CompressedImage", {"format": "rgb8; png compressed", "data": list(_png_header(640, 480))}) == {
+        "encoding": "png", "width": 640, "height": 480,
+    }
+    assert measure("sensor_msgs/msg/Image", {"width": 848, "height": 480, "encoding": "16UC1"}) == {
+        "width": 848, "height": 480, "encoding": "depth16",
+    }
+    # 收不到样本时用接口定义里的定长数组
+    assert measure("vendor_msgs/msg/ArmState", None, "float64[7] position\nfloat64[7] velocity") == {"dim": 7}
+
+
+def test_parse_cli_probe_output() -> None:
+    info = "Type: sensor_msgs/msg/JointState\nPublisher count: 2\nSubscription count: 0\n"
+    assert CliBackend.parse_topic_info(info) == {"type": "sensor_msgs/msg/JointState", "publishers": 2}
+    verbose = info + (
+        "\nEndpoint type: PUBLISHER\nQoS profile:\n  Reliability: BEST_EFFORT\n  History (Depth): KEEP_LAST (5)\n"
+        "  Durability: VOLATILE\n\nEndpoint type: SUBSCRIPTION\nQoS profile:\n  Reliability: RELIABLE\n"
+    )
+    assert CliBackend.parse_topic_info(verbose)["qos"] == [
+        {"reliability": "BEST_EFFORT", "history": "KEEP_LAST", "depth": 5, "durability": "VOLATILE"}
+    ]
+    assert CliBackend.parse_hz("average rate: 29.1\n\tmin: 0.03s\naverage rate: 30.002\n") == 30.002
+    echo = "header:\n  frame_id: ''\nname: '<sequence type: string, length: 6>'\nposition: '<sequence type: double, length: 6>'\n---\n"
+    assert measure("sensor_msgs/msg/JointState", CliBackend.parse_echo(echo)) == {"dim": 6}
+
+
+async def test_probes_run_concurrently_with_timeout(tmp_path) -> None:
+    topics = {f"/arm_{i}": "sensor_msgs/msg/JointState" for i in range(6)}
+    graph = {
+        "topics": {topic: [msg_type] for topic, msg_type in topics.items()},
+        "samples": {topic: {"position": [0.0] * 7} for topic in topics},
+        "delays": dict({topic: 0.2 for topic in topics}, **{"/arm_5": 5.0}),
+    }
+    path = tmp_path / "graph.json"
+    path.write_text(json.dumps(graph), encoding="utf-8")
+    backend = FakeBackend(str(path))
+
+    start = time.perf_counter()
+    probes = await probe_topics(topics, backend=backend, concurrency=8, timeout=0.5)
+    elapsed = time.perf_counter() - start
+    # 逐个探测需要 5*0.2 + 0.5 秒；并发后约等于最慢的那个（超时的0.5秒）
+    assert elapsed < 1.0
+    assert probes["/arm_5"].error and not probes["/arm_5"].fields
+    assert all(probes[f"/arm_{i}"].fields == {"dim": 7} and not probes[f"/arm_{i}"].error for i in range(5))
+
+    start = time.perf_counter()
+    await probe_topics({f"/arm_{i}": "" for i in range(4)}, backend=backend, concurrency=2, timeout=0.5)
+    assert time.perf_counter() - start >= 0.4
+
+
+def test_parse_tool_fills_measured_config(tmp_path, monkeypatch) -> None:
+    joint = "sensor_msgs/msg/JointState"
+    graph = {
+        "topics": {
+            "/motion_target/target_joint_state_arm_left": [joint],
+            "/motion_target/target_joint_state_torso": [joint],
+            "/hdas/feedback_torso": [joint],
+            "/hdas/camera_wrist_left/color/image_raw/compressed": ["sensor_msgs/msg/CompressedImage"],
+        },
+        "samples": {
+            "/motion_target/target_joint_state_arm_left": {"position": [0.0] * 7},
+            "/motion_target/target_joint_state_torso": {"position": [0.0] * 4},
+            "/hdas/feedback_torso": {"position": [0.0] * 5},
+            "/hdas/camera_wrist_left/color/image_raw/compressed": {
+                "format": "jpeg", "data": list(_jpeg_header(848, 480)),
+            },
+        },
+    }
+    path = tmp_path / "graph.json"
+    path.write_text(json.dumps(graph), encoding="utf-8")
+    monkeypatch.setenv("AUTODRIVER_ROS2_FAKE_GRAPH", str(path))
+    # 工具内部按 src.agent.* 导入，替换那一份模块里的全局内省器
+    fake = importlib.import_module("src.agent.ros2_introspection").Ros2Introspector(backend="fake")
+    monkeypatch.setattr("src.agent.ros2_introspection.introspector", fake)
+    monkeypatch.setattr("src.agent.ros2_probe.introspector", fake)
+
+    config = agent_tools.ros2_parse_topic_to_config.invoke({"topic_list": list(graph["topics"])})
+    assert config["joint_dim"]["left_arm"] == 7
+    # 没有右臂话题：保留默认值
+    assert config["joint_dim"]["right_arm"] == 6
+    assert (config["joint_dim"]["torso"], config["joint_dim"]["torso_cut"]) == (4, 4)
+    assert config["camera_size"]["wrist_left"] == (848, 480)
+    assert config["camera_size"]["top_left"] == (1280, 720)
+    assert config["camera_encoding"]["wrist_left"] == "jpeg"
+    assert config["topic_types"]["/hdas/feedback_torso"] == joint
+
+    unprobed = agent_tools.ros2_parse_topic_to_config.invoke({"topic_list": list(graph["topics"]), "probe": False})
+    assert unprobed["joint_dim"]["left_arm"] == 6 and "topic_types" not in unprobed
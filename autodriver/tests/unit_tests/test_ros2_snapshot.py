@@ -0,0 +1,128 @@
+import importlib
+import json
+import struct
+
+import pytest
+
+from agent.ros2_introspection import FakeBackend
+from agent.ros2_probe import probe_topics
+from agent.ros2_snapshot import (
+    SnapshotBackend,
+    SnapshotError,
+    SnapshotReader,
+    file_backend,
+    main,
+    record_snapshot,
+    write_snapshot,
+)
+
+pytestmark = pytest.mark.anyio
+
+agent_tools = importlib.import_module("agent.tools")
+
+JOINT = "sensor_msgs/msg/JointState"
+CAMERA = "/hdas/camera_wrist_left/color/image_raw/compressed"
+
+
+def _jpeg_header(width: int, height: int) -> bytes:
+    sof0 = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + bytes(3)
+    return b"\xff\xd8" + sof0
+
+
+@pytest.fixture
+def graph_file(tmp_path):
+    graph = {
+        "topics": {
+            "/motion_target/target_joint_state_arm_left": [JOINT],
+            "/hdas/feedback_arm_left": [JOINT],
+            CAMERA: ["sensor_msgs/msg/CompressedImage"],
+            "/diagnostics": ["diagnostic_msgs/msg/DiagnosticArray"],
+        },
+        "samples": {
+            "/motion_target/target_joint_state_arm_left": {"position": [0.0] * 7},
+            "/hdas/feedback_arm_left": {"position": [0.0] * 7},
+            # echo 输出的整数列表，截断时末尾带 '...'
+            CAMERA: {"format": "jpeg", "data": list(_jpeg_header(848, 480)) + ["..."]},
+        },
+        "interfaces": {JOINT: "float64[] position"},
+        "qos": {"/hdas/feedback_arm_left": [{"reliability": "BEST_EFFORT", "durability": "VOLATILE", "history": "KEEP_LAST", "depth": 1}]},
+        "rates": {"/hdas/feedback_arm_left": 200.0, CAMERA: 30.0},
+    }
+    path = tmp_path / "graph.json"
+    path.write_text(json.dumps(graph), encoding="utf-8")
+    return path
+
+
+async def test_record_then_replay_matches_live_probe(graph_file, tmp_path) -> None:
+    live = FakeBackend(str(graph_file))
+    path = str(tmp_path / "robot.r2snap")
+    report = await record_snapshot(path, backend=live, rate_window_s=1.0)
+    assert (report["topics"], report["failed"]) == (4, 1)
+
+    replay = file_backend(path)
+    assert isinstance(replay, SnapshotBackend) and file_backend(str(graph_file)).name == "fake"
+    assert replay.topic_names_and_types() == live.topic_names_and_types()
+    topics = {name: types[0] for name, types in live.topic_names_and_types().items()}
+    replayed = await probe_topics(topics, backend=replay)
+    measured = await probe_topics(topics, backend=live)
+    assert {name: p.fields for name, p in replayed.items()} == {name: p.fields for name, p in measured.items()}
+    assert replayed[CAMERA].fields == {"encoding": "jpeg", "width": 848, "height": 480}
+    assert replayed["/hdas/feedback_arm_left"].fields == {"dim": 7}
+    assert replayed["/diagnostics"].error
+
+    reader = SnapshotReader(path)
+    record = reader.record(CAMERA)
+    assert isinstance(record["sample"]["data"], bytes) and record["rate_hz"] == 30.0
+    assert reader.record("/hdas/feedback_arm_left")["qos"][0]["reliability"] == "BEST_EFFORT"
+    assert reader.interface(JOINT) == "float64[] position"
+    assert reader.meta["backend"] == "fake"
+    assert main(["info", path]) == 0
+
+
+async def test_record_keeps_going_when_backend_raises(graph_file, tmp_path, monkeypatch) -> None:
+    live = FakeBackend(str(graph_file))
+    aprobe = live.aprobe
+
+    async def flaky_aprobe(topic, msg_type, timeout):
+        if topic == CAMERA:
+            raise OSError("连接被重置")
+        return await aprobe(topic, msg_type, timeout)
+
+    monkeypatch.setattr(live, "aprobe", flaky_aprobe)
+    path = str(tmp_path / "robot.r2snap")
+    report = await record_snapshot(path, backend=live, rate_window_s=0)
+    assert (report["topics"], report["failed"]) == (4, 2)
+    reader = SnapshotReader(path)
+    assert reader.record(CAMERA)["error"] == "OSError: 连接被重置"
+    assert reader.record("/hdas/feedback_arm_left")["sample"] is not None
+
+
+def test_corrupt_snapshot_raises_introspection_error(tmp_path) -> None:
+    path = tmp_path / "robot.r2snap"
+    write_snapshot(str(path), [{"name": "/a", "types": [JOINT], "sample": {"position": [1.0]}}], {JOINT: "float64[] position"})
+    assert SnapshotReader(str(path)).record("/a")["sample"] == {"position": [1.0]}
+    # 录制中断：没有索引和尾部
+    path.write_bytes(path.read_bytes()[:-30])
+    with pytest.raises(SnapshotError):
+        SnapshotReader(str(path))
+    with pytest.raises(SnapshotError):
+        SnapshotReader(str(tmp_path / "missing.r2snap"))
+
+
+async def test_tools_read_snapshot_without_ros(graph_file, tmp_path, monkeypatch) -> None:
+    path = str(tmp_path / "robot.r2snap")
+    await record_snapshot(path, backend=FakeBackend(str(graph_file)), rate_window_s=0)
+    monkeypatch.setenv("AUTODRIVER_ROS2_SNAPSHOT", path)
+    # 工具内部按 src.agent.* 导入，替换那一份模块里的全局内省器
+    fake = importlib.import_module("src.agent.ros2_introspection").Ros2Introspector(backend="auto")
+    monkeypatch.setattr("src.agent.ros2_introspection.introspector", fake)
+    monkeypatch.setattr("src.agent.ros2_probe.introspector", fake)
+
+    topic_list = agent_tools.ros2_get_topic_list.invoke({})
+    assert CAMERA in topic_list and fake.backend(0).name == "snapshot"
+    config = await agent_tools.ros2_parse_topic_to_config.ainvoke({"topic_list": topic_list})
+    assert config["joint_dim"]["left_arm"] == 7
+    assert config["camera_size"]["wrist_left"] == (848, 480)
+    # 查询失败时的错误字符串不会被当成话题
+    failed = agent_tools.ros2_parse_topic_to_config.invoke({"topic_list": ["CMD_ERROR: x"], "probe": False})
+    assert "CMD_ERROR" not in json.dumps(failed)
@@ -0,0 +1,90 @@
+import array
+import collections
+import json
+import os
+import struct
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from agent.shm_client import ShmClient, ShmExportError, main
+from agent.templates import TemplateRegistry
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _writer_runtime() -> dict:
+    """生成驱动里的写入端：解码池/关节缓存/共享内存导出三个片段，依赖由驱动文件头导入"""
+    namespace = {
+        "array": array, "collections": collections, "json": json, "os": os, "struct": struct,
+        "threading": threading, "time": time, "np": np, "shared_memory": shared_memory,
+    }
+    env = TemplateRegistry().env
+    for name in ("image_decode.py.j2", "joint_state.py.j2", "shm_export.py.j2"):
+        exec(compile(env.get_template(f"common/{name}").render(), name, "exec"), namespace)
+    return namespace
+
+
+@pytest.fixture
+def exporter():
+    runtime = _writer_runtime()
+    store = runtime["JointStateStore"]([("left_arm", 3), ("gripper", 1)])
+    cameras = {"wrist_left": (4, 2, "rgb8", 1)}
+    exporter = runtime["ShmExporter"](f"adtest_{os.getpid()}", runtime["shm_streams"](cameras, {"follower_arms": store}))
+    yield runtime, exporter
+    exporter.close()
+
+
+def test_reader_sees_latest_frames_without_copy(exporter) -> None:
+    runtime, writer = exporter
+    with ShmClient(writer.prefix) as client:
+        assert sorted(client.streams) == ["follower_arms", "image_wrist_left"]
+        image = client.stream("image_wrist_left")
+        assert (image.shape, image.dtype) == ((2, 4, 3), np.uint8)
+        assert client.latest("image_wrist_left") is None and client.wait("image_wrist_left", timeout=0.01) is None
+
+        writer.publish("follower_arms", np.array([1.0, 2.0, 3.0, 4.0], dtype=np.float32), stamp_ns=42)
+        state = client.latest("follower_arms")
+        assert (state.seq, state.stamp_ns, state.data.tolist()) == (1, 42, [1.0, 2.0, 3.0, 4.0])
+        assert not state.data.flags.writeable
+
+        frame = np.full((2, 4, 3), 7, dtype=np.uint8)
+        writer.publish("image_wrist_left", frame)
+        first = client.wait("image_wrist_left")
+        assert first.seq == 1 and int(first.data[0, 0, 0]) == 7
+        # 视图直接指向共享内存：写方绕回同一个槽后内容跟着变，valid() 变为False
+        for value in range(1, runtime["SHM_FRAME_SLOTS"] + 1):
+            assert client.valid("image_wrist_left", first)
+            frame[:] = value
+            writer.publish("image_wrist_left", frame)
+        assert not client.valid("image_wrist_left", first) and int(first.data[0, 0, 0]) == runtime["SHM_FRAME_SLOTS"]
+        copied = client.read("image_wrist_left")
+        assert copied.seq == runtime["SHM_FRAME_SLOTS"] + 1 and copied.data.flags.writeable
+        assert main(["info", writer.prefix]) == 0
+    # 关闭客户端后手里的视图仍然可读，映射随最后一个视图释放
+    assert int(first.data[0, 0, 0]) == runtime["SHM_FRAME_SLOTS"]
+
+
+def test_other_process_reads_and_detaches_cleanly(exporter) -> None:
+    _, writer = exporter
+    writer.publish("follower_arms", np.arange(4, dtype=np.float32))
+    script = (
+        "from src.agent.shm_client import ShmClient\n"
+        f"c = ShmClient({writer.prefix!r}); print(c.latest('follower_arms').data.sum()); c.close()\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=30)
+    assert out.stdout.strip() == "6.0", out.stderr
+    # 读方进程退出不会删掉驱动的共享内存段
+    with ShmClient(writer.prefix) as client:
+        assert client.latest("follower_arms").seq == 1
+
+
+def test_missing_export_raises() -> None:
+    with pytest.raises(ShmExportError):
+        ShmClient(f"adtest_missing_{os.getpid()}")
+    assert main(["info", f"adtest_missing_{os.getpid()}"]) == 1
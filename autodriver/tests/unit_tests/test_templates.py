@@ -0,0 +1,191 @@
+import array
+import ast
+import collections
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from agent.templates import TEMPLATE_ROOT, TemplateRegistry, pyliteral
+from agent.topic_rules import build_robot_config
+
+TOPICS = [
+    "/motion_target/target_joint_state_arm_left",
+    "/hdas/feedback_arm_left",
+    "/hdas/camera_wrist_left/color/image_raw/compressed",
+]
+
+
+def _rendered_config(code: str) -> dict:
+    """从生成的代码里取出 ROBOT_CONFIG 字面量"""
+    for node in ast.parse(code).body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", "") == "ROBOT_CONFIG":
+            return ast.literal_eval(node.value)
+    raise AssertionError("生成的代码里没有 ROBOT_CONFIG")
+
+
+def test_pyliteral_round_trips() -> None:
+    value = {"a": "引号\"和\\反斜杠", "size": (640, 480), "one": (1,), "list": [1, 2.5, None, True], "nested": {"x": {}}}
+    assert ast.literal_eval(pyliteral(value)) == value
+    long = {f"key_{i}": "/some/long/topic/name" for i in range(10)}
+    text = pyliteral(long, indent=4)
+    assert "\n" in text and ast.literal_eval(text) == long
+    with pytest.raises(TypeError):
+        pyliteral({"bad": object()})
+
+
+@pytest.mark.parametrize("target", ["ros2", "ros1", "dora"])
+@pytest.mark.parametrize("vendor", ["galaxea", "agilex"])
+def test_every_target_renders_valid_code(target, vendor) -> None:
+    config = build_robot_config(TOPICS, vendor=vendor)
+    code = TemplateRegistry().render(config, target=target)
+    assert _rendered_config(code) == config
+
+
+def test_vendor_fallback_and_cwd_independence(tmp_path, monkeypatch) -> None:
+    registry = TemplateRegistry()
+    assert registry.resolve("ros2", "galaxea") == "ros2/template/galaxea/node_template.py.j2"
+    assert registry.resolve("ros2", "agilex") == "ros2/template/default/node_template.py.j2"
+    assert set(registry.available()) == {"ros2", "ros1", "dora"}
+    with pytest.raises(ValueError):
+        registry.resolve("ros3")
+
+    monkeypatch.chdir(tmp_path)
+    # 没有 vendor 的老配置按 galaxea 模板渲染
+    config = build_robot_config(TOPICS)
+    del config["vendor"]
+    assert "ROS2RobotDriverNode" in registry.render(config)
+
+
+def test_templates_are_cached_until_modified(tmp_path) -> None:
+    root = tmp_path / "data"
+    shutil.copytree(os.path.join(TEMPLATE_ROOT, "ros1"), root / "ros1")
+    registry = TemplateRegistry(root=str(root))
+    name = registry.resolve("ros1")
+    first = registry.env.get_template(name)
+    assert registry.env.get_template(name) is first
+
+    path = root / name
+    path.write_text(path.read_text(encoding="utf-8").replace("ROS1机器人通用驱动模板", "改过的模板"), encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert "改过的模板" in registry.render(build_robot_config(TOPICS), target="ros1")
+
+
+def _runtime_snippet(name: str) -> dict:
+    """把 common/ 下的运行时片段单独执行，得到其中的类和函数（依赖由生成的驱动在文件头导入）"""
+    namespace = {"array": array, "collections": collections, "threading": threading, "time": time, "np": np}
+    exec(compile(TemplateRegistry().env.get_template(f"common/{name}").render(), name, "exec"), namespace)
+    return namespace
+
+
+def test_image_decode_pool_drops_oldest_and_reuses_buffers() -> None:
+    runtime = _runtime_snippet("image_decode.py.j2")
+    cfg = build_robot_config(TOPICS)
+    cfg["camera_encoding"]["wrist_left"] = "rgb8"
+    cfg["camera_size"]["wrist_left"] = (4, 2)
+    specs = runtime["camera_specs"](cfg)
+    assert specs == {"wrist_left": (4, 2, "rgb8", 1)}
+
+    gate, busy, frames = threading.Event(), threading.Event(), []
+
+    def on_frame(name, frame):
+        busy.set()
+        gate.wait(5)
+        frames.append((name, frame, int(frame[0, 0, 0])))
+
+    def frame_bytes(value):
+        return np.full(4 * 2 * 3, value, dtype=np.uint8).tobytes()
+
+    pool = runtime["ImageDecodePool"](specs, on_frame, workers=4, depth=2)
+    try:
+        pool.submit("wrist_left", frame_bytes(0))
+        assert busy.wait(5)
+        for value in range(1, 6):
+            pool.submit("wrist_left", frame_bytes(value))
+        gate.set()
+        deadline = time.monotonic() + 5
+        while len(frames) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = pool.snapshot_stats()["wrist_left"]
+    finally:
+        pool.close()
+    # 第0帧先被取走解码；其余排队时只保留最新的两帧
+    assert [value for _, _, value in frames] == [0, 4, 5]
+    assert stats["decoded"] == 3 and stats["dropped"] == 3
+    # 帧写进预分配的缓冲区，按 FRAME_BUFFERS 轮换
+    assert len({id(frame) for _, frame, _ in frames}) == 3 and frames[0][1].shape == (2, 4, 3)
+
+
+class _Msg:
+    position: object = None
+
+
+class _Publisher:
+    def __init__(self) -> None:
+        self.sent = []
+        self.msgs = set()
+
+    def publish(self, msg) -> None:
+        # 消息是复用的：发布时按值记录
+        self.msgs.add(id(msg))
+        self.sent.append(list(msg.position))
+
+
+def test_replay_plan_slices_sanitizes_and_reuses_messages() -> None:
+    plan_cls = _runtime_snippet("joint_replay.py.j2")["ReplayPlan"]
+    arm, gripper, torso = _Publisher(), _Publisher(), _Publisher()
+    invalid = []
+    # 左臂3维 | 夹爪1维 | 躯干取末尾2维
+    plan = plan_cls([(arm, 0, 3), (gripper, 3, 1), (torso, -2, 2)], _Msg, on_invalid=invalid.append)
+    assert plan.width == 4
+
+    plan.publish([0.12345, float("nan"), 1.0, float("inf"), 7.0, 8.00049])
+    plan.publish(np.arange(6, dtype=np.float32))
+    assert arm.sent == [[0.123, 0.0, 1.0], [0.0, 1.0, 2.0]]
+    assert gripper.sent == [[0.0], [3.0]]
+    assert torso.sent == [[7.0, 8.0], [4.0, 5.0]]
+    assert len(invalid) == 1 and np.isnan(invalid[0][0]) and np.isinf(invalid[0][1])
+    assert len(arm.msgs) == 1
+    with pytest.raises(ValueError):
+        plan.publish([1.0, 2.0])
+
+    start = time.monotonic()
+    sent = plan.publish_trajectory(np.zeros((5, 6)), hz=100)
+    assert sent == 5 and time.monotonic() - start >= 0.035
+    assert len(arm.sent) == 7
+    assert plan.publish_trajectory(np.zeros((5, 6)), hz=100, should_stop=lambda: True) == 0
+
+
+def test_joint_state_store_layout_and_seqlock() -> None:
+    runtime = _runtime_snippet("joint_state.py.j2")
+    jd = {"left_arm": 2, "right_arm": 2, "gripper": 1, "torso": 3, "torso_cut": 2}
+    layout = runtime["follower_layout"](jd)
+    assert layout == [("left_arm", 2), ("left_gripper", 1), ("right_arm", 2), ("right_gripper", 1), ("torso", 2)]
+    assert sum(dim for _, dim in runtime["leader_layout"](jd)) == 2 + 1 + 2 + 1 + 3 + 3 * 7
+
+    store = runtime["JointStateStore"](layout)
+    assert store.latest() == (0, 0, None)
+    store.set("left_arm", array.array("d", [1.0, 2.0]))
+    # 还有段没收到过：不发布
+    assert store.commit() is None
+    for name, values in (("left_gripper", [3.0]), ("right_arm", (4.0, 5.0)), ("right_gripper", [6.0]), ("torso", [7.0, 8.0])):
+        store.set(name, values)
+    first = store.commit(stamp_ns=123)
+    assert first.tolist() == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0] and not first.flags.writeable
+    assert store.latest() == (1, 123, first)
+    with pytest.raises(ValueError):
+        store.set("torso", [1.0, 2.0, 3.0])
+
+    # 视图在之后 STATE_BUFFERS-1 次提交内保持不变，再往后被轮转覆盖，valid() 随之变为False
+    store.set("left_arm", [9.0, 9.0])
+    for _ in range(runtime["STATE_BUFFERS"] - 1):
+        store.commit()
+        assert store.valid(1) and first[0] == 1.0
+    store.commit()
+    assert not store.valid(1) and first[0] == 9.0
+    seq, _, copied = store.read()
+    assert seq == store.seq and copied.flags.writeable and copied[0] == 9.0
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+from langchain_core.tools import tool
+
+from agent.tool_executor import ToolExecutor, parse_tool_timeout
+
+pytestmark = pytest.mark.anyio
+
+
+@tool
+def slow_echo(text: str) -> str:
+    """Sleep briefly and echo the text back."""
+    time.sleep(0.2)
+    return text
+
+
+@tool
+def broken(text: str) -> str:
+    """Always fail."""
+    raise RuntimeError("boom")
+
+
+def _call(name: str, text: str, call_id: str) -> dict:
+    return {"name": name, "args": {"text": text}, "id": call_id, "type": "tool_call"}
+
+
+async def test_calls_run_concurrently_in_order() -> None:
+    executor = ToolExecutor({"slow_echo": slow_echo}, max_workers=4)
+    start = time.perf_counter()
+    results = await executor.run([_call("slow_echo", str(i), f"call_{i}") for i in range(4)])
+    elapsed = time.perf_counter() - start
+    assert [m.tool_call_id for m in results] == ["call_0", "call_1", "call_2", "call_3"]
+    assert [m.content for m in results] == ["0", "1", "2", "3"]
+    assert elapsed < 0.6
+    executor.shutdown()
+
+
+async def test_concurrency_cap_serializes_tool() -> None:
+    executor = ToolExecutor({"slow_echo": slow_echo}, max_workers=4, concurrency={"slow_echo": 1})
+    start = time.perf_counter()
+    await executor.run([_call("slow_echo", "a", "1"), _call("slow_echo", "b", "2")])
+    assert time.perf_counter() - start >= 0.4
+    executor.shutdown()
+
+
+async def test_errors_and_timeouts_become_tool_messages() -> None:
+    executor = ToolExecutor(
+        {"slow_echo": slow_echo, "broken": broken}, timeouts={"slow_echo": 0.05}
+    )
+    results = await executor.run(
+        [_call("slow_echo", "a", "1"), _call("broken", "b", "2"), _call("missing", "c", "3")]
+    )
+    assert all(m.status == "error" for m in results)
+    assert "超时" in results[0].content
+    assert "boom" in results[1].content
+    assert "missing" in results[2].content
+    executor.shutdown()
+
+
+async def test_async_tools_are_awaited_without_thread_pool() -> None:
+    import threading
+
+    from langchain_core.tools import StructuredTool
+
+    def sync_impl(text: str) -> str:
+        """Echo from a thread."""
+        return threading.current_thread().name
+
+    async def async_impl(text: str) -> str:
+        return threading.current_thread().name
+
+    echo = StructuredTool.from_function(func=sync_impl, coroutine=async_impl, name="echo")
+    executor = ToolExecutor({"echo": echo}, max_workers=2)
+    [result] = await executor.run([_call("echo", "x", "call_0")])
+    assert result.content == threading.current_thread().name
+    assert executor._pool is None
+
+
+def test_parse_tool_timeout_follows_probe_settings(monkeypatch) -> None:
+    for name in ("AUTODRIVER_ROS2_PARSE_TIMEOUT_S", "AUTODRIVER_ROS2_PROBE_CONCURRENCY", "AUTODRIVER_ROS2_PROBE_TIMEOUT_S"):
+        monkeypatch.delenv(name, raising=False)
+    # 默认 24个话题 / 并发8 = 3批，每批 8秒 + 1秒兜底，再加5秒余量
+    assert parse_tool_timeout() == 32.0
+    monkeypatch.setenv("AUTODRIVER_ROS2_PROBE_CONCURRENCY", "4")
+    monkeypatch.setenv("AUTODRIVER_ROS2_PROBE_TIMEOUT_S", "2")
+    assert parse_tool_timeout() == 6 * 3.0 + 5.0
+    monkeypatch.setenv("AUTODRIVER_ROS2_PARSE_TIMEOUT_S", "90")
+    assert ToolExecutor.from_env({}).timeouts["ros2_parse_topic_to_config"] == 90.0
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from agent.topic_rules import RuleSet, build_robot_config, detect_vendor, load_rule_sets
+
+GALAXEA_TOPICS = [
+    "/motion_target/target_joint_state_arm_left",
+    "/motion_target/target_pose_arm_left",
+    "/hdas/feedback_arm_left",
+    "/hdas/feedback_torso",
+    "/hdas/camera_head/left_raw/image_raw_color/compressed",
+    "/hdas/camera_wrist_left/color/image_raw/compressed",
+]
+
+AGILEX_TOPICS = [
+    "/master/joint_left",
+    "/master/joint_right",
+    "/puppet/joint_left",
+    "/puppet/joint_right",
+    "/camera_f/color/image_raw/compressed",
+    "/camera_l/color/image_raw/compressed",
+    "/tf",
+]
+
+
+def test_builtin_vendor_rules() -> None:
+    assert {"galaxea", "agilex"} <= set(load_rule_sets())
+
+    config = build_robot_config(GALAXEA_TOPICS)
+    assert config["vendor"] == "galaxea"
+    # 同一话题同时填下发话题和主指令话题
+    assert config["publish_topics"]["left_arm"] == config["main_cmd_topics"]["joint_left"] == GALAXEA_TOPICS[0]
+    assert config["main_cmd_topics"]["pose_left"] == "/motion_target/target_pose_arm_left"
+    assert config["camera_topics"]["top_left"] == "/hdas/camera_head/left_raw/image_raw_color/compressed"
+    assert config["publish_topics"]["right_arm"] == ""
+    assert config["joint_dim"]["left_arm"] == 6
+
+    config = build_robot_config(AGILEX_TOPICS)
+    assert config["vendor"] == "agilex"
+    assert config["follow_feedback_topics"]["right_arm"] == "/puppet/joint_right"
+    assert config["camera_topics"]["wrist_left"] == "/camera_l/color/image_raw/compressed"
+    assert config["joint_dim"]["left_arm"] == 7
+    assert config["camera_size"]["top_left"] == (640, 480)
+
+
+def test_detection_and_first_match_wins() -> None:
+    assert detect_vendor(["/robot_3" + t for t in AGILEX_TOPICS] + ["/hdas/imu"]) == "agilex"
+    assert detect_vendor(["/rosout", "/parameter_events"]) == "galaxea"
+
+    rules = RuleSet("demo", [("publish_topics.left_arm", "arm_left"), ("main_cmd_topics.joint_left", "arm_left")])
+    assert rules.classify(["/a/arm_left", "/b/arm_left"]) == {
+        "publish_topics.left_arm": "/a/arm_left",
+        "main_cmd_topics.joint_left": "/a/arm_left",
+    }
+    assert rules.match("/unrelated") == []
+    with pytest.raises(ValueError):
+        RuleSet("bad", [("publish_topics.no_such_slot", "x")])
+
+
+def test_rule_files_reload_on_change(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("AUTODRIVER_ROS2_RULES_DIR", str(tmp_path))
+    path = tmp_path / "demo.yaml"
+    path.write_text("vendor: demo\nrules:\n  publish_topics.left_arm: arm_a\n", encoding="utf-8")
+    assert build_robot_config(["/arm_a", "/arm_b"])["publish_topics"]["left_arm"] == "/arm_a"
+    first = load_rule_sets()
+    assert load_rule_sets() is first
+
+    path.write_text("vendor: demo\nrules:\n  publish_topics.left_arm: arm_b\n", encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert build_robot_config(["/arm_a", "/arm_b"], vendor="demo")["publish_topics"]["left_arm"] == "/arm_b"
+    with pytest.raises(ValueError):
+        build_robot_config(["/arm_a"], vendor="galaxea")